@@ -1,7 +1,25 @@
+import os
+import uuid
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from palmopsim_model import run_simulation, run_sensitivity_analysis, get_estate_age_distribution
+from palmopsim_model import (
+    SCENARIOS, run_scenarios, extend_simulation, run_sensitivity_analysis, run_analytic_sensitivity,
+    get_estate_age_distribution
+)
+from palmopsim_sweep import run_sweep
+from palmopsim_store import RunStore
+from palmopsim_dataview import DataView
+from palmopsim_metrics import REGISTRY, timed
+from palmopsim_charts import (
+    cached_figure, annual_trend_figure, sensitivity_figure, age_distribution_figure,
+    replant_strategy_figure, block_trajectory_figure, monthly_harvest_figure
+)
+from palmopsim_monthly import run_monthly_simulation
+from palmopsim_atlas import ATLAS_FILE_ENV, KPIAtlas
+
+# (19/10/2026): Every run the dashboard compares uses common random numbers, so
+# scenarios and replant rates see the same noise for each block-year
+NOISE_MODE = "crn"
 
 # ------------------------
 # Page Configuration (15/2/2026)
@@ -26,18 +44,14 @@ st.sidebar.header("Simulation Configuration")
 st.sidebar.caption("Note: A fixed random seed is used for reproducible results across runs.")
 
 # (17/2/2026) Changed selectbox to multiselect to pick one or more scenarios at once
+# (19/10/2026): Options come from the scenario registry (custom scenarios via PALMOPSIM_SCENARIOS_FILE)
 scenarios = st.sidebar.multiselect(
     "Select Strategy",
-    ["Conservative", "Moderate", "Aggressive"]
+    list(SCENARIOS)
 )
 
-scenario_descriptions = {
-    "Conservative": "Lower yield assumption (-10%). Risk-averse planning.",
-    "Moderate": "Baseline yield assumption (0%). Standard operations.",
-    "Aggressive": "Higher yield assumption (+10%). Optimistic strategy."
-}
 for s in scenarios:
-    st.sidebar.caption(f"{s}: {scenario_descriptions[s]}")
+    st.sidebar.caption(f"{s}: {SCENARIOS[s]['description']}")
 
 st.sidebar.markdown("**Estate Configuration**")
 simulation_years = st.sidebar.number_input(
@@ -97,12 +111,90 @@ pest_slider = st.sidebar.slider(
 # Phase 5 Modification (18/2/2026): Disable run button until one scenario is selected
 run_button = st.sidebar.button("Run Simulation", disabled = (len(scenarios) == 0))
 
+# (19/10/2026): Saved runs - reload a previous run without re-simulating
+run_store = RunStore()
+saved_batches = run_store.list_batches()
+
+if not saved_batches.empty:
+    st.sidebar.markdown("**Saved Runs**")
+    batch_labels = {
+        row.batch_id: (
+            f"{row.created_at:%Y-%m-%d %H:%M} - {row.scenarios} "
+            f"({row.simulation_years} yrs, {row.num_blocks} blocks)"
+        )
+        for row in saved_batches.itertuples()
+    }
+    selected_batch = st.sidebar.selectbox(
+        "Previous Runs",
+        list(batch_labels),
+        format_func = batch_labels.get
+    )
+
+    if st.sidebar.button("Load Saved Run"):
+        stored_runs = run_store.load_batch(selected_batch)
+        stored_params = next(iter(stored_runs.values()))["params"]
+
+        st.session_state["results_dict"] = stored_runs
+        st.session_state["last_scenarios"] = list(stored_runs)
+        st.session_state["last_params"] = {
+            key: stored_params[key]
+            for key in ["scenario_name", "simulation_years", "num_blocks", "fertilizer",
+                        "harvest_interval", "climate_slider", "pest_slider", "noise_mode"]
+        }
+
 if not run_button and "results_dict" not in st.session_state:
     st.info(
         "Configure simulation parameters in the sidebar and click 'Run Simulation' to generate results. "
         "Run one or more scenarios to compare long-term FFB production, sensitivity to key inputs, and estate age health."
     )
     
+# (19/10/2026): Monthly engine runs are cached per parameter set across reruns
+@st.cache_data(max_entries = 64)
+def monthly_simulation(params):
+    return run_monthly_simulation(**params)
+
+# (19/10/2026): Instant estimates from the precomputed KPI atlas (palmopsim_atlas) while
+# the sidebar differs from the displayed run. Enabled by setting PALMOPSIM_ATLAS_FILE.
+@st.cache_resource
+def load_atlas(path):
+    return KPIAtlas.load(path)
+
+atlas = load_atlas(os.environ[ATLAS_FILE_ENV]) if os.environ.get(ATLAS_FILE_ENV) else None
+sidebar_params = {
+    "noise_mode": NOISE_MODE,
+    "simulation_years": simulation_years,
+    "num_blocks": num_blocks,
+    "fertilizer": fertilizer,
+    "harvest_interval": harvest_interval,
+    "climate_slider": climate_slider,
+    "pest_slider": pest_slider
+}
+displayed_params = st.session_state.get("last_params", {})
+sidebar_changed = (
+    scenarios != st.session_state.get("last_scenarios")
+    or any(displayed_params.get(key) != value for key, value in sidebar_params.items())
+)
+
+if atlas is not None and scenarios and not run_button and sidebar_changed:
+    estimates = {s: atlas.query({**sidebar_params, "scenario_name": s}, live_fallback = False) for s in scenarios}
+    if all(estimate is not None for estimate in estimates.values()):
+        st.subheader("Instant Estimates")
+        st.caption(
+            "Interpolated from the precomputed KPI atlas as you adjust the sidebar. "
+            "Click 'Run Simulation' for full block-level results."
+        )
+        for s in scenarios:
+            col1, col2, col3 = st.columns(3)
+            col1.metric(label = f"{s} - Total FFB Production", value = f"{estimates[s]['total_ffb']:,.0f} t")
+            col2.metric(label = f"{s} - Average yield", value = f"{estimates[s]['average_yield']:.2f} t/ha")
+            col3.metric(label = f"{s} - Overaged blocks", value = f"{estimates[s]['old_blocks']} blocks")
+
+        estimate_df = pd.DataFrame({s: estimates[s]["annual_summary"].round(2) for s in scenarios}).reset_index()
+        st.plotly_chart(
+            cached_figure(annual_trend_figure, estimate_df, scenarios, 17 * num_blocks * 25),
+            width = "stretch"
+        )
+
 # Phase 5 Implementation (18/2/2026) : Check if at least 1 scenario is selected
 if run_button:
     if len(scenarios) == 0:
@@ -110,17 +202,44 @@ if run_button:
     
     else:
         results_dict = {} 
-        
-        for scenario in scenarios: # (17/2/2026): Scenarios come from multiselect
-            results_dict[scenario] = run_simulation (
-            scenario_name = scenario,
+        previous_results = st.session_state.get("results_dict", {})
+        run_params = dict(
             simulation_years = simulation_years,
             num_blocks = num_blocks,
             fertilizer = fertilizer,
             harvest_interval = harvest_interval,
             climate_slider = climate_slider, # Pass slider value
-            pest_slider = pest_slider # Pass slider value
+            pest_slider = pest_slider, # Pass slider value
+            noise_mode = NOISE_MODE
         )
+        
+        new_scenarios = []
+        reused_scenarios = []
+        for scenario in scenarios: # (17/2/2026): Scenarios come from multiselect
+            # (19/10/2026): Longer horizon, otherwise unchanged - only simulate the new years
+            previous = previous_results.get(scenario, {})
+            previous_state = previous.get("state")
+            same_settings = (
+                previous_state is not None
+                and previous_state["year"] <= simulation_years
+                and previous_state["params"]["scenario_name"] == scenario
+                and all(
+                    previous_state["params"][key] == value
+                    for key, value in run_params.items() if key != "simulation_years"
+                )
+            )
+
+            if same_settings and previous_state["year"] == simulation_years:
+                results_dict[scenario] = previous # Nothing changed - reuse the displayed run
+                reused_scenarios.append(scenario)
+            elif same_settings:
+                results_dict[scenario] = extend_simulation(previous, simulation_years)
+            else:
+                new_scenarios.append(scenario)
+
+        # (19/10/2026): All remaining scenarios in one batched pass
+        results_dict.update(run_scenarios(new_scenarios, return_state = True, **run_params))
+        results_dict = {scenario: results_dict[scenario] for scenario in scenarios}
 
         # Phase 6 Implementation (21/2/2026): Added sensitivity function
         selected_scenario = scenarios[0]
@@ -132,9 +251,21 @@ if run_button:
             "fertilizer": fertilizer,
             "harvest_interval": harvest_interval,
             "climate_slider": climate_slider,
-            "pest_slider": pest_slider
+            "pest_slider": pest_slider,
+            "noise_mode": NOISE_MODE
         }
 
+        # (19/10/2026): Persist every scenario of this run as one batch (unless it is the displayed run again)
+        if reused_scenarios != scenarios:
+            batch_id = uuid.uuid4().hex
+            for scenario in scenarios:
+                run_store.save_run(
+                    {**base_params, "scenario_name": scenario},
+                    results_dict[scenario],
+                    include_blocks = True,
+                    batch_id = batch_id
+                )
+
         # Save results
         st.session_state["results_dict"] = results_dict
         st.session_state["last_scenarios"] = scenarios
@@ -144,6 +275,14 @@ if "results_dict" in st.session_state:
     results_dict = st.session_state["results_dict"]
     scenarios = st.session_state["last_scenarios"]
     base_params = st.session_state["last_params"]    
+
+    # (19/10/2026): Read settings from the displayed run (may be a saved run), not the sidebar
+    simulation_years = base_params["simulation_years"]
+    num_blocks = base_params["num_blocks"]
+    fertilizer = base_params["fertilizer"]
+    harvest_interval = base_params["harvest_interval"]
+    climate_slider = base_params["climate_slider"]
+    pest_slider = base_params["pest_slider"]
     
     # KPI Metrics
     # Phase 5 Implementation (17/2/2026): Add KPI Comparison Table
@@ -239,36 +378,40 @@ if "results_dict" in st.session_state:
 
     comparison_df = comparison_df.reset_index().rename(columns={"index": "Year"})
 
-    fig = px.line(
-        comparison_df,
-        x = "Year",
-        y = scenarios,
-        labels = {"value": "Total FFB (t)", "variable": "Scenario"},
-        title = "Annual FFB Production Comparison",
-        markers = True
-    )
-
-    # Force hover to show 2 decimals
-    fig.update_traces(hovertemplate = 'Year: %{x}<br>Total FFB(t): %{y:.2f}')
-    # Phase 6 Improvement (25/3/2026): Y-axis starts at 0
-    fig.update_layout(
-        yaxis_tickformat = "~s",
-        yaxis_rangemode = "tozero"
-    )
-
-    # Phase 6 Improvement (25/3/2026): Add a horizontal reference line at baseline yield
     # Reference line at Malaysian average yield (~17 t/ha total estate equivalent)
     baseline_ref = 17 * num_blocks * 25 # t/ha × blocks × block_area_ha
-    fig.add_hline(
-        y = baseline_ref,
-        line_dash = "dot",
-        line_color = "gray",
-        annotation_text = "Malaysian avg. reference",
-        annotation_position = "bottom right"
-    )
+
+    # (19/10/2026): Figures are built once per distinct input data (palmopsim_charts)
+    fig = cached_figure(annual_trend_figure, comparison_df, scenarios, baseline_ref)
 
     st.plotly_chart(fig, width = "stretch")
 
+    # (19/10/2026): Block-level trajectories, drawn with WebGL / downsampling for large estates
+    with st.expander("View Per-Block Production Trajectories"):
+        trajectory_scenario = st.selectbox("Scenario", scenarios, key = "trajectory_scenario")
+        trajectory_fig = cached_figure(
+            block_trajectory_figure,
+            results_dict[trajectory_scenario]["dataframe"],
+            "Total_FFB_t",
+            f"Annual FFB per Block ({trajectory_scenario})"
+        )
+        st.plotly_chart(trajectory_fig, width = "stretch")
+
+    # (19/10/2026): Monthly view - harvest rounds every harvest interval, seasonal crop peaks
+    with st.expander("View Monthly Harvest Schedule"):
+        monthly_runs = {s: monthly_simulation({**base_params, "scenario_name": s}) for s in scenarios}
+        monthly_df = pd.concat(
+            [run["monthly"].assign(Scenario = s) for s, run in monthly_runs.items()],
+            ignore_index = True
+        )
+        st.plotly_chart(cached_figure(monthly_harvest_figure, monthly_df), width = "stretch")
+        st.caption(
+            f"Blocks are harvested in staggered rounds every {harvest_interval} months; crop ripens "
+            f"with a seasonal pattern (peak Sep-Oct) and waits on the palm until its block's next round. "
+            f"Ripe crop still unharvested at the end: "
+            + ", ".join(f"{s} {run['standing_crop_t']:,.0f} t" for s, run in monthly_runs.items())
+        )
+
     # Build the takeaway from the annual summary data
     best_scenario = max(scenarios, key = lambda s: results_dict[s]["total_ffb"])
     worst_scenario = min(scenarios, key = lambda s: results_dict[s]["total_ffb"])
@@ -296,21 +439,58 @@ if "results_dict" in st.session_state:
             f"Scroll down to see what is driving this gap."
         )
 
-    combined_df = pd.concat(
-        [
-            results_dict[s]["dataframe"].assign(scenario = s)
-            for s in scenarios
-        ],
-        ignore_index = True
-    )
+    # (19/10/2026): Build the combined table and its data view once per run, not on every rerun
+    if st.session_state.get("data_view_source") is not results_dict:
+        combined_df = pd.concat(
+            [
+                results_dict[s]["dataframe"].assign(scenario = s)
+                for s in scenarios
+            ],
+            ignore_index = True
+        )
+
+        # Round numeric columns to 2 decimals
+        combined_df[["FFB_t_ha", "Total_FFB_t"]] = combined_df[["FFB_t_ha", "Total_FFB_t"]].round(2)
+
+        st.session_state["data_view"] = DataView(combined_df)
+        st.session_state["data_csv"] = combined_df.to_csv(index = False).encode("utf-8")
+        st.session_state["data_view_source"] = results_dict
 
-    # Round numeric columns to 2 decimals
-    combined_df[["FFB_t_ha", "Total_FFB_t"]] = combined_df[["FFB_t_ha", "Total_FFB_t"]].round(2)
+    data_view = st.session_state["data_view"]
+    csv = st.session_state["data_csv"]
 
+    # (19/10/2026): Paged, server-side filtered view - only the visible page is sent to the browser
     with st.expander("View Detailed Simulation Data"):
-        st.dataframe(combined_df)
+        filter_cols = st.columns(3)
+        view_filters = {
+            "scenario": filter_cols[0].multiselect("Scenario", data_view.values("scenario")),
+            "Year": filter_cols[1].multiselect("Year", data_view.values("Year")),
+            "Block": filter_cols[2].multiselect("Block", data_view.values("Block"))
+        }
 
-    csv = combined_df.to_csv(index = False).encode("utf-8")
+        view_cols = st.columns(3)
+        group_by = view_cols[0].selectbox(
+            "Summarise by",
+            ["Block-year rows", "Year", "Block", "scenario"],
+            help = "Aggregate the filtered rows (total FFB, summed over blocks / years) instead of listing them."
+        )
+        page_size = view_cols[1].selectbox("Rows per page", [50, 100, 500], index = 1)
+
+        if group_by == "Block-year rows":
+            num_pages = data_view.num_pages(page_size, view_filters)
+            page_number = view_cols[2].number_input("Page", min_value = 1, max_value = num_pages, value = 1)
+            st.dataframe(data_view.page(page_number, page_size, view_filters))
+            st.caption(
+                f"Page {page_number} of {num_pages} - "
+                f"{data_view.count(view_filters):,} matching rows"
+            )
+        else:
+            summary_df = data_view.aggregate(group_by, ["Total_FFB_t"], filters = view_filters)
+            num_pages = max(1, -(-len(summary_df) // page_size))
+            page_number = view_cols[2].number_input("Page", min_value = 1, max_value = num_pages, value = 1)
+            start = (page_number - 1) * page_size
+            st.dataframe(summary_df.iloc[start:start + page_size])
+            st.caption(f"Page {page_number} of {num_pages} - {len(summary_df):,} groups")
 
     st.download_button(
         "Download Results as CSV",
@@ -331,37 +511,23 @@ if "results_dict" in st.session_state:
     for scenario in scenarios:
 
         base_params ["scenario_name"] = scenario
-        scenario_sensitivity = []
 
-        # Fertilizer sensitivity (±10%)
-        scenario_sensitivity.append(
+        # Fertilizer sensitivity (±20) - simulated, as the response has diminishing returns
+        scenario_sensitivity = [
             run_sensitivity_analysis(
                 base_params,
                 "fertilizer",
                 fertilizer - 20,    # Was -10
                 fertilizer + 20     # Was +10
             )
-        )
-
-        # Climate sensitivity (±10%)
-        scenario_sensitivity.append(
-            run_sensitivity_analysis(
-                base_params,
-                "climate_slider",
-                climate_slider - 10,
-                climate_slider + 10
-            )
-        )
+        ]
 
-        # Pest sensitivity (±5% to keep realistic bounds)
-        scenario_sensitivity.append(
-            run_sensitivity_analysis(
-                base_params,
-                "pest_slider",
-                max(0, pest_slider - 5),
-                pest_slider + 5
-            )
-        )
+        # (19/10/2026): Yield is linear in climate and pest pressure, so one analytic
+        # derivative pass gives their exact changes instead of baseline/low/high runs
+        scenario_sensitivity += run_analytic_sensitivity(base_params, {
+            "climate_slider": (climate_slider - 10, climate_slider + 10),
+            "pest_slider": (max(0, pest_slider - 5), pest_slider + 5) # ±5% to keep realistic bounds
+        })
 
         # Sensitivity analysis
         sens_df = pd.DataFrame(scenario_sensitivity)
@@ -378,35 +544,7 @@ if "results_dict" in st.session_state:
             "High_Change_%": "If increased"
         })
 
-        y_max = sens_df[["If reduced", "If increased"]].max().max()
-        y_min = sens_df[["If reduced", "If increased"]].min().min()
-
-        sens_fig = px.bar (
-            sens_df,
-            x = "Factor",
-            y = ["If reduced", "If increased"],
-            barmode = "group",
-            title = f"Which factors affect production the most? ({scenario}) scenario",
-            labels = {
-                "value": "% Change in Total FFB production", 
-                "variable": "",
-                },
-            color_discrete_map = {
-                "If reduced": "#EF553B",
-                "If increased": "#00CC96"
-            }
-        )
-
-        sens_fig.update_traces(
-            texttemplate = "%{y:+.1f}%",
-            textposition = "outside"
-        )
-
-        sens_fig.add_hline (y = 0, line_dash = "dash", line_color = "gray")
-        
-        sens_fig.update_layout(
-            yaxis_range = [y_min * 1.4, y_max * 1.4]
-        )
+        sens_fig = cached_figure(sensitivity_figure, sens_df, scenario)
         st.plotly_chart (sens_fig, width = "stretch")
 
         # Find the factor with the biggest overall swing
@@ -437,26 +575,10 @@ if "results_dict" in st.session_state:
             columns=["Age Category", "Percentage (%)"]
         )
 
-        age_fig = px.bar (
+        age_fig = cached_figure(
+            age_distribution_figure,
             age_df,
-            x = "Age Category",
-            y = "Percentage (%)",
-            title = f"Estate Age Distribution - End of Year {simulation_years} ({s})",
-            color = "Age Category",
-            color_discrete_map = {
-                "Immature (0-2)":    "#636EFA",
-                "Young (3-8)":       "#00CC96",
-                "Prime (9-18)":      "#19D3F3",
-                "Declining (19-25)": "#FFA15A",
-                "Overaged (>25)":    "#EF553B"
-            },
-            text = "Percentage (%)"
-        )
-        age_fig.update_traces(texttemplate = "%{text:.1f}%", textposition = "outside")
-        max_pct = age_df["Percentage (%)"].max()
-        age_fig.update_layout(
-            yaxis_range = [0, max_pct * 1.15],
-            showlegend = False
+            f"Estate Age Distribution - End of Year {simulation_years} ({s})"
         )
         st.plotly_chart(age_fig, width = "stretch", key=f"age_dist_{s}")
 
@@ -496,44 +618,23 @@ if "results_dict" in st.session_state:
 
     replant_strategies = [0.05, 0.10, 0.20]
     strategy_labels = {0.05: "Slow (5%)", 0.10: "Standard (10%)", 0.20: "Fast (20%)"}
-    strategy_results = []
-
-    for scenario in scenarios:
-        base_params["scenario_name"] = scenario
-
-        for rate in replant_strategies:
-            strategy_params = base_params.copy()
-            strategy_params["replant_rate"] = rate
-            sim_results = run_simulation(**strategy_params)
-
-            strategy_results.append({
-                "Scenario": scenario,
-                "Replant Rate": strategy_labels[rate],
-                "Total FFB (t)": sim_results["total_ffb"],
-                "Average Yield (t/ha)": sim_results["average_yield"]
-            })
-    
-    strategy_df = pd.DataFrame(strategy_results)
-
-    replant_fig = px.bar(
-        strategy_df,
-        x = "Replant Rate",
-        y = "Total FFB (t)",
-        color = "Scenario",
-        barmode = "group",
-        text = "Total FFB (t)",
-        title = "Total FFB Production by Replanting Rate and Scenario",
-        category_orders = {"Replant Rate": ["Slow (3%)", "Standard (5%)", "Fast (8%)"]}
-    )
 
-    replant_fig.update_traces(texttemplate="%{text:,.0f}", textposition="outside")
-    max_val = strategy_df["Total FFB (t)"].max()
-    replant_fig.update_layout(
-        yaxis_range = [0, max_val * 1.15],
-        xaxis_title = "Replanting Rate",
-        yaxis_title = "Total FFB Production (tonnes)",
-        legend_title = "Scenario"
-    )
+    # (19/10/2026): Scenario x replant rate grid now runs as one sweep, in the
+    # same noise mode as the scenario runs above
+    with timed("strategy_comparison"):
+        strategy_sweep = run_sweep(
+            {"scenario_name": scenarios, "replant_rate": replant_strategies},
+            base_params,
+            max_workers = 1 # Small estates: worker start-up costs more than the sweep
+        )
+    strategy_df = strategy_sweep.to_long().rename(columns = {
+        "scenario_name": "Scenario",
+        "total_ffb": "Total FFB (t)",
+        "average_yield": "Average Yield (t/ha)"
+    })
+    strategy_df["Replant Rate"] = strategy_df["replant_rate"].map(strategy_labels)
+
+    replant_fig = cached_figure(replant_strategy_figure, strategy_df)
     st.plotly_chart(replant_fig, width="stretch")
 
     # Auto takeaway
@@ -654,3 +755,7 @@ if "results_dict" in st.session_state:
         
     st.markdown("---")
     st.caption("PalmOpsSim — Simulation-Based Oil Palm Plantation Monitoring System | Phase 7 | © 2026 (Kong Kai Mann / Eng Yong Xiang- JX Tech)")
+
+# (19/10/2026): Optional Prometheus textfile export of the session's metrics
+if os.environ.get("PALMOPSIM_METRICS_FILE"):
+    REGISTRY.write_textfile(os.environ["PALMOPSIM_METRICS_FILE"])
@@ -0,0 +1,331 @@
+"""
+PalmOpsSim - KPI Atlas
+Precomputed KPI surface over the dashboard's input space. build_atlas runs
+the engine across a grid of management inputs for every scenario and estate
+size and stores the annual production series in one compressed .npz file;
+KPIAtlas.query answers by lookup plus multilinear interpolation, and falls
+back to a live run_simulation outside the atlas coverage.
+validate_atlas reports the interpolation error against real runs.
+
+Build from the command line:
+    python palmopsim_atlas.py --output palmopsim_atlas.npz --validate 200
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from palmopsim_metrics import record_cache
+from palmopsim_model import NOISE_MODES, SCENARIOS, run_simulation, resolve_scenario, simulate_trajectory
+from palmopsim_sweep import DEFAULT_PARAMS, SWEEP_AXES, merge_base_params, run_sweep
+
+ATLAS_FORMAT = 1
+ATLAS_FILE_ENV = "PALMOPSIM_ATLAS_FILE"
+
+# Interpolated inputs, in the atlas array axis order
+ATLAS_AXES = ("fertilizer", "harvest_interval", "climate_slider", "pest_slider")
+
+# With the trajectory fixed, yield is linear in harvest interval, climate and
+# pest pressure separately (multilinear overall), so two or three nodes
+# interpolate those axes up to the 2-decimal rounding of block outputs. The
+# fertilizer response is curved (diminishing returns, kink at 0), so that axis
+# needs more nodes.
+DEFAULT_GRID = {
+    "fertilizer": [-10, -7.5, -5, -2.5, 0, 2.5, 5, 7.5, 10, 12.5, 15, 17.5, 20],
+    "harvest_interval": [6, 12],
+    "climate_slider": [-20, 0, 20],
+    "pest_slider": [0, 20]
+}
+
+DEFAULT_SCENARIOS = ("Conservative", "Moderate", "Aggressive")
+
+# Inputs the atlas is built for; any other value is answered by a live run
+FIXED_PARAMS = ("block_area_ha", "initial_age_range", "random_seed", "noise_mode")
+UNSUPPORTED_PARAMS = ("replant_rate", "yield_adjustment", "pest_model", "climate_factors", "antithetic")
+
+def scenario_definition(name):
+    """
+    The registry values an atlas was built with for one scenario.
+    """
+    yield_adjustment, replant_rate = resolve_scenario(name)
+    return {"yield_adjustment": yield_adjustment, "replant_rate": replant_rate}
+
+# ------------------------
+# Atlas Builder (19/10/2026)
+# One run_sweep per estate size covers every scenario x grid node over the
+# longest horizon. Shorter horizons are prefixes of it: each year only uses
+# the random draws of the years before it. Overaged block counts depend on the
+# trajectory only, so they are stored per scenario, estate size and year.
+# ------------------------
+
+def build_atlas(
+        path = None,
+        block_counts = range(1, 51),
+        scenarios = DEFAULT_SCENARIOS,
+        max_years = 30,
+        grid = None,
+        base_params = None,
+        max_workers = None
+):
+    """
+    Runs the engine over scenarios x block_counts x the input grid (default
+    DEFAULT_GRID) for max_years and returns a KPIAtlas, also saved to path if given.
+    base_params: run_simulation values for FIXED_PARAMS (defaults otherwise);
+    any other name raises TypeError.
+    """
+    grid = {axis: sorted(float(v) for v in (grid or DEFAULT_GRID)[axis]) for axis in ATLAS_AXES}
+    for axis, nodes in grid.items():
+        if len(nodes) < 2 or len(set(nodes)) != len(nodes):
+            raise ValueError(f"Atlas axis {axis!r} needs at least two distinct nodes")
+    scenarios = list(scenarios)
+    block_counts = sorted(int(n) for n in block_counts)
+    for name in base_params or {}:
+        if SWEEP_AXES.get(name, name) not in FIXED_PARAMS:
+            raise TypeError(f"base_params can only set {FIXED_PARAMS}, got {name!r}")
+    merged = merge_base_params(base_params)
+    fixed = {name: merged[name] for name in FIXED_PARAMS}
+
+    shape = (len(scenarios), len(block_counts)) + tuple(len(grid[axis]) for axis in ATLAS_AXES)
+    annual_summary = np.empty(shape + (max_years,))
+    old_blocks = np.empty((len(scenarios), len(block_counts), max_years), dtype = np.int32)
+
+    for b, num_blocks in enumerate(block_counts):
+        sweep = run_sweep(
+            {"scenario_name": scenarios, **{axis: grid[axis] for axis in ATLAS_AXES}},
+            base_params = {**fixed, "num_blocks": num_blocks, "simulation_years": max_years},
+            max_workers = max_workers
+        )
+        annual_summary[:, b] = sweep.series["annual_summary"]
+
+        for s, scenario in enumerate(scenarios):
+            _, replant_rate = resolve_scenario(scenario)
+            trajectory = simulate_trajectory(
+                num_blocks = num_blocks,
+                simulation_years = max_years,
+                initial_age_range = fixed["initial_age_range"],
+                random_seed = fixed["random_seed"],
+                replant_rate = replant_rate,
+                noise_mode = fixed["noise_mode"]
+            )
+            old_blocks[s, b] = (trajectory["ages"] > 25).sum(axis = 1)
+
+    metadata = {
+        "format": ATLAS_FORMAT,
+        "max_years": max_years,
+        "scenarios": {name: scenario_definition(name) for name in scenarios},
+        "fixed_params": {**fixed, "initial_age_range": list(fixed["initial_age_range"])}
+    }
+    atlas = KPIAtlas(metadata, np.array(block_counts), grid, annual_summary, old_blocks)
+    if path is not None:
+        atlas.save(path)
+    return atlas
+
+# ------------------------
+# Atlas Queries (19/10/2026)
+# Scenario, estate size and horizon are exact lookups; the management inputs
+# are interpolated between the two surrounding nodes of each axis (16 corners).
+# ------------------------
+
+class KPIAtlas:
+    """
+    Precomputed annual FFB series with KPI lookup and interpolation.
+    """
+
+    def __init__(self, metadata, block_counts, grid, annual_summary, old_blocks):
+        self.metadata = metadata
+        self.scenarios = list(metadata["scenarios"])
+        self.max_years = metadata["max_years"]
+        self.fixed_params = {
+            **metadata["fixed_params"],
+            "initial_age_range": tuple(metadata["fixed_params"]["initial_age_range"])
+        }
+        self.block_counts = np.asarray(block_counts)
+        self.grid = {axis: np.asarray(grid[axis], dtype = float) for axis in ATLAS_AXES}
+        self.annual_summary = annual_summary
+        self.old_blocks = old_blocks
+        self._scenario_index = {name: i for i, name in enumerate(self.scenarios)}
+        self._block_index = {int(n): i for i, n in enumerate(self.block_counts)}
+
+    def save(self, path):
+        """
+        Writes the atlas to a compressed .npz file.
+        """
+        np.savez_compressed(
+            path,
+            metadata = np.array(json.dumps(self.metadata)),
+            block_counts = self.block_counts,
+            annual_summary = self.annual_summary,
+            old_blocks = self.old_blocks,
+            **{f"grid_{axis}": nodes for axis, nodes in self.grid.items()}
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an atlas written by save / build_atlas.
+        """
+        with np.load(path, allow_pickle = False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata.get("format") != ATLAS_FORMAT:
+                raise ValueError(f"{path}: unsupported atlas format {metadata.get('format')!r}")
+            return cls(
+                metadata,
+                data["block_counts"],
+                {axis: data[f"grid_{axis}"] for axis in ATLAS_AXES},
+                data["annual_summary"],
+                data["old_blocks"]
+            )
+
+    def covers(self, params):
+        """
+        True if the run_simulation parameters can be answered from the atlas.
+        """
+        params = {**DEFAULT_PARAMS, **params}
+        scenario = params["scenario_name"]
+        if scenario not in self._scenario_index:
+            return False
+        # The registry may have redefined the scenario since the atlas was built
+        if scenario not in SCENARIOS or scenario_definition(scenario) != self.metadata["scenarios"][scenario]:
+            return False
+        if any(params[name] is not None and params[name] is not False for name in UNSUPPORTED_PARAMS):
+            return False
+        if any(_differs(params[name], value) for name, value in self.fixed_params.items()):
+            return False
+        if params["num_blocks"] not in self._block_index:
+            return False
+        if params["simulation_years"] != int(params["simulation_years"]) or not 1 <= params["simulation_years"] <= self.max_years:
+            return False
+        return all(
+            self.grid[axis][0] <= params[axis] <= self.grid[axis][-1]
+            for axis in ATLAS_AXES
+        )
+
+    def interpolate(self, params):
+        """
+        Annual FFB series (t) for covered params over their simulation_years.
+        """
+        params = {**DEFAULT_PARAMS, **params}
+        cube = self.annual_summary[
+            self._scenario_index[params["scenario_name"]],
+            self._block_index[params["num_blocks"]]
+        ]
+        corners = []
+        weights = []
+        for axis in ATLAS_AXES:
+            nodes = self.grid[axis]
+            i = min(max(int(np.searchsorted(nodes, params[axis], side = "right")) - 1, 0), len(nodes) - 2)
+            t = (params[axis] - nodes[i]) / (nodes[i + 1] - nodes[i])
+            corners.append(slice(i, i + 2))
+            weights.append(np.array([1.0 - t, t]))
+        corner_series = cube[tuple(corners) + (slice(0, int(params["simulation_years"])),)]
+        return np.einsum("a,b,c,d,abcdy->y", *weights, corner_series)
+
+    def query(self, params, live_fallback = True):
+        """
+        KPIs for run_simulation parameters: total_ffb, average_yield, old_blocks,
+        annual_summary, annual_yield (as in run_simulation) plus source ("atlas"
+        or "live"). Outside the coverage, runs run_simulation (full result dict)
+        unless live_fallback is False, in which case it returns None.
+        """
+        params = {**DEFAULT_PARAMS, **params}
+        covered = self.covers(params)
+        record_cache("atlas", covered)
+        if not covered:
+            if not live_fallback:
+                return None
+            return {**run_simulation(**params), "source": "live"}
+
+        years = int(params["simulation_years"])
+        num_blocks = params["num_blocks"]
+        block_area_ha = params["block_area_ha"]
+        annual = self.interpolate(params)
+        total_ffb = annual.sum()
+        index = pd.Index(np.arange(1, years + 1), name = "Year")
+        annual_summary = pd.Series(annual, index = index, name = "Total_FFB_t")
+        old_blocks = self.old_blocks[
+            self._scenario_index[params["scenario_name"]], self._block_index[num_blocks], years - 1
+        ]
+        return {
+            "total_ffb": round(float(total_ffb), 1),
+            "average_yield": round(float(total_ffb / (num_blocks * block_area_ha * years)), 2),
+            "old_blocks": int(old_blocks),
+            "annual_summary": annual_summary,
+            "annual_yield": annual_summary / (num_blocks * block_area_ha),
+            "source": "atlas"
+        }
+
+def _differs(value, expected):
+    if isinstance(expected, (list, tuple)):
+        return tuple(value) != tuple(expected)
+    return value != expected
+
+# ------------------------
+# Validation (19/10/2026)
+# ------------------------
+
+def validate_atlas(atlas, samples = 200, random_seed = 0):
+    """
+    Compares atlas answers with real runs at random covered dashboard inputs
+    (whole-number slider values, any scenario, estate size and horizon).
+    Returns one row per sample with the inputs, both totals and the errors.
+    """
+    rng = np.random.default_rng(random_seed)
+    rows = []
+    for _ in range(samples):
+        params = {
+            "scenario_name": atlas.scenarios[rng.integers(len(atlas.scenarios))],
+            "num_blocks": int(rng.choice(atlas.block_counts)),
+            "simulation_years": int(rng.integers(1, atlas.max_years + 1)),
+            **atlas.fixed_params
+        }
+        for axis in ATLAS_AXES:
+            low, high = atlas.grid[axis][0], atlas.grid[axis][-1]
+            params[axis] = int(rng.integers(np.ceil(low), np.floor(high) + 1))
+
+        estimate = atlas.query(params, live_fallback = False)
+        actual = run_simulation(**params)
+        rows.append({
+            **{name: params[name] for name in ("scenario_name", "num_blocks", "simulation_years") + ATLAS_AXES},
+            "Atlas_Total_FFB_t": estimate["total_ffb"],
+            "Live_Total_FFB_t": actual["total_ffb"],
+            "Abs_Error_t": abs(estimate["total_ffb"] - actual["total_ffb"]),
+            "Rel_Error_%": abs(estimate["total_ffb"] - actual["total_ffb"]) / actual["total_ffb"] * 100
+                           if actual["total_ffb"] else 0.0,
+            "Max_Annual_Error_t": float(np.abs(
+                estimate["annual_summary"].to_numpy() - actual["annual_summary"].to_numpy()
+            ).max()),
+            "Yield_Error_t_ha": abs(estimate["average_yield"] - actual["average_yield"]),
+            "Old_Blocks_Match": estimate["old_blocks"] == actual["old_blocks"]
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Build the PalmOpsSim KPI atlas")
+    parser.add_argument("--output", default = "palmopsim_atlas.npz")
+    parser.add_argument("--max-blocks", type = int, default = 50)
+    parser.add_argument("--max-years", type = int, default = 30)
+    parser.add_argument("--workers", type = int, default = None, help = "Worker processes (default: one per CPU)")
+    parser.add_argument("--validate", type = int, default = 0, help = "Random real runs to compare against")
+    parser.add_argument(
+        "--noise-mode", default = "crn", choices = NOISE_MODES,
+        help = "Noise mode of the runs (default: crn, as in the dashboard)"
+    )
+    args = parser.parse_args()
+
+    atlas = build_atlas(
+        args.output,
+        block_counts = range(1, args.max_blocks + 1),
+        max_years = args.max_years,
+        base_params = {"noise_mode": args.noise_mode},
+        max_workers = args.workers
+    )
+    print(f"Atlas written to {args.output}: {atlas.annual_summary.size:,} stored annual values")
+    if args.validate:
+        report = validate_atlas(atlas, args.validate)
+        print(report[["Abs_Error_t", "Rel_Error_%", "Max_Annual_Error_t", "Yield_Error_t_ha"]].describe().round(4))
+        print(f"Overaged block counts matching: {report['Old_Blocks_Match'].mean():.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+PalmOpsSim - Chart Builders
+Plotly figures for the dashboard, cached by a hash of their input data so
+Streamlit reruns reuse built figures. Large line charts switch to WebGL
+traces and are reduced server-side with min/max decimation, which keeps
+every peak and trough while sending a bounded number of points.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from palmopsim_metrics import record_cache
+
+# Above this many points a chart uses WebGL (Scattergl) instead of SVG traces
+WEBGL_THRESHOLD = 2_000
+
+# Points sent per chart; larger inputs are decimated down to about this size
+MAX_POINTS = 1_000_000
+
+# Single series longer than this are min/max decimated
+MAX_POINTS_PER_SERIES = 5_000
+
+AGE_CATEGORY_COLOURS = {
+    "Immature (0-2)":    "#636EFA",
+    "Young (3-8)":       "#00CC96",
+    "Prime (9-18)":      "#19D3F3",
+    "Declining (19-25)": "#FFA15A",
+    "Overaged (>25)":    "#EF553B"
+}
+
+# ------------------------
+# Figure Cache (19/10/2026)
+# Keys are (chart name, hash of input data and options). The cache lives at
+# module level, so it survives Streamlit reruns within the server process.
+# Cached figures are shared: callers must not modify them.
+# ------------------------
+
+def data_hash(*items):
+    """
+    Content hash of DataFrames, Series, arrays and plain values.
+    """
+    content = hashlib.sha1()
+    for item in items:
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            frame = item if isinstance(item, pd.DataFrame) else item.to_frame()
+            content.update(repr((type(item).__name__, list(frame.columns), frame.shape)).encode("utf-8"))
+            content.update(pd.util.hash_pandas_object(frame.index).values.tobytes())
+            for _, column in frame.items():
+                # Numeric columns hash their raw buffer; only object columns need pandas hashing
+                if column.dtype.kind in "biufcmM":
+                    content.update(column.dtype.str.encode("utf-8"))
+                    content.update(np.ascontiguousarray(column.to_numpy()).tobytes())
+                else:
+                    content.update(pd.util.hash_pandas_object(column, index = False).values.tobytes())
+        elif isinstance(item, np.ndarray):
+            content.update(repr((item.dtype.str, item.shape)).encode("utf-8"))
+            content.update(np.ascontiguousarray(item).tobytes())
+        else:
+            content.update(repr(item).encode("utf-8"))
+    return content.hexdigest()
+
+class FigureCache:
+    """
+    Thread-safe LRU cache of built figures.
+    """
+
+    def __init__(self, max_size = 64):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            figure = self._items.get(key)
+            if figure is not None:
+                self._items.move_to_end(key)
+        record_cache("figures", figure is not None)
+        if figure is not None:
+            return figure
+
+        figure = build()
+        with self._lock:
+            self._items[key] = figure
+            while len(self._items) > self.max_size:
+                self._items.popitem(last = False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+FIGURE_CACHE = FigureCache()
+
+def cached_figure(builder, *data, **options):
+    """
+    Returns builder(*data, **options), reusing the figure built earlier for equal inputs.
+    """
+    key = (builder.__name__, data_hash(*data, sorted(options.items())))
+    return FIGURE_CACHE.get_or_build(key, lambda: builder(*data, **options))
+
+# ------------------------
+# Downsampling (19/10/2026)
+# Min/max decimation: split a series into equal bins and keep each bin's
+# first, last, minimum and maximum point. Extremes survive exactly, so the
+# drawn envelope matches the full series at screen resolution.
+# ------------------------
+
+def min_max_indices(y, max_points):
+    """
+    Returns sorted indices of y that keep at most about max_points points.
+    """
+    y = np.asarray(y, dtype = float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    bin_size = -(-n // max(1, max_points // 4))
+    n_bins = -(-n // bin_size)
+    padded = np.full(n_bins * bin_size, np.nan)
+    padded[:n] = y
+    bins = padded.reshape(n_bins, bin_size)
+    missing = np.isnan(bins)
+
+    offsets = np.arange(n_bins) * bin_size
+    indices = np.concatenate([
+        offsets,
+        offsets + np.argmin(np.where(missing, np.inf, bins), axis = 1),
+        offsets + np.argmax(np.where(missing, -np.inf, bins), axis = 1),
+        np.minimum(offsets + bin_size, n) - 1
+    ])
+    return np.unique(np.minimum(indices, n - 1))
+
+def min_max_decimate(x, y, max_points = MAX_POINTS_PER_SERIES):
+    """
+    Returns (x, y) reduced by min/max decimation; x must be ordered.
+    """
+    keep = min_max_indices(y, max_points)
+    return np.asarray(x)[keep], np.asarray(y)[keep]
+
+def decimate_frame(df, y_columns, max_points = MAX_POINTS_PER_SERIES):
+    """
+    Drops rows of a wide frame, keeping the union of each column's min/max points.
+    """
+    if len(df) <= max_points:
+        return df
+    per_column = max(4, max_points // len(y_columns))
+    keep = np.unique(np.concatenate([min_max_indices(df[c].to_numpy(), per_column) for c in y_columns]))
+    return df.iloc[keep]
+
+def render_mode(num_points):
+    return "webgl" if num_points > WEBGL_THRESHOLD else "svg"
+
+# ------------------------
+# Large Trajectory Charts (19/10/2026)
+# Many lines (blocks, ensemble members) are drawn as ONE trace with NaN
+# breaks between lines - thousands of separate traces are what make browsers
+# lag, not the point count. Beyond max_points an evenly spaced subset of
+# lines is drawn over the min/max envelope of all lines.
+# ------------------------
+
+def trajectory_figure(x, values, title = "", x_label = "Year", y_label = "", max_points = MAX_POINTS):
+    """
+    Line chart of many trajectories. values: (n_lines, len(x)).
+    """
+    x = np.asarray(x)
+    values = np.asarray(values, dtype = float)
+    n_lines, n_x = values.shape
+    figure = go.Figure()
+
+    # Long series: keep the x positions that carry each line's extremes across the ensemble
+    if n_x > MAX_POINTS_PER_SERIES:
+        keep = np.union1d(
+            min_max_indices(values.min(axis = 0), MAX_POINTS_PER_SERIES // 2),
+            min_max_indices(values.max(axis = 0), MAX_POINTS_PER_SERIES // 2)
+        )
+        x, values = x[keep], values[:, keep]
+        n_x = len(x)
+
+    shown = values
+    if n_lines * (n_x + 1) > max_points:
+        max_lines = max(1, max_points // (n_x + 1))
+        shown = values[np.linspace(0, n_lines - 1, max_lines).astype(int)]
+        figure.add_trace(go.Scatter(
+            x = np.concatenate([x, x[::-1]]),
+            y = np.concatenate([values.max(axis = 0), values.min(axis = 0)[::-1]]),
+            fill = "toself",
+            fillcolor = "rgba(99, 110, 250, 0.15)",
+            line = {"width": 0},
+            hoverinfo = "skip",
+            name = f"Range of all {n_lines:,} lines"
+        ))
+
+    # One trace: lines separated by NaN breaks
+    # float32 halves the payload sent to the browser
+    line_x = np.tile(np.append(x.astype(np.float32), np.nan), len(shown))
+    line_y = np.column_stack([shown, np.full(len(shown), np.nan)]).ravel().astype(np.float32)
+    trace = go.Scattergl if line_y.size > WEBGL_THRESHOLD else go.Scatter
+    figure.add_trace(trace(
+        x = line_x,
+        y = line_y,
+        mode = "lines",
+        line = {"width": 1, "color": "rgba(99, 110, 250, 0.35)"},
+        name = f"{len(shown):,} of {n_lines:,} lines" if len(shown) < n_lines else f"{n_lines:,} lines",
+        hoverinfo = "skip" if line_y.size > WEBGL_THRESHOLD else None
+    ))
+    figure.add_trace(go.Scatter(
+        x = x,
+        y = values.mean(axis = 0),
+        mode = "lines",
+        line = {"width": 3, "color": "#EF553B"},
+        name = "Mean"
+    ))
+    figure.update_layout(title = title, xaxis_title = x_label, yaxis_title = y_label)
+    return figure
+
+def block_trajectory_figure(df, value_column = "Total_FFB_t", title = ""):
+    """
+    Per-block trajectories from a run_simulation dataframe (one row per block-year).
+    """
+    wide = df.pivot(index = "Block", columns = "Year", values = value_column)
+    return trajectory_figure(wide.columns.to_numpy(), wide.to_numpy(), title = title, y_label = value_column)
+
+# ------------------------
+# Dashboard Charts (19/10/2026)
+# Moved from app.py unchanged in appearance so they can be cached.
+# ------------------------
+
+def annual_trend_figure(comparison_df, scenarios, reference):
+    """
+    Annual FFB production per scenario with the Malaysian reference line.
+    """
+    comparison_df = decimate_frame(comparison_df, scenarios)
+    fig = px.line(
+        comparison_df,
+        x = "Year",
+        y = scenarios,
+        labels = {"value": "Total FFB (t)", "variable": "Scenario"},
+        title = "Annual FFB Production Comparison",
+        markers = len(comparison_df) <= WEBGL_THRESHOLD,
+        render_mode = render_mode(len(comparison_df) * len(scenarios))
+    )
+
+    # Force hover to show 2 decimals
+    fig.update_traces(hovertemplate = 'Year: %{x}<br>Total FFB(t): %{y:.2f}')
+    # Phase 6 Improvement (25/3/2026): Y-axis starts at 0
+    fig.update_layout(
+        yaxis_tickformat = "~s",
+        yaxis_rangemode = "tozero"
+    )
+
+    # Phase 6 Improvement (25/3/2026): Add a horizontal reference line at baseline yield
+    fig.add_hline(
+        y = reference,
+        line_dash = "dot",
+        line_color = "gray",
+        annotation_text = "Malaysian avg. reference",
+        annotation_position = "bottom right"
+    )
+    return fig
+
+def sensitivity_figure(sens_df, scenario):
+    """
+    Grouped bars of % change in total FFB when each factor is reduced / increased.
+    """
+    y_max = sens_df[["If reduced", "If increased"]].max().max()
+    y_min = sens_df[["If reduced", "If increased"]].min().min()
+
+    sens_fig = px.bar (
+        sens_df,
+        x = "Factor",
+        y = ["If reduced", "If increased"],
+        barmode = "group",
+        title = f"Which factors affect production the most? ({scenario}) scenario",
+        labels = {
+            "value": "% Change in Total FFB production",
+            "variable": "",
+            },
+        color_discrete_map = {
+            "If reduced": "#EF553B",
+            "If increased": "#00CC96"
+        }
+    )
+
+    sens_fig.update_traces(
+        texttemplate = "%{y:+.1f}%",
+        textposition = "outside"
+    )
+
+    sens_fig.add_hline (y = 0, line_dash = "dash", line_color = "gray")
+
+    sens_fig.update_layout(
+        yaxis_range = [y_min * 1.4, y_max * 1.4]
+    )
+    return sens_fig
+
+def age_distribution_figure(age_df, title):
+    """
+    Share of blocks per age category.
+    """
+    age_fig = px.bar (
+        age_df,
+        x = "Age Category",
+        y = "Percentage (%)",
+        title = title,
+        color = "Age Category",
+        color_discrete_map = AGE_CATEGORY_COLOURS,
+        text = "Percentage (%)"
+    )
+    age_fig.update_traces(texttemplate = "%{text:.1f}%", textposition = "outside")
+    max_pct = age_df["Percentage (%)"].max()
+    age_fig.update_layout(
+        yaxis_range = [0, max_pct * 1.15],
+        showlegend = False
+    )
+    return age_fig
+
+def replant_strategy_figure(strategy_df):
+    """
+    Total FFB by replanting rate and scenario.
+    """
+    replant_fig = px.bar(
+        strategy_df,
+        x = "Replant Rate",
+        y = "Total FFB (t)",
+        color = "Scenario",
+        barmode = "group",
+        text = "Total FFB (t)",
+        title = "Total FFB Production by Replanting Rate and Scenario",
+        category_orders = {"Replant Rate": ["Slow (3%)", "Standard (5%)", "Fast (8%)"]}
+    )
+
+    replant_fig.update_traces(texttemplate="%{text:,.0f}", textposition="outside")
+    max_val = strategy_df["Total FFB (t)"].max()
+    replant_fig.update_layout(
+        yaxis_range = [0, max_val * 1.15],
+        xaxis_title = "Replanting Rate",
+        yaxis_title = "Total FFB Production (tonnes)",
+        legend_title = "Scenario"
+    )
+    return replant_fig
+
+def monthly_harvest_figure(monthly_df):
+    """
+    Monthly harvested FFB per scenario from run_monthly_simulation's monthly frames
+    (stacked, with a Scenario column).
+    """
+    fig = px.line(
+        monthly_df,
+        x = "Month_Index",
+        y = "Harvested_FFB_t",
+        color = "Scenario",
+        labels = {"Month_Index": "Month", "Harvested_FFB_t": "Harvested FFB (t)"},
+        title = "Monthly Harvested FFB (harvest rounds and seasonal cropping)",
+        render_mode = render_mode(len(monthly_df))
+    )
+    fig.update_traces(hovertemplate = 'Month: %{x}<br>Harvested FFB(t): %{y:.2f}')
+    fig.update_layout(yaxis_rangemode = "tozero")
+    return fig
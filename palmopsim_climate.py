@@ -0,0 +1,200 @@
+"""
+PalmOpsSim - Climate Inputs
+Loads historical per-region climate index series from memory-mapped arrays,
+maps blocks to regions and turns replayed or resampled climate paths into
+block-year climate factors for the vectorised yield step.
+"""
+
+import json
+
+import numpy as np
+
+from palmopsim_sweep import CHUNK_CELLS, evaluate_group, group_output_arrays, group_parameter_sets, merge_base_params
+
+FREQUENCIES = ("annual", "monthly")
+
+# ------------------------
+# Climate Series Files (19/10/2026)
+# A series is stored as <path>.npy (time x region, float32) plus a small
+# <path>.json sidecar (regions, start_year, frequency). Values are climate
+# indices where 1.0 is a normal year, e.g. 0.9 = 10% below-normal conditions.
+# ------------------------
+
+def save_climate_series(path, values, regions, start_year, frequency = "annual"):
+    """
+    Writes a (time, region) climate index array and its metadata.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {FREQUENCIES}")
+    values = np.asarray(values, dtype = np.float32)
+    if values.ndim != 2 or values.shape[1] != len(regions):
+        raise ValueError("values must be shaped (time, len(regions))")
+    if frequency == "monthly" and values.shape[0] % 12:
+        raise ValueError("monthly series must cover whole years")
+
+    np.save(f"{path}.npy", values)
+    with open(f"{path}.json", "w", encoding = "utf-8") as f:
+        json.dump({"regions": list(regions), "start_year": start_year, "frequency": frequency}, f)
+
+def load_climate_series(path):
+    """
+    Opens a saved series without reading it into memory (np.load mmap_mode="r").
+    """
+    with open(f"{path}.json", encoding = "utf-8") as f:
+        meta = json.load(f)
+    values = np.load(f"{path}.npy", mmap_mode = "r")
+    return ClimateSeries(values, meta["regions"], meta["start_year"], meta["frequency"])
+
+class ClimateSeries:
+    """
+    Per-region climate index series (time x region), usually memory-mapped.
+    """
+
+    def __init__(self, values, regions, start_year, frequency = "annual"):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"frequency must be one of {FREQUENCIES}")
+        self.values = values
+        self.regions = list(regions)
+        self.start_year = start_year
+        self.frequency = frequency
+        self._annual = None
+
+    @property
+    def num_years(self):
+        return len(self.values) // (12 if self.frequency == "monthly" else 1)
+
+    def annual(self):
+        """
+        Returns the (years, regions) annual index; monthly series are averaged per year.
+        """
+        if self.frequency == "annual":
+            return self.values
+        if self._annual is None:
+            months = np.asarray(self.values, dtype = float)
+            self._annual = months.reshape(-1, 12, len(self.regions)).mean(axis = 1)
+        return self._annual
+
+    def normalised(self):
+        """
+        Returns a copy scaled so each region's long-run mean is 1.0 (for raw rainfall-type data).
+        """
+        values = np.asarray(self.values, dtype = float)
+        return ClimateSeries(values / values.mean(axis = 0), self.regions, self.start_year, self.frequency)
+
+# ------------------------
+# Block-Region Climate Input (19/10/2026)
+# A climate path is (years, regions). Blocks pick their region's column with a
+# single gather, giving the (years, blocks) factor matrix that replaces the
+# per-block N(1, 0.02) climate draws. Many paths stack along a leading axis.
+# ------------------------
+
+class ClimateInput:
+    """
+    Maps blocks to regions of a ClimateSeries and produces block-year climate factors.
+    """
+
+    def __init__(self, series, block_regions):
+        self.series = series
+        region_index = {name: i for i, name in enumerate(series.regions)}
+        try:
+            self.block_regions = np.array([
+                r if isinstance(r, (int, np.integer)) else region_index[r]
+                for r in block_regions
+            ], dtype = int)
+        except KeyError as e:
+            raise ValueError(f"Unknown region {e.args[0]!r}; series has {series.regions}") from None
+
+    @property
+    def num_blocks(self):
+        return len(self.block_regions)
+
+    def replay(self, simulation_years, start_year = None):
+        """
+        Returns the historical (simulation_years, regions) path starting at start_year.
+        """
+        annual = self.series.annual()
+        offset = 0 if start_year is None else start_year - self.series.start_year
+        if offset < 0 or offset + simulation_years > len(annual):
+            raise ValueError(
+                f"Series covers {self.series.start_year}-{self.series.start_year + len(annual) - 1}; "
+                f"cannot replay {simulation_years} years from {start_year}"
+            )
+        return np.asarray(annual[offset:offset + simulation_years], dtype = float)
+
+    def resample(self, simulation_years, n_paths, block_length = 1, seed = 0):
+        """
+        Returns (n_paths, simulation_years, regions) paths built by a moving-block
+        bootstrap of historical years. Whole years are drawn together, so the
+        correlation between regions is kept; block_length > 1 also keeps
+        year-to-year persistence (e.g. multi-year droughts).
+        """
+        annual = self.series.annual()
+        num_years = len(annual)
+        if block_length > num_years:
+            raise ValueError(f"block_length ({block_length}) exceeds the series length ({num_years})")
+
+        rng = np.random.default_rng(seed)
+        n_blocks = -(-simulation_years // block_length)
+        starts = rng.integers(0, num_years - block_length + 1, size = (n_paths, n_blocks))
+        year_index = (starts[:, :, None] + np.arange(block_length)).reshape(n_paths, -1)[:, :simulation_years]
+
+        # Only the sampled rows are read from the memory map
+        used, inverse = np.unique(year_index, return_inverse = True)
+        rows = np.asarray(annual[used], dtype = float)
+        return rows[inverse.reshape(year_index.shape)]
+
+    def block_factors(self, path):
+        """
+        Broadcasts a (..., years, regions) path to (..., years, blocks) climate factors.
+        """
+        return np.take(path, self.block_regions, axis = -1)
+
+# ------------------------
+# Climate Path Ensemble (19/10/2026)
+# Climate does not change block ages, so every path is a management row of one
+# sweep group (palmopsim_sweep.evaluate_group) with its own climate factors.
+# ------------------------
+
+def run_climate_ensemble(climate_input, paths, base_params = None):
+    """
+    Evaluates run_simulation's yield step for many climate paths at once.
+    paths: (n_paths, years, regions) from ClimateInput.resample / replay.
+    base_params: run_simulation arguments as in run_sweep; num_blocks and
+    simulation_years come from climate_input and paths, and climate_factors is
+    not allowed (the paths replace it).
+    Returns a dict with total_ffb (n_paths,), average_yield (n_paths,) and
+    annual_summary (n_paths, years).
+    """
+    paths = np.asarray(paths, dtype = float)
+    if paths.ndim == 2:
+        paths = paths[None]
+    n_paths, simulation_years, _ = paths.shape
+    num_blocks = climate_input.num_blocks
+
+    base_params = dict(base_params or {})
+    if base_params.get("climate_factors") is not None:
+        raise ValueError("run_climate_ensemble takes its climate from paths; remove climate_factors")
+    for name, value in (("num_blocks", num_blocks), ("simulation_years", simulation_years)):
+        if base_params.get(name, value) != value:
+            raise ValueError(f"base_params {name}={base_params[name]!r} does not match the climate input ({value})")
+    params = merge_base_params({**base_params, "num_blocks": num_blocks, "simulation_years": simulation_years})
+    (_, (estate, trajectory_key, management)), = group_parameter_sets([params])
+
+    extra_pest = 0.0
+    if estate["pest_model"] is not None:
+        extra_pest = 100 * estate["pest_model"].block_losses(simulation_years)
+
+    out = group_output_arrays(n_paths, simulation_years)
+    chunk = max(1, CHUNK_CELLS // (simulation_years * num_blocks))
+    for start in range(0, n_paths, chunk):
+        rows = slice(start, min(start + chunk, n_paths))
+        evaluate_group(
+            estate,
+            trajectory_key,
+            np.repeat(management, rows.stop - rows.start, axis = 0),
+            {name: values[rows] for name, values in out.items()},
+            extra_pest,
+            climate_input.block_factors(paths[rows])
+        )
+
+    return {name: out[name] for name in ("total_ffb", "average_yield", "annual_summary")}
@@ -0,0 +1,130 @@
+"""
+PalmOpsSim - Data View Layer
+Serves the block-year results table one page at a time. Filtering (by
+scenario, year, block) and aggregation run on the server, so only the
+visible window is sent to the browser.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+
+# Cached filter / aggregate results kept per view
+CACHE_SIZE = 32
+
+# ------------------------
+# Paginated Data View (19/10/2026)
+# Each index column gets a value -> row positions map, built once. A filter is
+# resolved to a sorted position array (cached per filter combination), after
+# which every page is a slice of that array: the cost of serving a page
+# depends on the page size, not on the table size.
+# ------------------------
+
+class DataView:
+    """
+    Paged, filterable, aggregatable view over a results DataFrame.
+    """
+
+    def __init__(self, df, index_columns = ("scenario", "Year", "Block")):
+        self.df = df.reset_index(drop = True)
+        self.index_columns = [c for c in index_columns if c in self.df.columns]
+        self.indexes = {col: self._build_index(self.df[col]) for col in self.index_columns}
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def _build_index(column):
+        codes, uniques = pd.factorize(column, sort = False)
+        order = np.argsort(codes, kind = "stable")
+        boundaries = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        return {
+            value: order[boundaries[i]:boundaries[i + 1]]
+            for i, value in enumerate(uniques.tolist())
+        }
+
+    def __len__(self):
+        return len(self.df)
+
+    def values(self, column):
+        """
+        Returns the distinct values of an index column, in order of first appearance.
+        """
+        return list(self.indexes[column])
+
+    def positions(self, filters = None):
+        """
+        Returns sorted row positions matching filters (column -> list of allowed values).
+        """
+        key = self._filter_key(filters)
+        if key is None:
+            return None
+        if ("rows", key) in self._cache:
+            self._cache.move_to_end(("rows", key))
+            return self._cache[("rows", key)]
+
+        selected = None
+        for column, allowed in key:
+            if column not in self.indexes:
+                raise KeyError(f"{column!r} is not an indexed column: {self.index_columns}")
+            index = self.indexes[column]
+            parts = [index[v] for v in allowed if v in index]
+            matches = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype = int)
+            selected = matches if selected is None else np.intersect1d(selected, matches, assume_unique = True)
+
+        self._remember(("rows", key), selected)
+        return selected
+
+    def count(self, filters = None):
+        rows = self.positions(filters)
+        return len(self.df) if rows is None else len(rows)
+
+    def num_pages(self, page_size = DEFAULT_PAGE_SIZE, filters = None):
+        return max(1, -(-self.count(filters) // page_size))
+
+    def page(self, page_number = 1, page_size = DEFAULT_PAGE_SIZE, filters = None):
+        """
+        Returns one page (1-based) of filtered rows as a DataFrame.
+        """
+        start = (page_number - 1) * page_size
+        stop = start + page_size
+        rows = self.positions(filters)
+        if rows is None:
+            return self.df.iloc[start:stop]
+        return self.df.iloc[rows[start:stop]]
+
+    def aggregate(self, by, value_columns = ("FFB_t_ha", "Total_FFB_t"), agg = "sum", filters = None):
+        """
+        Returns filtered rows grouped by one or more columns (cached per request).
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        key = ("agg", tuple(by), tuple(value_columns), agg, self._filter_key(filters))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        rows = self.positions(filters)
+        source = self.df if rows is None else self.df.iloc[rows]
+        result = source.groupby(by, sort = False)[list(value_columns)].agg(agg).reset_index()
+        self._remember(key, result)
+        return result
+
+    @staticmethod
+    def _filter_key(filters):
+        # Normalise to a hashable key; empty / missing selections mean "no filter"
+        items = []
+        for column, allowed in (filters or {}).items():
+            if allowed is None:
+                continue
+            if not isinstance(allowed, (list, tuple, set, np.ndarray, pd.Index)):
+                allowed = [allowed]
+            if len(allowed) == 0:
+                continue
+            items.append((column, tuple(sorted(allowed, key = str))))
+        return tuple(sorted(items)) or None
+
+    def _remember(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last = False)
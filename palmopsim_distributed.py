@@ -0,0 +1,372 @@
+"""
+PalmOpsSim - Distributed Execution
+Coordinator / worker backend for studies too large for one machine. The
+coordinator splits (parameter sets x seeds) into work units and hands them to
+worker processes over TCP (multiprocessing.connection, HMAC-authenticated).
+Workers return compact summary arrays; the coordinator places each unit's
+block by its index, so the merged result does not depend on which worker ran
+what. Units held by a lost worker are re-queued.
+
+Start a coordinator-side run with run_distributed(...) and the same
+PALMOPSIM_AUTHKEY set; on each node run
+    PALMOPSIM_AUTHKEY=<secret> python palmopsim_distributed.py worker --host <coordinator> --port 8766
+Messages are pickled: only use on trusted networks with a secret authkey.
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from palmopsim_metrics import WORKER_BUSY_SECONDS, WORKERS, record_simulations
+from palmopsim_sweep import KPI_NAMES, SERIES_NAMES, group_parameter_sets, resolve_parameter_set, run_groups
+
+DEFAULT_PORT = 8766
+AUTHKEY_ENV = "PALMOPSIM_AUTHKEY"
+
+# ------------------------
+# Work Units (19/10/2026)
+# A unit is a chunk of parameter sets x a chunk of seeds. Every parameter set
+# in a chunk is run for every seed, as one batch of shared-trajectory groups.
+# ------------------------
+
+def make_units(param_sets, seeds, params_per_unit = 16, seeds_per_unit = 100):
+    """
+    Splits param_sets x seeds into work units. Returns a list of
+    (param_slice, seed_slice, unit) with slices into the merged result.
+    """
+    seeds = list(seeds)
+    units = []
+    for p_start in range(0, len(param_sets), params_per_unit):
+        for s_start in range(0, len(seeds), seeds_per_unit):
+            param_slice = slice(p_start, min(p_start + params_per_unit, len(param_sets)))
+            seed_slice = slice(s_start, min(s_start + seeds_per_unit, len(seeds)))
+            unit = {"param_sets": param_sets[param_slice], "seeds": seeds[seed_slice]}
+            units.append((param_slice, seed_slice, unit))
+    return units
+
+def evaluate_unit(unit):
+    """
+    Runs one work unit in-process. Returns KPI arrays shaped (params, seeds)
+    and annual series shaped (params, seeds, years).
+    """
+    started = time.perf_counter()
+    param_sets, seeds = unit["param_sets"], unit["seeds"]
+    runs = [{**params, "random_seed": seed} for params in param_sets for seed in seeds]
+    grouped = group_parameter_sets(runs)
+    outputs = run_groups([task for _, task in grouped], max_workers = 1, pool = "distributed")
+
+    shape = (len(param_sets), len(seeds))
+    result = {}
+    for name in KPI_NAMES + SERIES_NAMES:
+        first = outputs[0][name]
+        merged = np.empty((len(runs),) + first.shape[1:], dtype = first.dtype)
+        for (positions, _), output in zip(grouped, outputs):
+            merged[positions] = output[name]
+        result[name] = merged.reshape(shape + first.shape[1:])
+    result["block_years"] = sum(output["block_years"] for output in outputs)
+    result["busy_seconds"] = time.perf_counter() - started
+    return result
+
+# ------------------------
+# Worker (19/10/2026)
+# Protocol: the coordinator sends a unit dict, the worker answers with
+# ("ok", result) or ("error", message); None tells the worker to exit.
+# ------------------------
+
+def run_worker(address, authkey):
+    """
+    Connects to a coordinator and evaluates units until told to stop.
+    """
+    with Client(tuple(address), authkey = authkey) as conn:
+        while True:
+            try:
+                unit = conn.recv()
+            except EOFError:
+                return
+            if unit is None:
+                return
+            try:
+                conn.send(("ok", evaluate_unit(unit)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+def _run_local_worker(address, authkey):
+    # A replacement worker may start after the run has finished and the coordinator closed
+    try:
+        run_worker(address, authkey)
+    except (ConnectionRefusedError, ConnectionResetError, EOFError):
+        pass
+
+def spawn_local_workers(address, authkey, count):
+    """
+    Starts count worker processes on this machine (stand-ins for nodes).
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(count):
+        process = context.Process(target = _run_local_worker, args = (address, authkey), daemon = True)
+        process.start()
+        processes.append(process)
+    return processes
+
+# ------------------------
+# Coordinator (19/10/2026)
+# One handler thread per connected worker pulls the next pending unit, sends
+# it and waits for the answer. A dropped connection or a unit exceeding
+# unit_timeout marks the worker lost and puts the unit back in the queue.
+# ------------------------
+
+class UnitFailed(RuntimeError):
+    """
+    A work unit raised an error on a worker or was lost too many times.
+    """
+
+class Coordinator:
+    """
+    Hands work units to connected workers and collects their results.
+    """
+
+    def __init__(self, address = ("127.0.0.1", 0), authkey = None, unit_timeout = None, max_attempts = 3):
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.listener = Listener(tuple(address), authkey = self.authkey)
+        self.address = self.listener.address
+        self.unit_timeout = unit_timeout
+        self.max_attempts = max_attempts
+        self._condition = threading.Condition()
+        self._pending = []
+        self._results = {}
+        self._attempts = {}
+        self._error = None
+        self._closed = False
+        self._workers = 0
+        self.lost_workers = 0
+        self._accept_thread = threading.Thread(target = self._accept, name = "palmopsim-coordinator", daemon = True)
+        self._accept_thread.start()
+
+    @property
+    def connected_workers(self):
+        with self._condition:
+            return self._workers
+
+    def close(self):
+        """
+        Stops accepting workers and tells connected workers to exit.
+        """
+        with self._condition:
+            self._closed = True
+            self._pending = []
+            self._condition.notify_all()
+        self.listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, units, on_idle = None, poll_interval = 0.5, worker_timeout = None):
+        """
+        Evaluates units on connected workers; returns their results in unit order.
+        on_idle() is called every poll_interval seconds while waiting (e.g. to replace dead local workers).
+        worker_timeout: raise UnitFailed once no worker has been connected for this many seconds.
+        """
+        with self._condition:
+            self._results = {}
+            self._attempts = {index: 0 for index in range(len(units))}
+            self._pending = list(enumerate(units))
+            self._error = None
+            self._condition.notify_all()
+            last_connected = time.monotonic()
+            while len(self._results) < len(units) and self._error is None:
+                self._condition.wait(poll_interval)
+                if self._workers:
+                    last_connected = time.monotonic()
+                elif worker_timeout is not None and time.monotonic() - last_connected > worker_timeout:
+                    raise UnitFailed(f"No worker connected for {worker_timeout} s with units remaining")
+                if on_idle is not None:
+                    self._condition.release()
+                    try:
+                        on_idle()
+                    finally:
+                        self._condition.acquire()
+            if self._error is not None:
+                raise UnitFailed(self._error)
+            return [self._results[index] for index in range(len(units))]
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                if self._closed:
+                    return
+                continue # Failed handshake (e.g. wrong authkey or dropped client)
+            threading.Thread(target = self._serve, args = (conn,), daemon = True).start()
+
+    def _next_unit(self):
+        with self._condition:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            return self._pending.pop(0)
+
+    def _serve(self, conn):
+        with self._condition:
+            self._workers += 1
+            WORKERS.labels(pool = "distributed").set(self._workers)
+        try:
+            while True:
+                item = self._next_unit()
+                if item is None:
+                    try:
+                        conn.send(None)
+                    except OSError:
+                        pass
+                    return
+                index, unit = item
+                try:
+                    conn.send(unit)
+                    if self.unit_timeout is not None and not conn.poll(self.unit_timeout):
+                        raise TimeoutError(f"unit {index} timed out")
+                    status, payload = conn.recv()
+                except (EOFError, OSError, TimeoutError):
+                    self._requeue(index, unit)
+                    return
+                self._store(index, status, payload)
+        finally:
+            conn.close()
+            with self._condition:
+                self._workers -= 1
+                WORKERS.labels(pool = "distributed").set(self._workers)
+
+    def _requeue(self, index, unit):
+        with self._condition:
+            self.lost_workers += 1
+            self._attempts[index] += 1
+            if self._attempts[index] >= self.max_attempts:
+                self._error = f"unit {index} lost {self._attempts[index]} times"
+            else:
+                self._pending.insert(0, (index, unit))
+            self._condition.notify_all()
+
+    def _store(self, index, status, payload):
+        with self._condition:
+            if status == "ok":
+                self._results[index] = payload
+                WORKER_BUSY_SECONDS.labels(pool = "distributed").inc(payload["busy_seconds"])
+                record_simulations("distributed", payload["total_ffb"].size, payload["block_years"])
+            else:
+                self._error = f"unit {index} failed on worker: {payload}"
+            self._condition.notify_all()
+
+# ------------------------
+# Distributed Runs (19/10/2026)
+# ------------------------
+
+def merge_unit_results(units, results, num_params, num_seeds):
+    """
+    Places each unit's arrays at its (parameter, seed) slices of the full result.
+    """
+    merged = {}
+    for (param_slice, seed_slice, _), result in zip(units, results):
+        for name in KPI_NAMES + SERIES_NAMES:
+            values = result[name]
+            if name not in merged:
+                merged[name] = np.empty((num_params, num_seeds) + values.shape[2:], dtype = values.dtype)
+            merged[name][param_slice, seed_slice] = values
+    return merged
+
+def run_distributed(
+        param_sets,
+        seeds,
+        local_workers = None,
+        address = None,
+        authkey = None,
+        params_per_unit = 16,
+        seeds_per_unit = 100,
+        unit_timeout = None,
+        max_attempts = 3,
+        worker_timeout = 60
+):
+    """
+    Runs every parameter set in param_sets for every seed in seeds on workers.
+    local_workers: worker processes to start on this machine (None = one per
+    CPU, 0 = only remote workers started with the worker command).
+    Dead local workers are replaced while units remain.
+    address: where the coordinator listens (default 127.0.0.1 on a free port,
+    or all interfaces on DEFAULT_PORT when local_workers is 0).
+    authkey: bytes shared with the workers (default PALMOPSIM_AUTHKEY, else a
+    random key, which only local workers can know).
+    worker_timeout: seconds without any connected worker before UnitFailed.
+    Returns a dict with total_ffb, average_yield, old_blocks shaped
+    (len(param_sets), len(seeds)), annual_summary / annual_yield shaped
+    (len(param_sets), len(seeds), years), plus seeds and lost_workers.
+    """
+    seeds = list(seeds)
+    if local_workers is None:
+        local_workers = os.cpu_count() or 1
+    if authkey is None and os.environ.get(AUTHKEY_ENV):
+        authkey = os.environ[AUTHKEY_ENV].encode("utf-8")
+    if local_workers == 0:
+        if authkey is None:
+            raise ValueError(f"Remote workers need a shared authkey: pass authkey or set {AUTHKEY_ENV}")
+        if address is None:
+            address = ("0.0.0.0", DEFAULT_PORT)
+    elif address is None:
+        address = ("127.0.0.1", 0)
+    # Scenarios are resolved here, so workers need not share this process's scenario registry
+    param_sets = [resolve_parameter_set(params) for params in param_sets]
+    units = make_units(param_sets, seeds, params_per_unit, seeds_per_unit)
+
+    with Coordinator(address, authkey, unit_timeout, max_attempts) as coordinator:
+        host, port = coordinator.address
+        local_address = ("127.0.0.1" if host in ("0.0.0.0", "") else host, port)
+        processes = spawn_local_workers(local_address, coordinator.authkey, local_workers)
+        respawns = itertools.count()
+
+        def replace_dead_workers():
+            for i, process in enumerate(processes):
+                if not process.is_alive() and next(respawns) < local_workers * max_attempts:
+                    processes[i] = spawn_local_workers(local_address, coordinator.authkey, 1)[0]
+            if local_workers and coordinator.connected_workers == 0 and not any(p.is_alive() for p in processes):
+                raise UnitFailed("All local workers exited and the restart limit was reached")
+
+        try:
+            results = coordinator.run(
+                [unit for _, _, unit in units],
+                on_idle = replace_dead_workers,
+                worker_timeout = worker_timeout
+            )
+        finally:
+            coordinator.close()
+            for process in processes:
+                process.join(timeout = 5)
+                if process.is_alive():
+                    process.terminate()
+
+    merged = merge_unit_results(units, results, len(param_sets), len(seeds))
+    merged["seeds"] = np.array(seeds)
+    merged["lost_workers"] = coordinator.lost_workers
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description = "PalmOpsSim distributed worker")
+    parser.add_argument("role", choices = ["worker"])
+    parser.add_argument("--host", default = "127.0.0.1", help = "Coordinator host")
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    args = parser.parse_args()
+
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        parser.error(f"Set {AUTHKEY_ENV} to the coordinator's authkey")
+    run_worker((args.host, args.port), authkey.encode("utf-8"))
+
+if __name__ == "__main__":
+    main()
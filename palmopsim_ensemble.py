@@ -0,0 +1,148 @@
+"""
+PalmOpsSim - Monte Carlo Ensembles
+Runs replicates of run_simulation over random seeds and stops adding
+replicates once each requested KPI is known to a target precision.
+Contains simulation logic only (no printing, no plotting, no exports)
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from palmopsim_sweep import run_sweep, KPI_NAMES, SERIES_NAMES
+
+# ------------------------
+# Confidence Interval Helpers (19/10/2026)
+# ------------------------
+
+def confidence_half_width(samples, confidence = 0.95):
+    """
+    Half-width of the normal-approximation confidence interval of the mean.
+    samples: (n,) or (n, k) array; returns a scalar or (k,) array.
+    """
+    n = len(samples)
+    if n < 2:
+        return np.full(np.shape(samples)[1:], np.inf)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return z * np.std(samples, axis = 0, ddof = 1) / math.sqrt(n)
+
+def _precision(samples, confidence, relative):
+    # Worst-case (largest) half-width across the KPI's elements, e.g. across years
+    half_width = np.atleast_1d(confidence_half_width(samples, confidence))
+    if relative:
+        mean = np.abs(np.atleast_1d(np.mean(samples, axis = 0)))
+        half_width = np.where(mean > 0, half_width / np.where(mean > 0, mean, 1), 0.0)
+    return float(np.max(half_width))
+
+# ------------------------
+# Adaptive Ensemble Runner (19/10/2026)
+# After each batch the replicate count needed to reach the tolerance is
+# estimated from the current spread (n_needed = n * (precision / tolerance)^2),
+# so the next batch jumps straight towards it instead of creeping up.
+# ------------------------
+
+def run_adaptive_ensemble(
+        base_params = None,
+        kpis = ("total_ffb", "average_yield"),
+        tolerance = 0.005,
+        relative = True,
+        confidence = 0.95,
+        batch_size = 10,
+        min_replicates = 10,
+        max_replicates = 2000,
+        first_seed = 0,
+        max_workers = 1,
+        antithetic = False
+):
+    """
+    Adds seed replicates in batches until the confidence interval of every KPI
+    in kpis is within tolerance (half-width, relative to the mean when relative=True).
+    kpis may include total_ffb, average_yield, old_blocks, annual_summary, annual_yield;
+    for annual series the widest year decides.
+    max_workers is passed to run_sweep for each batch.
+    antithetic=True runs each seed as an antithetic pair (noise_mode="crn") and
+    treats the pair average as one replicate.
+    Returns a dict with: replicates, converged, precision (per KPI), summary
+    (mean / CI per scalar KPI), annual (mean / CI per year), samples.
+    """
+    for kpi in kpis:
+        if kpi not in KPI_NAMES + SERIES_NAMES:
+            raise ValueError(f"Unknown KPI {kpi!r}; choose from {KPI_NAMES + SERIES_NAMES}")
+
+    base_params = dict(base_params or {})
+    axes = {}
+    if antithetic:
+        base_params["noise_mode"] = "crn"
+        axes["antithetic"] = [False, True]
+    samples = {kpi: [] for kpi in KPI_NAMES + SERIES_NAMES}
+    n = 0
+    next_batch = max(batch_size, min_replicates)
+    precision = {}
+    converged = False
+
+    while n < max_replicates:
+        seeds = list(range(first_seed + n, first_seed + n + min(next_batch, max_replicates - n)))
+        sweep = run_sweep({"random_seed": seeds, **axes}, base_params, max_workers = max_workers)
+        for kpi in KPI_NAMES:
+            values = sweep.kpis[kpi]
+            samples[kpi].append(values.mean(axis = 1) if antithetic else values)
+        for kpi in SERIES_NAMES:
+            values = sweep.series[kpi]
+            samples[kpi].append(values.mean(axis = 1) if antithetic else values)
+        n += len(seeds)
+
+        stacked = {kpi: np.concatenate(samples[kpi]) for kpi in kpis}
+        precision = {kpi: _precision(stacked[kpi], confidence, relative) for kpi in kpis}
+        if n >= min_replicates and all(p <= tolerance for p in precision.values()):
+            converged = True
+            break
+
+        # Estimate the total replicate count the slowest KPI still needs
+        worst = max(precision.values())
+        needed = math.ceil(n * (worst / tolerance) ** 2) if math.isfinite(worst) else n + batch_size
+        next_batch = max(batch_size, needed - n)
+
+    all_samples = {kpi: np.concatenate(samples[kpi]) for kpi in samples}
+    return {
+        "replicates": n,
+        "simulations": 2 * n if antithetic else n,
+        "converged": converged,
+        "tolerance": tolerance,
+        "relative": relative,
+        "confidence": confidence,
+        "precision": precision,
+        "summary": _summarise_kpis(all_samples, confidence),
+        "annual": _summarise_series(all_samples["annual_summary"], confidence),
+        "samples": pd.DataFrame({
+            "random_seed": np.arange(first_seed, first_seed + n),
+            **{kpi: all_samples[kpi] for kpi in KPI_NAMES}
+        })
+    }
+
+def _summarise_kpis(samples, confidence):
+    rows = []
+    for kpi in KPI_NAMES:
+        values = samples[kpi].astype(float)
+        mean = values.mean()
+        half_width = confidence_half_width(values, confidence)
+        rows.append({
+            "KPI": kpi,
+            "Mean": mean,
+            "Std": values.std(ddof = 1) if len(values) > 1 else np.nan,
+            "CI_Low": mean - half_width,
+            "CI_High": mean + half_width,
+            "Half_Width": half_width
+        })
+    return pd.DataFrame(rows).set_index("KPI")
+
+def _summarise_series(values, confidence):
+    mean = values.mean(axis = 0)
+    half_width = confidence_half_width(values, confidence)
+    return pd.DataFrame({
+        "Year": np.arange(1, values.shape[1] + 1),
+        "Mean": mean,
+        "CI_Low": mean - half_width,
+        "CI_High": mean + half_width
+    }).set_index("Year")
@@ -0,0 +1,366 @@
+"""
+PalmOpsSim - Operational Metrics
+In-process metrics registry (counters, gauges, histograms) for simulation
+throughput, latency, cache efficiency and worker utilisation, exportable in
+Prometheus text format to a file or a local HTTP endpoint.
+Recording a sample is a lock plus a few additions, cheap enough to stay on.
+"""
+
+import bisect
+import functools
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# ------------------------
+# Metric Types (19/10/2026)
+# ------------------------
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, **labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            if key not in self._children:
+                self._children[key] = self._new_child()
+            return self._children[key]
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def _label_text(self, key, extra = ()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return "{" + body + "}"
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation, quotes = False)}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = float(value)
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    """
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount = 1.0):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{self._label_text(key)} {_format(child.value)}"]
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+    """
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value):
+        self._default().set(value)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{self._label_text(key)} {_format(child.value)}"]
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation inside buckets (as Prometheus does).
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return math.nan
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+class Histogram(_Metric):
+    """
+    Distribution of observations in cumulative buckets (e.g. latency in seconds).
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames = (), buckets = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == math.inf else _format(bound)
+            lines.append(f"{self.name}_bucket{self._label_text(key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+def _format(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value, quotes = True):
+    # Label values escape backslash, newline and double quote; HELP text only the first two
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+# ------------------------
+# Registry and Export (19/10/2026)
+# ------------------------
+
+class MetricsRegistry:
+    """
+    Named collection of metrics rendered together in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type/labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames = ()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames = ()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames = (), buckets = DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Atomically writes the Prometheus text format to path (node_exporter textfile collector style).
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory, prefix = ".palmopsim_metrics_")
+        try:
+            with os.fdopen(fd, "w", encoding = "utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def start_http_server(self, port = 9108, host = "127.0.0.1"):
+        """
+        Serves GET /metrics from a background thread. Returns the server (call shutdown() to stop).
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                data = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target = server.serve_forever, name = "palmopsim-metrics", daemon = True).start()
+        return server
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Process-wide default registry
+REGISTRY = MetricsRegistry()
+
+# ------------------------
+# PalmOpsSim Metrics (19/10/2026)
+# entry_point: run_simulation, run_sensitivity_analysis, run_sweep,
+# strategy_comparison, ... ; pool: sweep, service, ...
+# ------------------------
+
+SIMULATIONS = REGISTRY.counter(
+    "palmopsim_simulations_total",
+    "Simulations completed (one per parameter set evaluated).",
+    ["entry_point"]
+)
+BLOCK_YEARS = REGISTRY.counter(
+    "palmopsim_block_years_total",
+    "Block-years simulated.",
+    ["entry_point"]
+)
+LATENCY = REGISTRY.histogram(
+    "palmopsim_latency_seconds",
+    "Wall-clock latency per entry point call.",
+    ["entry_point"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "palmopsim_cache_requests_total",
+    "Cache lookups by cache and result (hit / miss).",
+    ["cache", "result"]
+)
+WORKERS = REGISTRY.gauge(
+    "palmopsim_workers",
+    "Worker slots available in a pool.",
+    ["pool"]
+)
+WORKER_TASKS_IN_FLIGHT = REGISTRY.gauge(
+    "palmopsim_worker_tasks_in_flight",
+    "Tasks currently submitted to a pool and not yet finished.",
+    ["pool"]
+)
+WORKER_BUSY_SECONDS = REGISTRY.counter(
+    "palmopsim_worker_busy_seconds_total",
+    "Seconds workers spent executing tasks; utilisation = rate(busy) / workers.",
+    ["pool"]
+)
+
+def record_simulations(entry_point, count, block_years):
+    SIMULATIONS.labels(entry_point = entry_point).inc(count)
+    BLOCK_YEARS.labels(entry_point = entry_point).inc(block_years)
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache = cache, result = "hit" if hit else "miss").inc()
+
+def timed(entry_point):
+    """
+    Context manager recording the enclosed block's latency under entry_point.
+    """
+    return LATENCY.labels(entry_point = entry_point).time()
+
+def instrumented(entry_point):
+    """
+    Decorator recording each call's latency under entry_point.
+    """
+    def decorator(function):
+        latency = LATENCY.labels(entry_point = entry_point)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                latency.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
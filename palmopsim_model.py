@@ -4,9 +4,15 @@ Refactored from Phase 3 Prototype
 Contains simulation logic only (no printing, no plotting, no exports)
 """
 
+import inspect
+import json
+import os
+
 import numpy as np
 import pandas as pd
 
+from palmopsim_metrics import instrumented, record_simulations
+
 # ------------------------
 # Yield Behaviour Function (15/2/2026)
 # Phase 5 Implementation (16/2/2026): Change to a smoother piecewise curve
@@ -32,6 +38,342 @@ def base_yield_by_age(age):
     else:
         return 0                        # Economically unproductive (>28 yrs)
     
+# Implementation (19/10/2026): Vectorised age-yield curve for block arrays
+def base_yield_by_age_array(ages):
+    """
+    Array version of base_yield_by_age. Accepts any array of palm ages and
+    returns the baseline FFB yield (t/ha) element-wise.
+    """
+    ages = np.asarray(ages)
+    return np.select(
+        [ages < 3, ages < 6, ages <= 9, ages <= 18, ages <= 28],
+        [0, 8 + (ages - 3) * 4, 20 + (ages - 6) * 2, 26, 26 - (ages - 18) * 1.0],
+        default = 0
+    ).astype(float)
+
+# ------------------------
+# Scenario Configuration (15/2/2026)
+# Moved out of run_simulation (19/10/2026) so sweeps can resolve scenarios up front
+# Scenario Registry (19/10/2026): scenarios are data - add more with
+# register_scenario, or from a JSON file via load_scenarios / PALMOPSIM_SCENARIOS_FILE
+# ------------------------
+
+SCENARIOS_FILE_ENV = "PALMOPSIM_SCENARIOS_FILE"
+
+# Make replanting rate scenario dependent
+SCENARIOS = {
+    "Conservative": {
+        "yield_adjustment": -0.10,
+        "replant_rate": 0.03, # Slow replanting - cost cautious
+        "description": "Lower yield assumption (-10%). Risk-averse planning."
+    },
+    "Moderate": {
+        "yield_adjustment": 0.00,
+        "replant_rate": 0.05, # Standard replanting program
+        "description": "Baseline yield assumption (0%). Standard operations."
+    },
+    "Aggressive": {
+        "yield_adjustment": 0.10,
+        "replant_rate": 0.08, # Fast replanting  - Investing in future yield
+        "description": "Higher yield assumption (+10%). Optimistic strategy."
+    }
+}
+
+def register_scenario(name, yield_adjustment, replant_rate, description = ""):
+    """
+    Adds (or replaces) a named scenario in SCENARIOS.
+    yield_adjustment: fractional yield change (e.g. 0.05 = +5%).
+    replant_rate: share of blocks replanted per year once overaged.
+    """
+    yield_adjustment, replant_rate = float(yield_adjustment), float(replant_rate)
+    if yield_adjustment <= -1:
+        raise ValueError(f"yield_adjustment must be above -1, got {yield_adjustment}")
+    if not 0 <= replant_rate <= 1:
+        raise ValueError(f"replant_rate must be between 0 and 1, got {replant_rate}")
+    SCENARIOS[str(name)] = {
+        "yield_adjustment": yield_adjustment,
+        "replant_rate": replant_rate,
+        "description": str(description)
+    }
+
+def load_scenarios(path):
+    """
+    Registers scenarios from a JSON file of the form
+    {"name": {"yield_adjustment": 0.05, "replant_rate": 0.04, "description": "..."}}.
+    Returns the names loaded.
+    """
+    with open(path, encoding = "utf-8") as f:
+        definitions = json.load(f)
+    if not isinstance(definitions, dict):
+        raise ValueError(f"{path}: expected a JSON object of scenario definitions")
+    for name, definition in definitions.items():
+        try:
+            register_scenario(name, **definition)
+        except TypeError as e:
+            raise ValueError(f"{path}: invalid definition for scenario {name!r}: {e}") from e
+    return list(definitions)
+
+if os.environ.get(SCENARIOS_FILE_ENV):
+    load_scenarios(os.environ[SCENARIOS_FILE_ENV])
+
+def resolve_scenario(scenario_name, replant_rate = None, yield_adjustment = None):
+    """
+    Returns (yield_adjustment, replant_rate) for a registered scenario.
+    An explicit replant_rate or yield_adjustment overrides the scenario default;
+    with both given the registry is not consulted (e.g. in a worker process that
+    never registered the scenario).
+    """
+    if yield_adjustment is not None and replant_rate is not None:
+        return yield_adjustment, replant_rate
+    if scenario_name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {scenario_name!r}; choose from {list(SCENARIOS)}")
+    scenario = SCENARIOS[scenario_name]
+    if yield_adjustment is None:
+        yield_adjustment = scenario["yield_adjustment"]
+    if replant_rate is None:
+        replant_rate = scenario["replant_rate"]
+
+    return yield_adjustment, replant_rate
+
+# ------------------------
+# Simulation Kernels (19/10/2026)
+# The per-block loop is split into two array steps:
+#   1. simulate_trajectory - block ages and random noise for every block-year.
+#      Depends only on the seed, estate size, horizon and replanting rate.
+#   2. block_yields - the closed-form yield step for any management inputs.
+# Management inputs never feed back into ages or noise, so one trajectory can be
+# shared by every fertilizer / climate / pest / harvest combination.
+# Random draws are taken in the same order as the original per-block loop,
+# so results are unchanged for a given random_seed.
+# ------------------------
+
+# ------------------------
+# Common Random Numbers (19/10/2026)
+# In "legacy" noise mode all draws come from one sequential stream, so anything
+# that changes the number of draws (e.g. a different replant_rate shuffling a
+# different number of blocks) misaligns every later draw between compared runs.
+# In "crn" mode each draw is keyed by (seed, stream, year) and indexed by block,
+# so the same block-year always gets the same noise regardless of draw order,
+# replanting, estate size or horizon. antithetic=True mirrors every draw
+# (z -> -z, u -> 1 - u) for antithetic-pair ensembles.
+# ------------------------
+
+NOISE_MODES = ("legacy", "crn")
+CRN_STREAMS = {"initial_age": 0, "climate": 1, "variation": 2, "replant": 3}
+
+def keyed_generator(random_seed, stream, year):
+    """
+    Returns the generator for one (seed, stream, year) key.
+    """
+    return np.random.Generator(
+        np.random.PCG64(np.random.SeedSequence([random_seed, CRN_STREAMS[stream], year]))
+    )
+
+def keyed_normals(random_seed, stream, year, num_blocks, antithetic = False):
+    z = keyed_generator(random_seed, stream, year).standard_normal(num_blocks)
+    return -z if antithetic else z
+
+def keyed_uniforms(random_seed, stream, year, num_blocks, antithetic = False):
+    u = keyed_generator(random_seed, stream, year).random(num_blocks)
+    return 1.0 - u if antithetic else u
+
+def simulate_trajectory(
+        num_blocks = 10,
+        simulation_years = 10,
+        initial_age_range = (3, 25),
+        random_seed = 42,
+        replant_rate = 0.05,
+        start_state = None,
+        noise_mode = "legacy",
+        antithetic = False
+):
+    """
+    Simulates block ages, climate noise and per-block variation.
+    Returns a dict of (years, num_blocks) arrays: ages, planted_years,
+    climate_noise, block_variation, plus "state" - a snapshot of the block
+    arrays and RNG at the end of the horizon.
+    If start_state is given, the simulation continues from that snapshot up to
+    simulation_years and the arrays only cover the new years.
+    noise_mode: "legacy" (sequential draws) or "crn" (draws keyed by block and
+    year); antithetic mirrors all draws and needs noise_mode="crn".
+    """
+    if noise_mode not in NOISE_MODES:
+        raise ValueError(f"noise_mode must be one of {NOISE_MODES}, got {noise_mode!r}")
+    if antithetic and noise_mode != "crn":
+        raise ValueError("antithetic draws need noise_mode='crn'")
+    keyed = noise_mode == "crn"
+
+    if start_state is None:
+        rng = None if keyed else np.random.RandomState(random_seed)
+
+        # Initialize plantation blocks
+        low, high = initial_age_range
+        if keyed:
+            u = keyed_uniforms(random_seed, "initial_age", 0, num_blocks, antithetic)
+            ages = np.minimum(low + np.floor(u * (high - low + 1)).astype(int), high)
+        else:
+            ages = rng.randint(low, high + 1, size = num_blocks)
+        planted_year = np.zeros(num_blocks, dtype = int) # Track year of planting for replanting logic
+        start_year = 0
+    else:
+        if len(start_state["ages"]) != num_blocks:
+            raise ValueError(
+                f"start_state has {len(start_state['ages'])} blocks, expected {num_blocks}"
+            )
+        if keyed:
+            rng = None
+        else:
+            rng = np.random.RandomState()
+            rng.set_state(start_state["rng_state"])
+        ages = start_state["ages"].copy()
+        planted_year = start_state["planted_years"].copy()
+        start_year = start_state["year"]
+
+    if simulation_years < start_year:
+        raise ValueError(
+            f"simulation_years ({simulation_years}) is before the start_state year ({start_year})"
+        )
+    new_years = simulation_years - start_year
+
+    age_history = np.empty((new_years, num_blocks), dtype = int)
+    planted_history = np.empty((new_years, num_blocks), dtype = int)
+    climate_noise = np.empty((new_years, num_blocks))
+    block_variation = np.empty((new_years, num_blocks))
+
+    # Replant only limited number (e.g. 5% of total blocks)
+    max_replant = max(1, round(replant_rate * num_blocks))
+
+    for year_idx in range(new_years):
+        year = start_year + year_idx + 1
+        age_history[year_idx] = ages
+        planted_history[year_idx] = planted_year
+
+        if keyed:
+            climate_z = keyed_normals(random_seed, "climate", year, num_blocks, antithetic)
+            variation_z = keyed_normals(random_seed, "variation", year, num_blocks, antithetic)
+        else:
+            # One climate draw then one block-variation draw per block, as in the per-block loop
+            noise = rng.standard_normal(2 * num_blocks).reshape(num_blocks, 2)
+            climate_z, variation_z = noise[:, 0], noise[:, 1]
+        climate_noise[year_idx] = 1.0 + 0.02 * climate_z
+        block_variation[year_idx] = 1.0 + 0.03 * variation_z # Small per-block noise
+
+        ages = ages + 1
+
+        # Identify overaged blocks
+        overaged_blocks = np.flatnonzero(ages > 28)
+
+        if len(overaged_blocks) > 0:
+            if keyed:
+                # Random order from a keyed priority per block, instead of a shuffle
+                priority = keyed_uniforms(random_seed, "replant", year, num_blocks, antithetic)
+                overaged_blocks = overaged_blocks[np.argsort(priority[overaged_blocks], kind = "stable")]
+            else:
+                rng.shuffle(overaged_blocks)
+            ages[overaged_blocks[:max_replant]] = 0
+
+    return {
+        "ages": age_history,
+        "planted_years": planted_history,
+        "climate_noise": climate_noise,
+        "block_variation": block_variation,
+        "state": {
+            "year": simulation_years,
+            "ages": ages.copy(),
+            "planted_years": planted_year.copy(),
+            "rng_state": None if keyed else rng.get_state()
+        }
+    }
+
+def block_yields(
+        ages,
+        climate_noise,
+        block_variation,
+        yield_adjustment = 0.0,
+        fertilizer = 0,
+        harvest_interval = 12,
+        climate_slider = 0,
+        pest_slider = 5
+):
+    """
+    Returns FFB yield (t/ha) for every block-year of a trajectory.
+    Management inputs may be scalars or arrays shaped (n, 1, 1) to evaluate
+    n parameter sets against the same trajectory in one pass; pest_slider may
+    also be a per block-year array.
+    """
+    base_yield = base_yield_by_age_array(ages)
+    climate_factor = climate_noise * (1 + (climate_slider / 100) * (ages / 20))
+
+    # Diminishing returns: Doubling fertilizer does not double yield (Phase 5, Improvement 2)
+    fertilizer_response = 1 + (0.6 * (fertilizer / (100 + np.abs(fertilizer))))
+    adjusted_yield = base_yield * (1 + yield_adjustment) * fertilizer_response
+
+    harvest_efficiency = 1.0 - (harvest_interval - 6) * 0.01
+    pest_pressure = pest_slider / 100 # Deterministic from slider
+
+    yield_t_ha = np.maximum(adjusted_yield * climate_factor * block_variation, 0)
+    yield_t_ha = yield_t_ha * harvest_efficiency
+    yield_t_ha = yield_t_ha * (1 - pest_pressure * (1 + adjusted_yield / 50))
+    return yield_t_ha
+
+# ------------------------
+# Analytic Yield Derivatives (19/10/2026)
+# With the trajectory fixed, yield is a closed-form product of its factors:
+#   Y = max(A * C * V, 0) * H * (1 - p * (1 + A / 50))
+# A = base * (1 + yield_adjustment) * fertilizer_response, C = climate factor,
+# V = block variation, H = harvest efficiency, p = pest pressure. Each
+# management input enters one factor, so dY/d(input) follows by the chain rule.
+# ------------------------
+
+DERIVATIVE_PARAMS = ("fertilizer", "climate_slider", "pest_slider", "harvest_interval")
+
+def block_yield_derivatives(
+        ages,
+        climate_noise,
+        block_variation,
+        yield_adjustment = 0.0,
+        fertilizer = 0,
+        harvest_interval = 12,
+        climate_slider = 0,
+        pest_slider = 5
+):
+    """
+    Returns (yield_t_ha, derivatives) for every block-year of a trajectory, where
+    derivatives maps each of DERIVATIVE_PARAMS to the exact dY/d(input) in t/ha
+    per unit of that input. Same arguments and yield as block_yields.
+    """
+    base_yield = base_yield_by_age_array(ages)
+    climate_factor = climate_noise * (1 + (climate_slider / 100) * (ages / 20))
+
+    fertilizer_response = 1 + (0.6 * (fertilizer / (100 + np.abs(fertilizer))))
+    scenario_yield = base_yield * (1 + yield_adjustment)
+    adjusted_yield = scenario_yield * fertilizer_response
+
+    harvest_efficiency = 1.0 - (harvest_interval - 6) * 0.01
+    pest_pressure = pest_slider / 100
+
+    gross = adjusted_yield * climate_factor * block_variation
+    positive = gross > 0 # Derivative of max(x, 0) is zero below the kink
+    gross = np.maximum(gross, 0)
+    pest_factor = 1 - pest_pressure * (1 + adjusted_yield / 50)
+    yield_t_ha = gross * harvest_efficiency * pest_factor
+
+    # d(fertilizer_response)/d(fertilizer) = 0.6 * 100 / (100 + |f|)^2 for either sign of f
+    d_adjusted = scenario_yield * 60 / (100 + np.abs(fertilizer)) ** 2
+    d_climate_factor = climate_noise * ages / 2000
+
+    derivatives = {
+        "fertilizer": d_adjusted * harvest_efficiency * (
+            positive * climate_factor * block_variation * pest_factor
+            - gross * pest_pressure / 50
+        ),
+        "climate_slider": positive * adjusted_yield * d_climate_factor * block_variation
+                          * harvest_efficiency * pest_factor,
+        "pest_slider": -gross * harvest_efficiency * (1 + adjusted_yield / 50) / 100,
+        "harvest_interval": -0.01 * gross * pest_factor
+    }
+    return yield_t_ha, derivatives
+
 # ------------------------
 # Main Simulation Function (15/2/2026)
 # Phase 5 Implementation (16/2/2026): Added Staggered planting for plantation blocks
@@ -39,11 +381,13 @@ def base_yield_by_age(age):
 # Phase 5 Implementation (16/2/2026): Added fertilizer in yield calculation
 # Phase 5 Implementation (16/2/2026): Added climate slider and pest slider
 # Phase 6 Implementation (1/3/2026): Added Replanting Strategy Comparison
+# Refactor (19/10/2026): Per-block loop replaced by simulate_trajectory + block_yields
 # ------------------------
 
+@instrumented("run_simulation")
 def run_simulation(
         scenario_name = "Conservative",
-        yield_adjustment = 0.10,
+        yield_adjustment = None,
         num_blocks = 10,
         simulation_years = 10,
         fertilizer = 0,
@@ -53,7 +397,13 @@ def run_simulation(
         random_seed = 42,
         climate_slider = 0, # (% adjustment to climate)
         pest_slider = 5, # (% yield loss from pests)
-        replant_rate = None # Change from 0.05 to None
+        replant_rate = None, # Change from 0.05 to None
+        start_state = None,
+        return_state = False,
+        noise_mode = "legacy", # "crn" keys random draws by (block, year)
+        antithetic = False, # Mirror all draws (crn mode only)
+        pest_model = None, # Optional spatial pest spread (palmopsim_pests.SpatialPestModel)
+        climate_factors = None # Optional (years, blocks) climate factors (palmopsim_climate)
 ):
     """
     Simulates FFB production for a managed oil palm estate over a defined period.
@@ -61,114 +411,215 @@ def run_simulation(
     harvest efficiency, and replanting constraints (Phase 5).
     Returns a dict with: dataframe, total_ffb, average_yield, old_blocks,
     annual summary, annual_yield.
+    start_state / return_state: continue from, or return, a checkpoint of the
+    block arrays and RNG (see extend_simulation). With start_state the results
+    only cover the years after the checkpoint.
+    noise_mode / antithetic: see simulate_trajectory. Use noise_mode="crn" when
+    comparing runs that differ in replant_rate so they share the same noise.
+    pest_model: adds each block's spatial pest loss to the uniform pest_slider loss.
+    climate_factors: (simulation_years, num_blocks) climate factors covering the
+    whole horizon, used in place of the random per-block climate draws.
     """
-    
+    params = {
+        key: value for key, value in locals().items()
+        if key not in ("start_state", "return_state")
+    }
+
     # Scenario configuration
-    # Make replanting rate scenario dependent
-    if scenario_name == "Conservative":
-        yield_adjustment = -0.10
-        if replant_rate is None:
-            replant_rate = 0.03 # Slow replanting - cost cautious
-    elif scenario_name == "Moderate":
-        yield_adjustment = 0.00
-        if replant_rate is None:
-            replant_rate = 0.05 # Standard replanting program
-    elif scenario_name == "Aggressive":
-        yield_adjustment = 0.10
-        if replant_rate is None:
-            replant_rate = 0.08 # Fast replanting  - Investing in future yield
-    else:
-        yield_adjustment = 0.00
-        replant_rate = 0.05
-
-    np.random.seed(random_seed)
-
-    # Initialize plantation blocks
-    blocks = []
-    for block_id in range(1, num_blocks + 1):
-        block_age = np.random.randint(initial_age_range[0], initial_age_range[1] + 1)
-        block = {
-            "Block": f"B{block_id}",
-            "Area_ha": block_area_ha,
-            "Age": block_age,
-            "Planted_Year": 0 # Track year of planting for replanting logic
-        }
-        blocks.append(block)
-    
-    # Simulation loop
-    results = []
-
-    for year in range(1, simulation_years + 1):
-
-        # Phase 5 Implementation (18/2/2026): Separate Climate from random noise
-        # Phase 5 Addition (18/2/2026): Modified climate factor to include climate slider
-        # Phase 5 Modification (19/2/2026): changed to one climate factor per year, deterministic
-        # Modification (2/3/2026): modified climate factor to incoporate scenario and age distribution
-        for block in blocks:
-            age = block["Age"]
-            year_climate_noise = np.random.normal(1.0, 0.02)
-            climate_factor = year_climate_noise * (1 + (climate_slider/100) * (age / 20))
-            base_yield = base_yield_by_age(age)
-
-            # Apply scenario adjustment + fertilizer effect
-            # (18/2/2026): Make fertilizer response non-linear
-            # (2/3/2026): Slight adjustment to fertilizer response
-
-            # Diminishing returns: Doubling fertilizer does not double yield (Phase 5, Improvement 2)
-            fertilizer_response = 1 + (0.6 * (fertilizer / (100 + abs(fertilizer))))
-            adjusted_yield = base_yield * (1 + yield_adjustment) * fertilizer_response
-
-            # Apply variability as before
-            # (18/2/2026): Added harvest efficiency
-            # (18/2/2026): Added pest pressure
-            # (2/3/2026): Modified pest impact to be stronger at higher yield
-            block_variation = np.random.normal(1.0, 0.03) # Small per-block noise
-            harvest_efficiency = 1.0 - (harvest_interval - 6) * 0.01
-            pest_pressure = pest_slider / 100 # Deterministic from slider
-
-            yield_t_ha = max(adjusted_yield * climate_factor * block_variation, 0)
-            yield_t_ha *= harvest_efficiency
-            yield_t_ha *= (1 - pest_pressure * (1 + adjusted_yield / 50))
-            total_ffb = yield_t_ha * block["Area_ha"]
-
-            results.append({
-                "Year": year,
-                "Block": block["Block"],
-                "Age": age,
-                "Planted_Year": block["Planted_Year"],
-                "FFB_t_ha": round(yield_t_ha, 2),
-                "Total_FFB_t": round(total_ffb, 2)
-            })
-
-            # Phase 5: Check for replanting at economic age (25 years)
-            block["Age"] += 1
-
-            # (18/2/2026): Improve replanting logic
-            # Phase 5 Improvement (18/2/2026): New replanting logic - constrained rate per year
-            # if block["Age"] > 28:
-            #     # Replant block
-            #     block["Age"] = 0
-            #     block["Planted_Year"] = year
-
-            # base_yield = base_yield_by_age(block["Age"])
-
-        # Phase 5 Improvement (18/2/2026): New Replanting logic
-        # Identify overaged blocks
-        overaged_blocks = [b for b in blocks if b["Age"] > 28]
+    yield_adjustment, replant_rate = resolve_scenario(scenario_name, replant_rate, yield_adjustment)
+
+    trajectory = simulate_trajectory(
+        num_blocks = num_blocks,
+        simulation_years = simulation_years,
+        initial_age_range = initial_age_range,
+        random_seed = random_seed,
+        replant_rate = replant_rate,
+        start_state = start_state,
+        noise_mode = noise_mode,
+        antithetic = antithetic
+    )
+
+    first_year = 1 if start_state is None else start_state["year"] + 1
+    new_years = simulation_years - first_year + 1
+
+    # (19/10/2026): Spatial pest spread - per block-year pest loss instead of one uniform value
+    infestation = pest_infestation(pest_model, num_blocks, simulation_years, first_year)
+    if infestation is not None:
+        pest_slider = pest_slider + 100 * pest_model.max_loss * infestation
+
+    # (19/10/2026): Historical / resampled climate replaces the random climate draws
+    climate_noise = run_climate_noise(trajectory, climate_factors, num_blocks, simulation_years, first_year)
+
+    yield_t_ha = block_yields(
+        trajectory["ages"],
+        climate_noise,
+        trajectory["block_variation"],
+        yield_adjustment = yield_adjustment,
+        fertilizer = fertilizer,
+        harvest_interval = harvest_interval,
+        climate_slider = climate_slider,
+        pest_slider = pest_slider
+    )
+    df = block_year_frame(trajectory, yield_t_ha, block_area_ha, first_year, infestation)
+
+    results = summarise_results(df, num_blocks, block_area_ha, new_years)
+    record_simulations("run_simulation", 1, new_years * num_blocks)
+    if return_state:
+        results["state"] = {**trajectory["state"], "params": params}
+    return results
+
+def block_year_frame(trajectory, yield_t_ha, block_area_ha, first_year = 1, infestation = None):
+    """
+    Block-year DataFrame of a run (one row per block-year, ordered by year then block).
+    """
+    new_years, num_blocks = yield_t_ha.shape
+    total_ffb = yield_t_ha * block_area_ha
+    df = pd.DataFrame({
+        "Year": np.repeat(np.arange(first_year, first_year + new_years), num_blocks),
+        "Block": np.tile([f"B{block_id}" for block_id in range(1, num_blocks + 1)], new_years),
+        "Age": trajectory["ages"].ravel(),
+        "Planted_Year": trajectory["planted_years"].ravel(),
+        "FFB_t_ha": np.round(yield_t_ha, 2).ravel(),
+        "Total_FFB_t": np.round(total_ffb, 2).ravel()
+    })
+    if infestation is not None:
+        df["Pest_Infestation"] = np.round(infestation, 3).ravel()
+    return df
+
+def pest_infestation(pest_model, num_blocks, simulation_years, first_year = 1):
+    """
+    Spatial pest pressure for the simulated years, or None without a pest model.
+    """
+    if pest_model is None:
+        return None
+    if pest_model.num_blocks != num_blocks:
+        raise ValueError(f"pest_model covers {pest_model.num_blocks} blocks, expected {num_blocks}")
+    return pest_model.infestation(simulation_years)[first_year - 1:]
 
-        # Replant only limited number (e.g. 5% of total blocks)
-        max_replant = max(1, round(replant_rate * num_blocks))
+def run_climate_noise(trajectory, climate_factors, num_blocks, simulation_years, first_year = 1):
+    """
+    Trajectory climate draws, or the supplied climate factors for the simulated years.
+    """
+    if climate_factors is None:
+        return trajectory["climate_noise"]
+    climate_factors = np.asarray(climate_factors, dtype = float)
+    if climate_factors.shape != (simulation_years, num_blocks):
+        raise ValueError(
+            f"climate_factors must be shaped ({simulation_years}, {num_blocks}), "
+            f"got {climate_factors.shape}"
+        )
+    return climate_factors[first_year - 1:]
 
-        if len(overaged_blocks) > 0:
-            np.random.shuffle(overaged_blocks)
-            blocks_to_replant = overaged_blocks[:max_replant]
+# ------------------------
+# Batched Scenario Runs (19/10/2026)
+# Scenarios differ only in yield_adjustment and replant_rate. Pest spread and
+# climate inputs are set up once, one trajectory is simulated per distinct
+# replant_rate, and the scenarios are stacked along a leading axis so a single
+# block_yields call evaluates them all. Each result is identical to
+# run_simulation for that scenario.
+# ------------------------
 
-            for b in blocks_to_replant:
-                b["Age"] = 0
+@instrumented("run_scenarios")
+def run_scenarios(scenario_names, return_state = False, **params):
+    """
+    Runs every scenario in scenario_names with the same run_simulation
+    arguments (params, without scenario_name / start_state).
+    Returns {scenario_name: run_simulation result dict}; with return_state
+    each result carries a checkpoint for extend_simulation.
+    """
+    scenario_names = list(dict.fromkeys(scenario_names))
+    if not scenario_names:
+        return {}
+    if "scenario_name" in params or "start_state" in params:
+        raise TypeError("run_scenarios takes scenario_names and starts every run from year 1")
+    defaults = {
+        name: p.default
+        for name, p in inspect.signature(run_simulation).parameters.items()
+        if name not in ("scenario_name", "start_state", "return_state")
+    }
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise TypeError(f"Unknown run_simulation arguments: {sorted(unknown)}")
+    p = {**defaults, **params}
+    num_blocks, simulation_years = p["num_blocks"], p["simulation_years"]
+
+    resolved = [resolve_scenario(name, p["replant_rate"], p["yield_adjustment"]) for name in scenario_names]
+
+    # Shared setup: one trajectory per distinct replant rate, pests and climate once
+    trajectories = {}
+    for _, replant_rate in resolved:
+        if replant_rate not in trajectories:
+            trajectories[replant_rate] = simulate_trajectory(
+                num_blocks = num_blocks,
+                simulation_years = simulation_years,
+                initial_age_range = p["initial_age_range"],
+                random_seed = p["random_seed"],
+                replant_rate = replant_rate,
+                noise_mode = p["noise_mode"],
+                antithetic = p["antithetic"]
+            )
+    pest_slider = p["pest_slider"]
+    infestation = pest_infestation(p["pest_model"], num_blocks, simulation_years)
+    if infestation is not None:
+        pest_slider = pest_slider + 100 * p["pest_model"].max_loss * infestation
+
+    # Scenarios stacked on the leading axis: (scenarios, years, blocks)
+    scenario_trajectories = [trajectories[replant_rate] for _, replant_rate in resolved]
+    yield_t_ha = block_yields(
+        np.stack([t["ages"] for t in scenario_trajectories]),
+        np.stack([
+            run_climate_noise(t, p["climate_factors"], num_blocks, simulation_years)
+            for t in scenario_trajectories
+        ]),
+        np.stack([t["block_variation"] for t in scenario_trajectories]),
+        yield_adjustment = np.array([adjustment for adjustment, _ in resolved])[:, None, None],
+        fertilizer = p["fertilizer"],
+        harvest_interval = p["harvest_interval"],
+        climate_slider = p["climate_slider"],
+        pest_slider = pest_slider
+    )
+
+    results = {}
+    for index, name in enumerate(scenario_names):
+        trajectory = scenario_trajectories[index]
+        df = block_year_frame(trajectory, yield_t_ha[index], p["block_area_ha"], 1, infestation)
+        results[name] = summarise_results(df, num_blocks, p["block_area_ha"], simulation_years)
+        if return_state:
+            results[name]["state"] = {**trajectory["state"], "params": {**p, "scenario_name": name}}
+
+    record_simulations("run_scenarios", len(scenario_names), len(scenario_names) * simulation_years * num_blocks)
+    return results
+
+# Implementation (19/10/2026): Extend a run's horizon or branch from its final year
+def extend_simulation(previous_results, simulation_years, **param_changes):
+    """
+    Continues a run made with return_state=True up to simulation_years,
+    simulating only the new years. param_changes (e.g. fertilizer, replant_rate)
+    apply from the first new year, so a different management regime can be
+    branched from the checkpoint. Returns the full-horizon result dict, identical
+    to a single run_simulation call over the whole horizon when nothing changes.
+    """
+    state = previous_results["state"]
+    params = {**state["params"], **param_changes, "simulation_years": simulation_years}
+
+    if simulation_years == state["year"]:
+        # No new years to simulate; param_changes still carry over to later extensions
+        return {**previous_results, "state": {**state, "params": params}}
 
-    # Convert to DataFrame
-    df = pd.DataFrame(results)
+    new_results = run_simulation(**params, start_state = state, return_state = True)
 
+    df = pd.concat(
+        [previous_results["dataframe"], new_results["dataframe"]],
+        ignore_index = True
+    )
+    results = summarise_results(df, params["num_blocks"], params["block_area_ha"], simulation_years)
+    results["state"] = new_results["state"]
+    return results
+
+def summarise_results(df, num_blocks, block_area_ha, simulation_years):
+    """
+    Builds the run_simulation result dict from a block-year DataFrame.
+    """
     # Management metrics
     total_ffb = df["Total_FFB_t"].sum()
     total_area = num_blocks * block_area_ha * simulation_years
@@ -194,16 +645,25 @@ def run_simulation(
     }
 
 # Phase 6 Implementation (21/2/2026): Formal Sensitivity Comparison
+# Implementation (19/10/2026): method="analytic" uses one derivative pass instead of three runs
+@instrumented("run_sensitivity_analysis")
 def run_sensitivity_analysis(
         base_params,
         factor_name,
         low_value,
-        high_value
+        high_value,
+        method = "simulate"
 ):
     """
     Runs baseline, low, and high variation for a single factor.
     Returns a dict with Factor name and percentage change vs baseline for low and high values.
+    method="analytic" gives first-order estimates from run_simulation_derivatives
+    (factor_name must be one of DERIVATIVE_PARAMS).
     """
+    if method == "analytic":
+        return run_analytic_sensitivity(base_params, {factor_name: (low_value, high_value)})[0]
+    if method != "simulate":
+        raise ValueError(f"method must be 'simulate' or 'analytic', got {method!r}")
 
     # Baseline
     baseline_results = run_simulation(**base_params)
@@ -229,6 +689,127 @@ def run_sensitivity_analysis(
         "High_Change_%": round((high_ffb - baseline_ffb) / baseline_ffb * 100, 2)
     }
 
+# ------------------------
+# Analytic Sensitivities (19/10/2026)
+# Exact derivatives of total FFB with respect to every management input from
+# a single simulation pass; elasticity = dTotal/d(input) * input / Total.
+# ------------------------
+
+@instrumented("run_simulation_derivatives")
+def run_simulation_derivatives(
+        scenario_name = "Conservative",
+        yield_adjustment = None,
+        num_blocks = 10,
+        simulation_years = 10,
+        fertilizer = 0,
+        harvest_interval = 12,
+        block_area_ha = 25,
+        initial_age_range = (3, 25),
+        random_seed = 42,
+        climate_slider = 0,
+        pest_slider = 5,
+        replant_rate = None,
+        noise_mode = "legacy",
+        antithetic = False,
+        pest_model = None,
+        climate_factors = None
+):
+    """
+    Simulates like run_simulation and returns d(total FFB)/d(input) for each of
+    DERIVATIVE_PARAMS (t per unit of input) with elasticities. Derivatives are of
+    the unrounded totals. Returns a dict with:
+    total_ffb, summary (per input: Value, Derivative, Elasticity), annual (per year
+    derivatives), dataframe (per block-year FFB, derivatives and elasticities).
+    """
+    yield_adjustment, replant_rate = resolve_scenario(scenario_name, replant_rate, yield_adjustment)
+    trajectory = simulate_trajectory(
+        num_blocks = num_blocks,
+        simulation_years = simulation_years,
+        initial_age_range = initial_age_range,
+        random_seed = random_seed,
+        replant_rate = replant_rate,
+        noise_mode = noise_mode,
+        antithetic = antithetic
+    )
+    values = {
+        "fertilizer": fertilizer,
+        "climate_slider": climate_slider,
+        "pest_slider": pest_slider,
+        "harvest_interval": harvest_interval
+    }
+
+    infestation = pest_infestation(pest_model, num_blocks, simulation_years, 1)
+    if infestation is not None:
+        pest_slider = pest_slider + 100 * pest_model.max_loss * infestation
+
+    yield_t_ha, derivatives = block_yield_derivatives(
+        trajectory["ages"],
+        run_climate_noise(trajectory, climate_factors, num_blocks, simulation_years, 1),
+        trajectory["block_variation"],
+        yield_adjustment = yield_adjustment,
+        fertilizer = fertilizer,
+        harvest_interval = harvest_interval,
+        climate_slider = climate_slider,
+        pest_slider = pest_slider
+    )
+    block_ffb = yield_t_ha * block_area_ha
+    total_ffb = block_ffb.sum()
+
+    df = pd.DataFrame({
+        "Year": np.repeat(np.arange(1, simulation_years + 1), num_blocks),
+        "Block": np.tile([f"B{block_id}" for block_id in range(1, num_blocks + 1)], simulation_years),
+        "Age": trajectory["ages"].ravel(),
+        "Total_FFB_t": block_ffb.ravel()
+    })
+    safe_ffb = np.where(block_ffb > 0, block_ffb, 1)
+    summary = []
+    annual = {}
+    for name in DERIVATIVE_PARAMS:
+        d_block_ffb = np.broadcast_to(derivatives[name] * block_area_ha, block_ffb.shape)
+        df[f"d_{name}"] = d_block_ffb.ravel()
+        df[f"Elasticity_{name}"] = np.where(block_ffb > 0, d_block_ffb * values[name] / safe_ffb, 0.0).ravel()
+        annual[name] = d_block_ffb.sum(axis = 1)
+
+        derivative = float(d_block_ffb.sum())
+        summary.append({
+            "Parameter": name,
+            "Value": values[name],
+            "Derivative": derivative,
+            "Elasticity": derivative * values[name] / total_ffb if total_ffb else 0.0
+        })
+
+    record_simulations("run_simulation_derivatives", 1, simulation_years * num_blocks)
+    return {
+        "total_ffb": round(float(total_ffb), 1),
+        "summary": pd.DataFrame(summary).set_index("Parameter"),
+        "annual": pd.DataFrame(annual, index = pd.Index(np.arange(1, simulation_years + 1), name = "Year")),
+        "dataframe": df
+    }
+
+def run_analytic_sensitivity(base_params, factor_ranges):
+    """
+    First-order version of run_sensitivity_analysis for several factors at once.
+    factor_ranges: dict of factor name -> (low_value, high_value).
+    Returns one dict per factor in the run_sensitivity_analysis format; all
+    factors come from the same single run_simulation_derivatives pass.
+    """
+    for factor_name in factor_ranges:
+        if factor_name not in DERIVATIVE_PARAMS:
+            raise ValueError(f"No analytic derivative for {factor_name!r}; choose from {DERIVATIVE_PARAMS}")
+
+    derivatives = run_simulation_derivatives(**base_params)
+    summary = derivatives["summary"]
+    rows = []
+    for factor_name, (low_value, high_value) in factor_ranges.items():
+        value = summary.loc[factor_name, "Value"]
+        relative = summary.loc[factor_name, "Derivative"] / derivatives["total_ffb"] * 100
+        rows.append({
+            "Factor": factor_name,
+            "Low_Change_%": round((low_value - value) * relative, 2),
+            "High_Change_%": round((high_value - value) * relative, 2)
+        })
+    return rows
+
 # Phase 6 Implementation (1/3/2026): Age Categorization Function
 def get_estate_age_distribution(df):
     """
@@ -0,0 +1,185 @@
+"""
+PalmOpsSim - Monthly Time-Step Engine
+Optional monthly resolution: the annual crop of each block is spread over
+the months with a seasonal cropping profile, blocks are harvested in
+staggered rounds every harvest_interval months, and crop not yet harvested
+carries over to the next round. Monthly results aggregate back to the
+run_simulation result format used by the app.
+Contains simulation logic only (no printing, no plotting, no exports)
+"""
+
+import numpy as np
+import pandas as pd
+
+from palmopsim_metrics import instrumented, record_simulations
+from palmopsim_model import (
+    resolve_scenario, simulate_trajectory, block_yields, summarise_results,
+    pest_infestation, run_climate_noise
+)
+
+# Share of annual FFB crop per calendar month (Jan-Dec). Peninsular Malaysia
+# pattern: low crop in Feb-Mar, peak crop in Sep-Oct.
+SEASONAL_PROFILE = np.array([
+    0.070, 0.062, 0.068, 0.075, 0.080, 0.083,
+    0.087, 0.092, 0.098, 0.100, 0.095, 0.090
+])
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# ------------------------
+# Harvest Rounds (19/10/2026)
+# Block b is harvested at the end of months m with (m - offset_b) % interval
+# == 0, offsets staggered across blocks so rounds are spread over the year.
+# A round collects everything that ripened since the block's previous round:
+# with cumulative crop C, that is C[m] - C[m - interval], so every round in
+# the (months, blocks) matrix comes from one cumsum and one shifted subtract.
+# ------------------------
+
+def harvest_offsets(num_blocks, harvest_interval):
+    """
+    First harvest month (0-based) of each block, staggered block by block.
+    """
+    return np.arange(num_blocks) % harvest_interval
+
+def harvest_rounds(potential, harvest_interval, offsets = None):
+    """
+    potential: (months, blocks) crop ripening per month.
+    Returns (harvested, round_mask): crop collected at each block's rounds and
+    where the rounds fall, both (months, blocks).
+    """
+    months, num_blocks = potential.shape
+    if offsets is None:
+        offsets = harvest_offsets(num_blocks, harvest_interval)
+
+    ripened = np.cumsum(potential, axis = 0)
+    since_last_round = ripened.copy()
+    since_last_round[harvest_interval:] -= ripened[:-harvest_interval]
+
+    round_mask = (np.arange(months)[:, None] - offsets) % harvest_interval == 0
+    round_mask &= np.arange(months)[:, None] >= offsets
+    return np.where(round_mask, since_last_round, 0.0), round_mask
+
+# ------------------------
+# Monthly Simulation (19/10/2026)
+# The annual trajectory (ages, noise, replanting) and yield kernel are shared
+# with run_simulation, evaluated without the harvest efficiency factor; the
+# efficiency penalty is applied to what each round collects instead.
+# ------------------------
+
+@instrumented("run_monthly_simulation")
+def run_monthly_simulation(
+        scenario_name = "Conservative",
+        yield_adjustment = None,
+        num_blocks = 10,
+        simulation_years = 10,
+        fertilizer = 0,
+        harvest_interval = 12,
+        block_area_ha = 25,
+        initial_age_range = (3, 25),
+        random_seed = 42,
+        climate_slider = 0,
+        pest_slider = 5,
+        replant_rate = None,
+        noise_mode = "legacy",
+        antithetic = False,
+        pest_model = None,
+        climate_factors = None,
+        seasonal_profile = None,
+        return_block_months = False
+):
+    """
+    Simulates FFB production at monthly resolution with harvest rounds.
+    Takes run_simulation's arguments (harvest_interval in whole months) plus:
+    seasonal_profile: 12 monthly crop shares (normalised to sum to 1),
+    default SEASONAL_PROFILE.
+    return_block_months: also return the (months, blocks) harvested array.
+    Returns the run_simulation result dict (dataframe, total_ffb, average_yield,
+    old_blocks, annual_summary, annual_yield) with yearly totals of harvested
+    crop, plus monthly (estate-level monthly DataFrame) and standing_crop_t
+    (ripe crop not yet harvested at the end of the horizon). The estate starts
+    mid-cycle: crop ripened in the harvest_interval months before year 1 is
+    standing at the start.
+    """
+    if harvest_interval != int(harvest_interval) or harvest_interval < 1:
+        raise ValueError(f"harvest_interval must be a whole number of months (at least 1), got {harvest_interval!r}")
+    harvest_interval = int(harvest_interval)
+    profile = SEASONAL_PROFILE if seasonal_profile is None else np.asarray(seasonal_profile, dtype = float)
+    if profile.shape != (12,) or (profile < 0).any() or profile.sum() <= 0:
+        raise ValueError("seasonal_profile must be 12 non-negative monthly shares")
+    profile = profile / profile.sum()
+
+    yield_adjustment, replant_rate = resolve_scenario(scenario_name, replant_rate, yield_adjustment)
+    trajectory = simulate_trajectory(
+        num_blocks = num_blocks,
+        simulation_years = simulation_years,
+        initial_age_range = initial_age_range,
+        random_seed = random_seed,
+        replant_rate = replant_rate,
+        noise_mode = noise_mode,
+        antithetic = antithetic
+    )
+    infestation = pest_infestation(pest_model, num_blocks, simulation_years)
+    if infestation is not None:
+        pest_slider = pest_slider + 100 * pest_model.max_loss * infestation
+
+    # Annual crop before harvest losses (harvest_interval = 6 gives efficiency 1.0)
+    annual_crop = block_yields(
+        trajectory["ages"],
+        run_climate_noise(trajectory, climate_factors, num_blocks, simulation_years),
+        trajectory["block_variation"],
+        yield_adjustment = yield_adjustment,
+        fertilizer = fertilizer,
+        harvest_interval = 6,
+        climate_slider = climate_slider,
+        pest_slider = pest_slider
+    ) * block_area_ha
+
+    months = simulation_years * 12
+    potential = (annual_crop[:, None, :] * profile[None, :, None]).reshape(months, num_blocks)
+
+    # The estate is already in its harvest cycle at the start: crop ripening in the
+    # harvest_interval months before year 1 (at year-1 levels) is collected by the first rounds
+    lead = harvest_interval
+    lead_potential = annual_crop[0] * profile[np.arange(-lead, 0) % 12][:, None]
+    offsets = harvest_offsets(num_blocks, harvest_interval)
+    ripe, round_mask = harvest_rounds(np.concatenate([lead_potential, potential]), harvest_interval, offsets)
+    ripe, round_mask = ripe[lead:], round_mask[lead:]
+    lead_ripened = np.cumsum(lead_potential, axis = 0)
+    initial_standing = (lead_ripened[-1] - lead_ripened[offsets, np.arange(num_blocks)]).sum()
+
+    harvest_efficiency = 1.0 - (harvest_interval - 6) * 0.01
+    harvested = ripe * harvest_efficiency
+
+    # Annual outputs in the run_simulation format
+    annual_harvested = harvested.reshape(simulation_years, 12, num_blocks).sum(axis = 1)
+    df = pd.DataFrame({
+        "Year": np.repeat(np.arange(1, simulation_years + 1), num_blocks),
+        "Block": np.tile([f"B{block_id}" for block_id in range(1, num_blocks + 1)], simulation_years),
+        "Age": trajectory["ages"].ravel(),
+        "Planted_Year": trajectory["planted_years"].ravel(),
+        "FFB_t_ha": np.round(annual_harvested / block_area_ha, 2).ravel(),
+        "Total_FFB_t": np.round(annual_harvested, 2).ravel()
+    })
+    if infestation is not None:
+        df["Pest_Infestation"] = np.round(infestation, 3).ravel()
+    results = summarise_results(df, num_blocks, block_area_ha, simulation_years)
+
+    # Estate-level monthly view: ripening, collection, rounds and standing crop
+    estate_potential = potential.sum(axis = 1)
+    estate_ripe = ripe.sum(axis = 1)
+    month_of_year = np.tile(np.arange(12), simulation_years)
+    results["monthly"] = pd.DataFrame({
+        "Year": np.repeat(np.arange(1, simulation_years + 1), 12),
+        "Month": np.array(MONTH_NAMES)[month_of_year],
+        "Month_Index": np.arange(1, months + 1),
+        "Ripened_FFB_t": estate_potential,
+        "Harvested_FFB_t": harvested.sum(axis = 1),
+        "Blocks_Harvested": round_mask.sum(axis = 1),
+        "Standing_Crop_t": initial_standing + np.cumsum(estate_potential) - np.cumsum(estate_ripe)
+    })
+    results["standing_crop_t"] = round(float(results["monthly"]["Standing_Crop_t"].iloc[-1]), 1)
+    if return_block_months:
+        results["block_months"] = harvested
+
+    record_simulations("run_monthly_simulation", 1, months * num_blocks)
+    return results
@@ -0,0 +1,110 @@
+"""
+PalmOpsSim - Shared-Memory Buffers
+Zero-copy array exchange between the parent process and process-pool workers.
+The parent places input and output arrays in multiprocessing.shared_memory
+segments; workers attach to them by name and read or write in place, so only
+small descriptors (segment name, shape, dtype) are pickled per task and the
+transfer cost does not grow with the estate size.
+"""
+
+import contextlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ------------------------
+# Shared Arrays (19/10/2026)
+# The parent owns every segment and unlinks them all when its context exits,
+# also on errors, so worker crashes cannot leak segments. Workers only attach
+# and close. NumPy views pin a segment's buffer: drop them before closing.
+# ------------------------
+
+class SharedArrays:
+    """
+    Set of named NumPy arrays backed by shared memory, owned by this process.
+    Use as a context manager; segments are unlinked on exit.
+    """
+
+    def __init__(self):
+        self._segments = {}
+        self._arrays = {}
+
+    def create(self, key, shape, dtype = float, fill = None):
+        """
+        Allocates a shared array and returns its local view (uninitialised unless fill is given).
+        """
+        if key in self._segments:
+            raise KeyError(f"Shared array {key!r} already exists")
+        dtype = np.dtype(dtype)
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        segment = shared_memory.SharedMemory(create = True, size = max(nbytes, 1)) # Size 0 is not allowed
+        self._segments[key] = segment
+        array = np.ndarray(shape, dtype = dtype, buffer = segment.buf)
+        if fill is not None:
+            array.fill(fill)
+        self._arrays[key] = array
+        return array
+
+    def put(self, key, array):
+        """
+        Copies array into a new shared array and returns the shared view.
+        """
+        array = np.asarray(array)
+        view = self.create(key, array.shape, array.dtype)
+        view[...] = array
+        return view
+
+    def __getitem__(self, key):
+        return self._arrays[key]
+
+    def __contains__(self, key):
+        return key in self._arrays
+
+    def descriptors(self, *keys):
+        """
+        Picklable {key: (segment name, shape, dtype)} for attach_arrays (all arrays if no keys).
+        """
+        keys = keys or tuple(self._arrays)
+        return {
+            key: (self._segments[key].name, self._arrays[key].shape, self._arrays[key].dtype.str)
+            for key in keys
+        }
+
+    def close(self):
+        """
+        Releases the local views and unlinks every segment.
+        """
+        self._arrays.clear()
+        for segment in self._segments.values():
+            try:
+                segment.close()
+            except BufferError:
+                pass # A view is still alive; its mapping goes when the view does
+            segment.unlink()
+        self._segments.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@contextlib.contextmanager
+def attach_arrays(descriptors):
+    """
+    Worker side: yields {key: array view} for descriptors from SharedArrays.descriptors.
+    Writes go straight to the parent's buffers. Views must not be kept past the block.
+    """
+    segments = []
+    arrays = {}
+    try:
+        for key, (name, shape, dtype) in descriptors.items():
+            segment = shared_memory.SharedMemory(name = name)
+            segments.append(segment)
+            arrays[key] = np.ndarray(shape, dtype = dtype, buffer = segment.buf)
+        yield arrays
+    finally:
+        arrays.clear()
+        for segment in segments:
+            segment.close()
@@ -0,0 +1,220 @@
+"""
+PalmOpsSim - Spatial Pest Spread
+Optional pest module: infestation pressure spreads between neighbouring
+blocks through a sparse block adjacency graph, and each block's pressure
+adds to its yield loss in run_simulation.
+Contains simulation logic only (no printing, no plotting, no exports)
+"""
+
+import hashlib
+
+import numpy as np
+
+# ------------------------
+# Sparse Block Adjacency (19/10/2026)
+# Stored as sorted (row, col, weight) triplets - a CSR matrix without the
+# scipy dependency. Matrix-vector products are one np.bincount, so memory and
+# time grow with the number of edges, never with num_blocks^2.
+# ------------------------
+
+class SparseAdjacency:
+    """
+    Weighted block adjacency graph as a sparse num_blocks x num_blocks matrix.
+    """
+
+    def __init__(self, num_blocks, rows, cols, weights = None):
+        rows = np.asarray(rows, dtype = np.int64)
+        cols = np.asarray(cols, dtype = np.int64)
+        weights = np.ones(len(rows)) if weights is None else np.asarray(weights, dtype = float)
+        if not (len(rows) == len(cols) == len(weights)):
+            raise ValueError("rows, cols and weights must have the same length")
+        if len(rows) and (min(rows.min(), cols.min()) < 0 or max(rows.max(), cols.max()) >= num_blocks):
+            raise ValueError(f"Block indices must be in [0, {num_blocks})")
+
+        order = np.lexsort((cols, rows))
+        self.num_blocks = num_blocks
+        self.rows = rows[order]
+        self.cols = cols[order]
+        self.weights = weights[order]
+
+    @classmethod
+    def from_edges(cls, num_blocks, edges, weights = None, symmetric = True):
+        """
+        Builds the graph from (i, j) block index pairs (0-based).
+        symmetric=True adds the reverse of every edge.
+        """
+        edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+        weights = np.ones(len(edges)) if weights is None else np.asarray(weights, dtype = float)
+        rows, cols = edges[:, 0], edges[:, 1]
+        if symmetric:
+            rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+            weights = np.concatenate([weights, weights])
+        return cls(num_blocks, rows, cols, weights)
+
+    @classmethod
+    def from_scipy(cls, matrix):
+        """
+        Builds the graph from a scipy.sparse matrix (scipy itself is not required otherwise).
+        """
+        coo = matrix.tocoo()
+        return cls(coo.shape[0], coo.row, coo.col, coo.data)
+
+    @classmethod
+    def grid(cls, n_rows, n_cols, diagonal = False):
+        """
+        Adjacency of blocks laid out row by row on an n_rows x n_cols grid
+        (block index = row * n_cols + col), with 4 or 8 neighbours.
+        """
+        index = np.arange(n_rows * n_cols).reshape(n_rows, n_cols)
+        pairs = [
+            (index[:, :-1], index[:, 1:]), # east
+            (index[:-1, :], index[1:, :])  # south
+        ]
+        if diagonal:
+            pairs += [
+                (index[:-1, :-1], index[1:, 1:]), # south-east
+                (index[:-1, 1:], index[1:, :-1])  # south-west
+            ]
+        edges = np.column_stack([
+            np.concatenate([a.ravel() for a, _ in pairs]),
+            np.concatenate([b.ravel() for _, b in pairs])
+        ])
+        return cls.from_edges(n_rows * n_cols, edges)
+
+    @property
+    def nnz(self):
+        return len(self.rows)
+
+    def degree(self):
+        """
+        Weighted degree (row sum) of every block.
+        """
+        return np.bincount(self.rows, weights = self.weights, minlength = self.num_blocks)
+
+    def dot(self, x):
+        """
+        Sparse matrix-vector product A @ x.
+        """
+        return np.bincount(self.rows, weights = self.weights * x[self.cols], minlength = self.num_blocks)
+
+    def row_normalised(self):
+        """
+        Returns a copy whose rows sum to 1, so dot() gives the weighted mean over neighbours.
+        """
+        degree = self.degree()
+        weights = self.weights / np.where(degree > 0, degree, 1)[self.rows]
+        return SparseAdjacency(self.num_blocks, self.rows, self.cols, weights)
+
+    def digest(self):
+        content = hashlib.sha1()
+        for array in (self.rows, self.cols, self.weights):
+            content.update(np.ascontiguousarray(array).tobytes())
+        return content.hexdigest()[:12]
+
+# ------------------------
+# Spatial Pest Model (19/10/2026)
+# Yearly update of infestation pressure p (0-1) per block:
+#   p += growth_rate * p * (1 - p)                  local build-up
+#      + spread_rate * (1 - p) * mean(neighbour p)  spread from neighbours
+#      - control_rate * p                           treatment / natural decline
+# Yield loss from the module is max_loss * p, on top of the uniform pest_slider loss.
+# ------------------------
+
+class SpatialPestModel:
+    """
+    Infestation pressure spreading over a block adjacency graph.
+    initial_infestation: infested block indices, or {block_index: pressure}.
+    initial_pressure: alternatively, one starting pressure (0-1) or boolean
+    flag per block. Give exactly one of the two.
+    """
+
+    def __init__(
+            self,
+            adjacency,
+            initial_infestation = None,
+            growth_rate = 0.3,
+            spread_rate = 0.4,
+            control_rate = 0.1,
+            max_loss = 0.3,
+            initial_pressure = None
+    ):
+        if not 0.0 <= max_loss <= 1.0:
+            raise ValueError(f"max_loss must be between 0 and 1, got {max_loss}")
+        if (initial_infestation is None) == (initial_pressure is None):
+            raise ValueError("Give exactly one of initial_infestation and initial_pressure")
+        self.adjacency = adjacency
+        self.neighbour_mean = adjacency.row_normalised()
+        if initial_pressure is not None:
+            self.initial_infestation = self._pressure_vector(initial_pressure, adjacency.num_blocks)
+        else:
+            self.initial_infestation = self._index_vector(initial_infestation, adjacency.num_blocks)
+        self.growth_rate = growth_rate
+        self.spread_rate = spread_rate
+        self.control_rate = control_rate
+        self.max_loss = max_loss
+
+    @staticmethod
+    def _index_vector(initial, num_blocks):
+        if isinstance(initial, dict):
+            indices, pressures = list(initial), list(initial.values())
+        else:
+            indices = list(np.atleast_1d(initial))
+            pressures = [1.0] * len(indices)
+        for index in indices:
+            if isinstance(index, (bool, np.bool_)) or not isinstance(index, (int, np.integer)):
+                raise ValueError(
+                    f"initial_infestation takes block indices, got {index!r}; "
+                    "use initial_pressure for per-block pressures or masks"
+                )
+            if not 0 <= index < num_blocks:
+                raise ValueError(f"initial_infestation block index {index} is outside [0, {num_blocks})")
+        vector = np.zeros(num_blocks)
+        vector[np.asarray(indices, dtype = int)] = pressures
+        return np.clip(vector, 0.0, 1.0)
+
+    @staticmethod
+    def _pressure_vector(initial, num_blocks):
+        initial = np.asarray(initial)
+        if initial.shape != (num_blocks,):
+            raise ValueError(f"initial_pressure must have one value per block ({num_blocks}), got shape {initial.shape}")
+        if initial.dtype.kind not in "biuf":
+            raise ValueError(f"initial_pressure must be numbers or flags, got {initial.dtype}")
+        return np.clip(initial.astype(float), 0.0, 1.0)
+
+    @property
+    def num_blocks(self):
+        return self.adjacency.num_blocks
+
+    def infestation(self, simulation_years):
+        """
+        Returns (simulation_years, num_blocks) infestation pressure; row 0 is year 1.
+        """
+        history = np.empty((simulation_years, self.num_blocks))
+        pressure = self.initial_infestation.copy()
+        for year_idx in range(simulation_years):
+            history[year_idx] = pressure
+            neighbour_pressure = self.neighbour_mean.dot(pressure)
+            pressure = (
+                pressure
+                + self.growth_rate * pressure * (1 - pressure)
+                + self.spread_rate * (1 - pressure) * neighbour_pressure
+                - self.control_rate * pressure
+            )
+            np.clip(pressure, 0.0, 1.0, out = pressure)
+        return history
+
+    def block_losses(self, simulation_years):
+        """
+        Returns the extra yield loss fraction per block-year.
+        """
+        return self.max_loss * self.infestation(simulation_years)
+
+    def __repr__(self):
+        # Deterministic so run parameters containing a model hash consistently
+        return (
+            f"SpatialPestModel(blocks={self.num_blocks}, edges={self.adjacency.nnz}, "
+            f"growth_rate={self.growth_rate}, spread_rate={self.spread_rate}, "
+            f"control_rate={self.control_rate}, max_loss={self.max_loss}, "
+            f"graph={self.adjacency.digest()}, "
+            f"initial={hashlib.sha1(self.initial_infestation.tobytes()).hexdigest()[:12]})"
+        )
@@ -0,0 +1,561 @@
+"""
+PalmOpsSim - Local Simulation Service
+Lightweight HTTP/JSON wrapper around the simulation engine for planning tools.
+Concurrent /simulate requests are collected into short batches, grouped by
+shared block trajectory and evaluated as vectorised engine calls on a worker
+pool, with a shared result cache in front.
+
+Run with:  python palmopsim_service.py --port 8765
+Binds to 127.0.0.1 by default.
+"""
+
+import argparse
+import inspect
+import json
+import math
+import numbers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from palmopsim_metrics import (
+    PROMETHEUS_CONTENT_TYPE, REGISTRY, WORKER_BUSY_SECONDS, WORKER_TASKS_IN_FLIGHT, WORKERS, record_cache
+)
+from palmopsim_model import NOISE_MODES, run_simulation
+from palmopsim_store import param_hash
+from palmopsim_sweep import (
+    SWEEP_AXES, group_parameter_sets, record_group_outputs, resolve_parameter_set, run_group, run_sweep,
+    unpack_group_output
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# run_simulation arguments accepted over JSON (objects and checkpoints are in-process only)
+SERVICE_PARAMS = [
+    name for name in inspect.signature(run_simulation).parameters
+    if name not in ("start_state", "return_state", "pest_model", "climate_factors")
+]
+
+# Type checks applied to JSON parameters before they reach the batcher
+NUMERIC_PARAMS = (
+    "num_blocks", "simulation_years", "fertilizer", "harvest_interval", "block_area_ha",
+    "random_seed", "climate_slider", "pest_slider", "replant_rate", "yield_adjustment"
+)
+INTEGER_PARAMS = ("num_blocks", "simulation_years", "random_seed")
+OPTIONAL_PARAMS = ("replant_rate", "yield_adjustment")
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_WINDOW = 2048
+
+# Prometheus series exported on GET /metrics (see palmopsim_metrics)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "palmopsim_http_request_seconds",
+    "HTTP request latency by endpoint.",
+    ["endpoint"]
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "palmopsim_service_queue_depth",
+    "Simulation requests waiting for the batcher."
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "palmopsim_service_requests_in_flight",
+    "Simulation requests dispatched to the engine and not yet answered."
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "palmopsim_cache_entries",
+    "Entries held per cache.",
+    ["cache"]
+)
+
+# ------------------------
+# Service Metrics and Cache (19/10/2026)
+# ------------------------
+
+class LatencyTracker:
+    """
+    Request counts and latency percentiles per endpoint (recent window).
+    """
+
+    def __init__(self, window = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._totals = {}
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen = self.window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+            self._totals[endpoint] = self._totals.get(endpoint, 0.0) + seconds
+        REQUEST_LATENCY.labels(endpoint = endpoint).observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            stats = {}
+            for endpoint, samples in self._samples.items():
+                values = np.array(samples)
+                stats[endpoint] = {
+                    "count": self._counts[endpoint],
+                    "mean_ms": 1000 * self._totals[endpoint] / self._counts[endpoint],
+                    "p50_ms": 1000 * float(np.percentile(values, 50)),
+                    "p95_ms": 1000 * float(np.percentile(values, 95)),
+                    "p99_ms": 1000 * float(np.percentile(values, 99)),
+                    "max_ms": 1000 * float(values.max())
+                }
+            return stats
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of results keyed by request hash.
+    """
+
+    def __init__(self, max_size = 4096, name = "service"):
+        self.max_size = max_size
+        self.name = name
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                value = self._items[key]
+            else:
+                self.misses += 1
+                value = None
+        record_cache(self.name, value is not None)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last = False)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._items)
+            }
+
+# ------------------------
+# Request Batcher (19/10/2026)
+# A background thread drains the request queue: it waits up to batch_window
+# after the first request (or until max_batch requests), removes duplicates,
+# groups the rest by shared trajectory and submits one engine task per group.
+# ------------------------
+
+class SimulationBatcher:
+    """
+    Collects concurrent simulation requests into vectorised engine calls.
+    """
+
+    def __init__(self, executor, cache, batch_window = 0.005, max_batch = 256):
+        self.executor = executor
+        self.cache = cache
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.engine_tasks = 0
+        self._thread = threading.Thread(target = self._run, name = "palmopsim-batcher", daemon = True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, params):
+        """
+        Returns a Future resolving to the result dict for one parameter set.
+        Invalid parameters or unknown scenarios raise ValueError here, on the
+        caller's thread, so they never reach the batcher.
+        """
+        params = resolve_parameter_set(_clean_params(params))
+        key = param_hash(params)
+        future = Future()
+        cached = self.cache.get(key)
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        self._queue.put((params, key, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout = remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._dispatch(batch)
+                    return
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        # Identical requests in one batch share a single evaluation
+        try:
+            unique = OrderedDict()
+            for params, key, future in batch:
+                unique.setdefault(key, (params, []))[1].append(future)
+            keys = list(unique)
+            grouped = group_parameter_sets([unique[k][0] for k in keys])
+        except Exception as e:
+            # Fail only this batch; the batcher thread keeps serving later requests
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += len(batch)
+            self.engine_tasks += len(grouped)
+            self.in_flight += len(batch)
+
+        tasks_in_flight = WORKER_TASKS_IN_FLIGHT.labels(pool = "service")
+        for positions, task in grouped:
+            try:
+                engine_future = self.executor.submit(run_group, task)
+            except Exception as e:
+                self._fail(positions, keys, unique, e)
+                continue
+            tasks_in_flight.inc()
+            engine_future.add_done_callback(partial(self._complete, positions, task, keys, unique))
+
+    def _complete(self, positions, task, keys, unique, engine_future):
+        WORKER_TASKS_IN_FLIGHT.labels(pool = "service").dec()
+        try:
+            output = engine_future.result()
+        except Exception as e:
+            self._fail(positions, keys, unique, e)
+            return
+
+        WORKER_BUSY_SECONDS.labels(pool = "service").inc(output["busy_seconds"])
+        record_group_outputs("service", [output])
+        results = unpack_group_output([(positions, task)], [output], len(keys))
+        for position in positions:
+            result = results[position]
+            self.cache.put(keys[position], result)
+            self._resolve(unique[keys[position]][1], result = result)
+
+    def _fail(self, positions, keys, unique, error):
+        for position in positions:
+            self._resolve(unique[keys[position]][1], error = error)
+
+    def _resolve(self, futures, result = None, error = None):
+        for future in futures:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        with self._lock:
+            self.in_flight -= len(futures)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "batches": self.batches,
+                "batched_requests": self.batched_requests,
+                "engine_tasks": self.engine_tasks,
+                "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0
+            }
+
+# ------------------------
+# Simulation Service (19/10/2026)
+# ------------------------
+
+class SimulationService:
+    """
+    Engine front end shared by all HTTP handler threads.
+    """
+
+    def __init__(self, max_workers = None, use_threads = False, batch_window = 0.005,
+                 max_batch = 256, cache_size = 4096):
+        max_workers = max_workers or os.cpu_count() or 1
+        pool = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+        self.executor = pool(max_workers = max_workers)
+        self.max_workers = max_workers
+        WORKERS.labels(pool = "service").set(max_workers)
+        self.cache = ResultCache(cache_size)
+        self.latency = LatencyTracker()
+        self.batcher = SimulationBatcher(self.executor, self.cache, batch_window, max_batch)
+        self.started_at = time.time()
+
+    def close(self):
+        self.batcher.close()
+        self.executor.shutdown()
+
+    def simulate(self, params):
+        return _to_json_result(self.batcher.submit(params).result())
+
+    def sensitivity(self, base_params, factor_name, low_value, high_value):
+        """
+        Same output as run_sensitivity_analysis; the three runs go through one batch.
+        """
+        base_params = _clean_params(base_params)
+        if factor_name not in SERVICE_PARAMS:
+            raise ValueError(f"Unknown factor {factor_name!r}")
+        futures = [
+            self.batcher.submit(base_params),
+            self.batcher.submit({**base_params, factor_name: low_value}),
+            self.batcher.submit({**base_params, factor_name: high_value})
+        ]
+        baseline_ffb, low_ffb, high_ffb = (f.result()["total_ffb"] for f in futures)
+        _check_finite([baseline_ffb, low_ffb, high_ffb])
+        return {
+            "Factor": factor_name,
+            "Low_Change_%": round((low_ffb - baseline_ffb) / baseline_ffb * 100, 2),
+            "High_Change_%": round((high_ffb - baseline_ffb) / baseline_ffb * 100, 2)
+        }
+
+    def sweep(self, axes, base_params = None):
+        base_params = _clean_params(base_params or {})
+        for name, values in axes.items():
+            for value in values:
+                _clean_params({SWEEP_AXES.get(name, name): value})
+        key = "sweep:" + json.dumps({"axes": axes, "base": param_hash(base_params)}, sort_keys = True)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = run_sweep(axes, base_params, executor = self.executor, pool = "service")
+        _check_finite(result.series["annual_summary"])
+        payload = {
+            "dims": result.dims,
+            "coords": result.coords,
+            "years": result.years.tolist(),
+            "kpis": {k: v.tolist() for k, v in result.kpis.items()},
+            "series": {k: v.tolist() for k, v in result.series.items()}
+        }
+        self.cache.put(key, payload)
+        return payload
+
+    def metrics(self):
+        return {
+            "uptime_s": time.time() - self.started_at,
+            "workers": self.max_workers,
+            "requests": self.latency.snapshot(),
+            "batching": self.batcher.snapshot(),
+            "cache": self.cache.snapshot()
+        }
+
+    def prometheus_metrics(self):
+        """
+        Returns the process metrics registry in Prometheus text format.
+        """
+        QUEUE_DEPTH.set(self.batcher.queue_depth)
+        REQUESTS_IN_FLIGHT.set(self.batcher.in_flight)
+        CACHE_ENTRIES.labels(cache = self.cache.name).set(self.cache.snapshot()["size"])
+        return REGISTRY.render()
+
+def _clean_params(params):
+    unknown = set(params) - set(SERVICE_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+    params = dict(params)
+    for name in NUMERIC_PARAMS:
+        if name not in params or (params[name] is None and name in OPTIONAL_PARAMS):
+            continue
+        value = params[name]
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise ValueError(f"{name} must be a number, got {value!r}")
+        if not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number, got {value!r}")
+        if name in INTEGER_PARAMS and value != int(value):
+            raise ValueError(f"{name} must be a whole number, got {value!r}")
+    for name in ("num_blocks", "simulation_years"):
+        if name in params and params[name] < 1:
+            raise ValueError(f"{name} must be at least 1, got {params[name]!r}")
+    if "block_area_ha" in params and params["block_area_ha"] <= 0:
+        raise ValueError(f"block_area_ha must be positive, got {params['block_area_ha']!r}")
+    # Same bounds as register_scenario
+    if params.get("replant_rate") is not None and not 0 <= params["replant_rate"] <= 1:
+        raise ValueError(f"replant_rate must be between 0 and 1, got {params['replant_rate']!r}")
+    if params.get("yield_adjustment") is not None and params["yield_adjustment"] <= -1:
+        raise ValueError(f"yield_adjustment must be above -1, got {params['yield_adjustment']!r}")
+    if "noise_mode" in params and params["noise_mode"] not in NOISE_MODES:
+        raise ValueError(f"noise_mode must be one of {NOISE_MODES}, got {params['noise_mode']!r}")
+    if "antithetic" in params and not isinstance(params["antithetic"], bool):
+        raise ValueError(f"antithetic must be true or false, got {params['antithetic']!r}")
+    if "initial_age_range" in params:
+        age_range = params["initial_age_range"]
+        if (not isinstance(age_range, (list, tuple)) or len(age_range) != 2
+                or not all(isinstance(age, int) and not isinstance(age, bool) for age in age_range)
+                or age_range[0] > age_range[1]):
+            raise ValueError(f"initial_age_range must be [low, high] whole numbers, got {age_range!r}")
+        params["initial_age_range"] = tuple(age_range)
+    return params
+
+def _check_finite(values):
+    # JSON has no Infinity / NaN; extreme inputs can overflow the engine
+    if not np.isfinite(np.asarray(values, dtype = float)).all():
+        raise ValueError("Parameters are outside the engine's range: the result is not finite")
+
+def _to_json_result(result):
+    _check_finite(result["annual_summary"])
+    years = np.arange(1, len(result["annual_summary"]) + 1)
+    return {
+        "total_ffb": result["total_ffb"],
+        "average_yield": result["average_yield"],
+        "old_blocks": result["old_blocks"],
+        "years": years.tolist(),
+        "annual_summary": np.asarray(result["annual_summary"]).tolist(),
+        "annual_yield": np.asarray(result["annual_yield"]).tolist()
+    }
+
+# ------------------------
+# HTTP Layer (19/10/2026)
+# POST /simulate     {run_simulation params}
+# POST /sensitivity  {"base_params", "factor_name", "low_value", "high_value"}
+# POST /sweep        {"axes", "base_params"}
+# GET  /metrics      Prometheus text format (throughput, latency, cache, workers)
+# GET  /metrics.json latency percentiles, queue depth, batching and cache statistics
+# GET  /health
+# ------------------------
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PalmOpsSim/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond("/health", time.perf_counter(), 200, {"status": "ok"})
+        elif self.path == "/metrics":
+            started = time.perf_counter()
+            data = self.service.prometheus_metrics().encode("utf-8")
+            self._send(200, PROMETHEUS_CONTENT_TYPE, data)
+            self.service.latency.record("/metrics", time.perf_counter() - started)
+        elif self.path == "/metrics.json":
+            self._respond("/metrics.json", time.perf_counter(), 200, self.service.metrics())
+        else:
+            self._respond(None, time.perf_counter(), 404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        routes = {
+            "/simulate": lambda body: self.service.simulate(body),
+            "/sensitivity": lambda body: self.service.sensitivity(
+                body["base_params"], body["factor_name"], body["low_value"], body["high_value"]
+            ),
+            "/sweep": lambda body: self.service.sweep(body["axes"], body.get("base_params"))
+        }
+        if self.path not in routes:
+            self._respond(None, started, 404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            payload = routes[self.path](body)
+        except (ValueError, KeyError, TypeError) as e:
+            self._respond(self.path, started, 400, {"error": str(e)})
+        except Exception as e:
+            self._respond(self.path, started, 500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._respond(self.path, started, 200, payload)
+
+    def _respond(self, endpoint, started, status, payload):
+        self._send(status, "application/json", json.dumps(payload).encode("utf-8"))
+        if endpoint is not None:
+            self.service.latency.record(endpoint, time.perf_counter() - started)
+
+    def _send(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet; metrics cover request activity
+        pass
+
+class SimulationServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256 # Listen backlog; the default of 5 drops bursts of concurrent clients
+
+    def __init__(self, address, service):
+        super().__init__(address, SimulationRequestHandler)
+        self.service = service
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
+
+def create_server(host = DEFAULT_HOST, port = DEFAULT_PORT, **service_options):
+    """
+    Returns a SimulationServer (call serve_forever()); port 0 picks a free port.
+    service_options are passed to SimulationService.
+    """
+    return SimulationServer((host, port), SimulationService(**service_options))
+
+def main():
+    parser = argparse.ArgumentParser(description = "PalmOpsSim local simulation service")
+    parser.add_argument("--host", default = DEFAULT_HOST)
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    parser.add_argument("--workers", type = int, default = None, help = "Engine workers (default: one per CPU)")
+    parser.add_argument("--threads", action = "store_true", help = "Use a thread pool instead of processes")
+    parser.add_argument("--batch-window-ms", type = float, default = 5.0)
+    parser.add_argument("--max-batch", type = int, default = 256)
+    parser.add_argument("--cache-size", type = int, default = 4096)
+    args = parser.parse_args()
+
+    server = create_server(
+        args.host,
+        args.port,
+        max_workers = args.workers,
+        use_threads = args.threads,
+        batch_window = args.batch_window_ms / 1000,
+        max_batch = args.max_batch,
+        cache_size = args.cache_size
+    )
+    print(f"PalmOpsSim service listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
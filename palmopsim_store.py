@@ -0,0 +1,324 @@
+"""
+PalmOpsSim - Run Store
+Persists simulation runs (parameters, KPIs, annual series and optionally the
+block-year table) in a local SQLite file so past runs can be queried and
+reloaded without re-simulating.
+"""
+
+import hashlib
+import inspect
+import io
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from palmopsim_model import run_simulation
+
+DEFAULT_STORE_PATH = "palmopsim_runs.db"
+
+# Parameters stored as their own indexed columns (everything else lives in the JSON blob)
+PARAM_COLUMNS = [
+    "scenario_name",
+    "num_blocks",
+    "simulation_years",
+    "fertilizer",
+    "harvest_interval",
+    "climate_slider",
+    "pest_slider",
+    "replant_rate",
+    "random_seed",
+    "block_area_ha"
+]
+KPI_COLUMNS = ["total_ffb", "average_yield", "old_blocks"]
+QUERY_OPERATORS = {"=", "!=", "<", "<=", ">", ">="}
+
+# run_simulation arguments that control checkpointing, not the modelled estate
+CHECKPOINT_ARGS = ("start_state", "return_state")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    param_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    batch_id TEXT,
+    params TEXT NOT NULL,
+    scenario_name TEXT,
+    num_blocks INTEGER,
+    simulation_years INTEGER,
+    fertilizer REAL,
+    harvest_interval REAL,
+    climate_slider REAL,
+    pest_slider REAL,
+    replant_rate REAL,
+    random_seed INTEGER,
+    block_area_ha REAL,
+    total_ffb REAL,
+    average_yield REAL,
+    old_blocks INTEGER
+);
+CREATE TABLE IF NOT EXISTS annual (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    year INTEGER NOT NULL,
+    total_ffb REAL,
+    annual_yield REAL,
+    PRIMARY KEY (run_id, year)
+);
+CREATE TABLE IF NOT EXISTS block_tables (
+    run_id INTEGER PRIMARY KEY REFERENCES runs(run_id) ON DELETE CASCADE,
+    columns BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_param_hash ON runs(param_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_batch_id ON runs(batch_id);
+CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs(scenario_name, total_ffb);
+CREATE INDEX IF NOT EXISTS idx_runs_fertilizer ON runs(fertilizer);
+CREATE INDEX IF NOT EXISTS idx_runs_climate ON runs(climate_slider);
+CREATE INDEX IF NOT EXISTS idx_runs_pest ON runs(pest_slider);
+CREATE INDEX IF NOT EXISTS idx_runs_total_ffb ON runs(total_ffb);
+"""
+
+# ------------------------
+# Parameter Hashing (19/10/2026)
+# ------------------------
+
+def normalise_params(params):
+    """
+    Fills in run_simulation defaults so equivalent calls hash identically.
+    """
+    defaults = {
+        name: p.default
+        for name, p in inspect.signature(run_simulation).parameters.items()
+        if name not in CHECKPOINT_ARGS
+    }
+    full = {**defaults, **params}
+    for name in CHECKPOINT_ARGS:
+        full.pop(name, None)
+    full["initial_age_range"] = list(full["initial_age_range"])
+    for name, value in full.items():
+        if isinstance(value, np.ndarray):
+            full[name] = array_digest(value)
+    return full
+
+def array_digest(values):
+    """
+    Content digest of an array parameter (e.g. climate_factors). str() of a large
+    array elides its middle, so equal text does not mean equal contents.
+    """
+    values = np.ascontiguousarray(values)
+    return (
+        f"ndarray(dtype={values.dtype.str}, shape={values.shape}, "
+        f"sha1={hashlib.sha1(values.tobytes()).hexdigest()})"
+    )
+
+def param_hash(params):
+    """
+    Returns a stable SHA-256 hash of a run_simulation parameter dict.
+    """
+    payload = json.dumps(normalise_params(params), sort_keys = True, default = str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ------------------------
+# Block Table Encoding (19/10/2026)
+# The block-year table is stored column by column in a compressed .npz blob
+# ------------------------
+
+def encode_columns(df):
+    buffer = io.BytesIO()
+    arrays = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays[col] = values
+    np.savez_compressed(buffer, __columns__ = np.array(list(df.columns)), **arrays)
+    return buffer.getvalue()
+
+def decode_columns(blob):
+    with np.load(io.BytesIO(blob), allow_pickle = False) as data:
+        columns = [str(c) for c in data["__columns__"]]
+        return pd.DataFrame({col: data[col] for col in columns})
+
+# ------------------------
+# Run Store (19/10/2026)
+# ------------------------
+
+class RunStore:
+    """
+    Local SQLite store of simulation runs, indexed by parameter hash and timestamp.
+    """
+
+    def __init__(self, path = DEFAULT_STORE_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def save_run(self, params, results, include_blocks = False, batch_id = None):
+        """
+        Saves one run_simulation call. Returns the new run_id.
+        """
+        full_params = normalise_params(params)
+        row = {col: _to_python(full_params.get(col)) for col in PARAM_COLUMNS}
+        row.update({col: _to_python(results[col]) for col in KPI_COLUMNS})
+        row.update({
+            "param_hash": param_hash(params),
+            "created_at": time.time(),
+            "batch_id": batch_id,
+            "params": json.dumps(full_params, sort_keys = True, default = str)
+        })
+
+        columns = list(row)
+        placeholders = ", ".join("?" for _ in columns)
+        annual_summary = results["annual_summary"]
+        annual_yield = results["annual_yield"]
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                f"INSERT INTO runs ({', '.join(columns)}) VALUES ({placeholders})",
+                [row[c] for c in columns]
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO annual (run_id, year, total_ffb, annual_yield) VALUES (?, ?, ?, ?)",
+                [
+                    (run_id, int(year), float(annual_summary.loc[year]), float(annual_yield.loc[year]))
+                    for year in annual_summary.index
+                ]
+            )
+            if include_blocks:
+                conn.execute(
+                    "INSERT INTO block_tables (run_id, columns) VALUES (?, ?)",
+                    (run_id, encode_columns(results["dataframe"]))
+                )
+        return run_id
+
+    def load_run(self, run_id):
+        """
+        Returns a stored run in the same shape as run_simulation's result dict.
+        "dataframe" is None when the block table was not saved. Also includes "params".
+        """
+        with closing(self._connect()) as conn:
+            run = conn.execute(
+                "SELECT params, total_ffb, average_yield, old_blocks FROM runs WHERE run_id = ?",
+                (run_id,)
+            ).fetchone()
+            if run is None:
+                raise KeyError(f"No stored run with run_id {run_id}")
+            annual = conn.execute(
+                "SELECT year, total_ffb, annual_yield FROM annual WHERE run_id = ? ORDER BY year",
+                (run_id,)
+            ).fetchall()
+            blocks = conn.execute(
+                "SELECT columns FROM block_tables WHERE run_id = ?", (run_id,)
+            ).fetchone()
+
+        years = pd.Index([a[0] for a in annual], name = "Year")
+        params = json.loads(run[0])
+        params["initial_age_range"] = tuple(params["initial_age_range"])
+        return {
+            "params": params,
+            "dataframe": decode_columns(blocks[0]) if blocks else None,
+            "total_ffb": run[1],
+            "average_yield": run[2],
+            "old_blocks": run[3],
+            "annual_summary": pd.Series([a[1] for a in annual], index = years, name = "Total_FFB_t"),
+            "annual_yield": pd.Series([a[2] for a in annual], index = years, name = "Total_FFB_t")
+        }
+
+    def find_runs(self, filters = None, order_by = "created_at", descending = True, limit = None):
+        """
+        Queries run metadata and KPIs. Returns a DataFrame (one row per run).
+        filters: dict of column -> value, or column -> (operator, value),
+        e.g. {"pest_slider": (">=", 10), "scenario_name": "Moderate"}.
+        """
+        allowed = set(PARAM_COLUMNS + KPI_COLUMNS + ["run_id", "param_hash", "created_at", "batch_id"])
+        clauses = []
+        values = []
+        for column, condition in (filters or {}).items():
+            if column not in allowed:
+                raise ValueError(f"Cannot filter on {column!r}")
+            op, value = condition if isinstance(condition, tuple) else ("=", condition)
+            if op not in QUERY_OPERATORS:
+                raise ValueError(f"Unsupported operator {op!r}")
+            if value is None:
+                clauses.append(f"{column} IS {'NOT ' if op == '!=' else ''}NULL")
+            else:
+                clauses.append(f"{column} {op} ?")
+                values.append(value)
+
+        if order_by not in allowed:
+            raise ValueError(f"Cannot order by {order_by!r}")
+
+        sql = f"SELECT run_id, param_hash, created_at, batch_id, {', '.join(PARAM_COLUMNS + KPI_COLUMNS)} FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}, run_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(int(limit))
+
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params = values)
+        df["created_at"] = pd.to_datetime(df["created_at"], unit = "s")
+        return df
+
+    def best_run(self, kpi = "total_ffb", filters = None):
+        """
+        Returns the row of the best run by a KPI (highest value), or None.
+        """
+        df = self.find_runs(filters, order_by = kpi, descending = True, limit = 1)
+        return None if df.empty else df.iloc[0]
+
+    def latest_for_params(self, params):
+        """
+        Returns the run_id of the most recent run with identical parameters, or None.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT run_id FROM runs WHERE param_hash = ? ORDER BY created_at DESC LIMIT 1",
+                (param_hash(params),)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def list_batches(self, limit = 50):
+        """
+        Returns recent batches (runs saved together), newest first.
+        """
+        sql = (
+            "SELECT batch_id, MIN(created_at) AS created_at, "
+            "GROUP_CONCAT(scenario_name, ', ') AS scenarios, "
+            "MAX(simulation_years) AS simulation_years, MAX(num_blocks) AS num_blocks "
+            "FROM runs WHERE batch_id IS NOT NULL GROUP BY batch_id "
+            "ORDER BY created_at DESC LIMIT ?"
+        )
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params = [int(limit)])
+        df["created_at"] = pd.to_datetime(df["created_at"], unit = "s")
+        return df
+
+    def load_batch(self, batch_id):
+        """
+        Returns {scenario_name: result dict} for every run in a batch.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT run_id, scenario_name FROM runs WHERE batch_id = ? ORDER BY run_id",
+                (batch_id,)
+            ).fetchall()
+        return {scenario: self.load_run(run_id) for run_id, scenario in rows}
+
+    def delete_run(self, run_id):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+def _to_python(value):
+    # SQLite cannot bind numpy scalars
+    return value.item() if isinstance(value, np.generic) else value
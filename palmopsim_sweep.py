@@ -0,0 +1,640 @@
+"""
+PalmOpsSim - Parameter Sweeps
+Runs run_simulation over the Cartesian product of parameter axes and returns
+a labelled N-dimensional result cube (KPIs + annual series).
+Contains simulation logic only (no printing, no plotting, no exports)
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from palmopsim_metrics import (
+    WORKER_BUSY_SECONDS, WORKER_TASKS_IN_FLIGHT, WORKERS, instrumented, record_simulations
+)
+from palmopsim_model import (
+    resolve_scenario, simulate_trajectory, block_yields, block_year_frame, summarise_results, pest_infestation
+)
+from palmopsim_parallel import SharedArrays, attach_arrays
+
+# run_simulation arguments that can be swept, plus short aliases
+SWEEP_AXES = {
+    "scenario": "scenario_name",
+    "scenario_name": "scenario_name",
+    "fertilizer": "fertilizer",
+    "climate_slider": "climate_slider",
+    "pest_slider": "pest_slider",
+    "harvest_interval": "harvest_interval",
+    "replant_rate": "replant_rate",
+    "yield_adjustment": "yield_adjustment",
+    "seed": "random_seed",
+    "random_seed": "random_seed",
+    "antithetic": "antithetic"
+}
+
+# Same defaults as run_simulation
+DEFAULT_PARAMS = {
+    "scenario_name": "Conservative",
+    "yield_adjustment": None,
+    "num_blocks": 10,
+    "simulation_years": 10,
+    "fertilizer": 0,
+    "harvest_interval": 12,
+    "block_area_ha": 25,
+    "initial_age_range": (3, 25),
+    "random_seed": 42,
+    "climate_slider": 0,
+    "pest_slider": 5,
+    "replant_rate": None,
+    "noise_mode": "legacy",
+    "antithetic": False,
+    "pest_model": None,
+    "climate_factors": None
+}
+
+KPI_NAMES = ["total_ffb", "average_yield", "old_blocks"]
+SERIES_NAMES = ["annual_summary", "annual_yield"]
+
+# Upper bound on parameter-set x block-year cells evaluated in one kernel call
+CHUNK_CELLS = 2_000_000
+
+# ------------------------
+# Sweep Result Cube (19/10/2026)
+# ------------------------
+
+class SweepResult:
+    """
+    Labelled N-D array of sweep outputs.
+    kpis[name] has shape (len(coords[d]) for d in dims); series[name] has one
+    extra trailing axis over years.
+    """
+
+    def __init__(self, dims, coords, kpis, series, years):
+        self.dims = list(dims)
+        self.coords = {d: list(coords[d]) for d in self.dims}
+        self.kpis = kpis
+        self.series = series
+        self.years = np.asarray(years)
+
+    @property
+    def shape(self):
+        return tuple(len(self.coords[d]) for d in self.dims)
+
+    def sel(self, **indexers):
+        """
+        Selects coordinate values by label. A scalar drops the axis, a list keeps it.
+        """
+        unknown = set(indexers) - set(self.dims)
+        if unknown:
+            raise KeyError(f"Unknown sweep axes: {sorted(unknown)}")
+
+        kpis = dict(self.kpis)
+        series = dict(self.series)
+        dims = []
+        coords = {}
+        axis = 0
+        for d in self.dims:
+            if d not in indexers:
+                dims.append(d)
+                coords[d] = self.coords[d]
+                axis += 1
+                continue
+
+            labels = indexers[d]
+            if isinstance(labels, (list, tuple, np.ndarray)):
+                position = [self._position(d, v) for v in labels]
+                dims.append(d)
+                coords[d] = list(labels)
+            else:
+                position = self._position(d, labels)
+
+            kpis = {k: np.take(v, position, axis = axis) for k, v in kpis.items()}
+            series = {k: np.take(v, position, axis = axis) for k, v in series.items()}
+            if d in coords:
+                axis += 1
+
+        return SweepResult(dims, coords, kpis, series, self.years)
+
+    def to_frame(self, kpi = "total_ffb", index = None, columns = None):
+        """
+        Returns a 2-D cut of a KPI as a DataFrame (rows = index axis, columns = columns axis).
+        All other axes must already be reduced with sel().
+        """
+        if len(self.dims) != 2:
+            raise ValueError(f"to_frame needs exactly 2 remaining axes, got {self.dims}")
+        for d in (index, columns):
+            if d is not None and d not in self.dims:
+                raise KeyError(f"Unknown sweep axis {d!r}; remaining axes are {self.dims}")
+        if index is None:
+            index = next(d for d in self.dims if d != columns)
+        if columns is None:
+            columns = next(d for d in self.dims if d != index)
+        if index == columns:
+            raise ValueError(f"index and columns must be different axes, got {index!r} for both")
+        values = self.kpis[kpi]
+        if self.dims.index(index) == 1:
+            values = values.T
+        return pd.DataFrame(
+            values,
+            index = pd.Index(self.coords[index], name = index),
+            columns = pd.Index(self.coords[columns], name = columns)
+        )
+
+    def to_long(self):
+        """
+        Returns one row per parameter combination with a column per KPI.
+        """
+        grid = list(itertools.product(*(self.coords[d] for d in self.dims)))
+        df = pd.DataFrame(grid, columns = self.dims)
+        for name, values in self.kpis.items():
+            df[name] = values.reshape(-1)
+        return df
+
+    def annual_frame(self, series = "annual_summary"):
+        """
+        Returns an annual series in long form: one row per combination and year.
+        """
+        grid = list(itertools.product(*(self.coords[d] for d in self.dims), self.years))
+        df = pd.DataFrame(grid, columns = self.dims + ["Year"])
+        df[series] = self.series[series].reshape(-1)
+        return df
+
+    def _position(self, dim, label):
+        try:
+            return self.coords[dim].index(label)
+        except ValueError:
+            raise KeyError(f"{label!r} is not a coordinate of axis {dim!r}") from None
+
+# ------------------------
+# Sweep Runner (19/10/2026)
+# Parameter combinations are grouped by the inputs that shape the block
+# trajectory (seed, replanting rate). Each group simulates its trajectory once
+# and evaluates every management combination in a single vectorised pass.
+# Groups are independent and can be spread over worker processes.
+# ------------------------
+
+@instrumented("run_sweep")
+def run_sweep(axes, base_params = None, max_workers = None, executor = None, pool = "sweep"):
+    """
+    Runs the Cartesian product of the given axes.
+    axes: dict of axis name -> list of values. Names are run_simulation
+    arguments (scenario_name, fertilizer, climate_slider, pest_slider,
+    harvest_interval, replant_rate, yield_adjustment, random_seed, antithetic) or the aliases
+    scenario / seed.
+    base_params: run_simulation arguments held fixed across the sweep (aliases
+    accepted, unknown names raise TypeError).
+    max_workers: worker processes (None = one per CPU, 1 = run in-process).
+    executor: optional existing concurrent.futures executor to run groups on.
+    pool: label for the worker utilisation metrics (e.g. "service" with its executor).
+    Returns a SweepResult.
+    """
+    swept = {}
+    for name in axes:
+        if name not in SWEEP_AXES:
+            raise ValueError(f"Cannot sweep {name!r}; choose from {sorted(SWEEP_AXES)}")
+        if SWEEP_AXES[name] in swept:
+            raise ValueError(f"Axes {swept[SWEEP_AXES[name]]!r} and {name!r} both set {SWEEP_AXES[name]}; give only one")
+        swept[SWEEP_AXES[name]] = name
+
+    params = merge_base_params(base_params)
+    dims = list(axes)
+    coords = {d: list(axes[d]) for d in dims}
+    shape = tuple(len(coords[d]) for d in dims)
+    years = params["simulation_years"]
+
+    param_sets = []
+    for combo in itertools.product(*(coords[d] for d in dims)):
+        run_params = dict(params)
+        for d, value in zip(dims, combo):
+            run_params[SWEEP_AXES[d]] = value
+        param_sets.append(run_params)
+
+    grouped = group_parameter_sets(param_sets)
+    outputs = run_groups([task for _, task in grouped], max_workers, executor, pool)
+    record_group_outputs("run_sweep", outputs)
+
+    n_combos = int(np.prod(shape))
+    kpis = {
+        "total_ffb": np.empty(n_combos),
+        "average_yield": np.empty(n_combos),
+        "old_blocks": np.empty(n_combos, dtype = int)
+    }
+    series = {name: np.empty((n_combos, years)) for name in SERIES_NAMES}
+
+    for (positions, _), output in zip(grouped, outputs):
+        for name in KPI_NAMES:
+            kpis[name][positions] = output[name]
+        for name in SERIES_NAMES:
+            series[name][positions] = output[name]
+
+    kpis = {k: v.reshape(shape) for k, v in kpis.items()}
+    series = {k: v.reshape(shape + (years,)) for k, v in series.items()}
+    return SweepResult(dims, coords, kpis, series, np.arange(1, years + 1))
+
+def merge_base_params(base_params):
+    """
+    DEFAULT_PARAMS updated with base_params. The scenario / seed aliases are
+    accepted; unknown names raise TypeError, as in run_scenarios.
+    """
+    params = dict(DEFAULT_PARAMS)
+    given = {}
+    for name, value in (base_params or {}).items():
+        key = SWEEP_AXES.get(name, name)
+        if key not in DEFAULT_PARAMS:
+            raise TypeError(f"Unknown run_simulation argument {name!r} in base_params")
+        if key in given:
+            raise ValueError(f"base_params {given[key]!r} and {name!r} both set {key}; give only one")
+        given[key] = name
+        params[key] = value
+    return params
+
+# ------------------------
+# Batched Parameter Sets (19/10/2026)
+# The same grouping for an arbitrary list of parameter dicts (not a grid), e.g.
+# concurrent requests collected by the HTTP service.
+# ------------------------
+
+def resolve_parameter_set(run_params):
+    """
+    Returns run_params with the scenario's yield_adjustment and replant_rate
+    filled in, so the set no longer depends on this process's scenario registry
+    (e.g. before shipping it to a remote worker).
+    """
+    yield_adjustment, replant_rate = resolve_scenario(
+        run_params.get("scenario_name", DEFAULT_PARAMS["scenario_name"]),
+        run_params.get("replant_rate"),
+        run_params.get("yield_adjustment")
+    )
+    return {**run_params, "yield_adjustment": yield_adjustment, "replant_rate": replant_rate}
+
+def group_parameter_sets(param_sets):
+    """
+    Groups run_simulation parameter dicts by everything that shapes the block
+    trajectory. Returns a list of (positions, task) pairs, where positions index
+    param_sets and each task is evaluated by run_group.
+    """
+    groups = {}
+    for position, run_params in enumerate(param_sets):
+        run_params = {**DEFAULT_PARAMS, **run_params}
+        yield_adjustment, replant_rate = resolve_scenario(
+            run_params["scenario_name"], run_params["replant_rate"], run_params["yield_adjustment"]
+        )
+        key = (
+            run_params["num_blocks"],
+            run_params["simulation_years"],
+            tuple(run_params["initial_age_range"]),
+            run_params["block_area_ha"],
+            run_params["noise_mode"],
+            id(run_params["pest_model"]),
+            id(run_params["climate_factors"]),
+            run_params["random_seed"],
+            replant_rate,
+            run_params["antithetic"]
+        )
+        if key not in groups:
+            estate = {
+                "num_blocks": run_params["num_blocks"],
+                "simulation_years": run_params["simulation_years"],
+                "initial_age_range": run_params["initial_age_range"],
+                "block_area_ha": run_params["block_area_ha"],
+                "noise_mode": run_params["noise_mode"],
+                "pest_model": run_params["pest_model"],
+                "climate_factors": run_params["climate_factors"]
+            }
+            trajectory_key = (run_params["random_seed"], replant_rate, run_params["antithetic"])
+            groups[key] = (estate, trajectory_key, [], [])
+
+        management = (
+            yield_adjustment,
+            run_params["fertilizer"],
+            run_params["harvest_interval"],
+            run_params["climate_slider"],
+            run_params["pest_slider"]
+        )
+        groups[key][2].append(position)
+        groups[key][3].append(management)
+
+    return [
+        (positions, (estate, trajectory_key, np.asarray(management, dtype = float)))
+        for estate, trajectory_key, positions, management in groups.values()
+    ]
+
+def run_groups(tasks, max_workers = None, executor = None, pool = "sweep"):
+    """
+    Evaluates run_group tasks in-process, on a new process pool, or on a given executor.
+    pool labels the worker utilisation metrics.
+    """
+    in_flight = WORKER_TASKS_IN_FLIGHT.labels(pool = pool)
+    in_flight.inc(len(tasks))
+    try:
+        if executor is not None:
+            outputs = list(executor.map(run_group, tasks))
+        else:
+            if max_workers is None:
+                max_workers = os.cpu_count() or 1
+            workers = min(max_workers, len(tasks)) if max_workers > 1 and len(tasks) > 1 else 1
+            WORKERS.labels(pool = pool).set(workers)
+            if workers > 1:
+                outputs = run_groups_shared(tasks, workers)
+            else:
+                outputs = [run_group(task) for task in tasks]
+    finally:
+        in_flight.dec(len(tasks))
+    WORKER_BUSY_SECONDS.labels(pool = pool).inc(sum(output["busy_seconds"] for output in outputs))
+    return outputs
+
+def record_group_outputs(entry_point, outputs):
+    """
+    Counts the simulations and block-years in run_group outputs under entry_point.
+    """
+    record_simulations(
+        entry_point,
+        sum(len(output["total_ffb"]) for output in outputs),
+        sum(output["block_years"] for output in outputs)
+    )
+
+def unpack_group_output(grouped, outputs, count):
+    """
+    Splits run_group outputs back into one result dict per parameter set.
+    """
+    results = [None] * count
+    for (positions, _), output in zip(grouped, outputs):
+        for i, position in enumerate(positions):
+            result = {name: output[name][i].item() for name in KPI_NAMES}
+            result.update({name: output[name][i] for name in SERIES_NAMES})
+            results[position] = result
+    return results
+
+def run_group(task):
+    """
+    Simulates one trajectory and evaluates all management rows against it.
+    """
+    estate, trajectory_key, management = task
+    out = group_output_arrays(len(management), estate["simulation_years"])
+
+    # Spatial pest losses do not depend on management inputs: compute once per group
+    pest_model = estate["pest_model"]
+    extra_pest = 0.0
+    if pest_model is not None:
+        extra_pest = 100 * pest_model.block_losses(estate["simulation_years"])
+
+    stats = evaluate_group(estate, trajectory_key, management, out, extra_pest, estate["climate_factors"])
+    return {**out, **stats}
+
+def group_output_arrays(n_sets, years):
+    """
+    Empty output arrays of run_group for n_sets parameter sets.
+    """
+    return {
+        "total_ffb": np.empty(n_sets),
+        "average_yield": np.empty(n_sets),
+        "old_blocks": np.empty(n_sets, dtype = int),
+        "annual_summary": np.empty((n_sets, years)),
+        "annual_yield": np.empty((n_sets, years))
+    }
+
+def evaluate_group(estate, trajectory_key, management, out, extra_pest = 0.0, climate_factors = None):
+    """
+    Simulates the group's trajectory and writes the KPIs and annual series of
+    every management row into out (arrays from group_output_arrays, possibly
+    shared memory). climate_factors is (years, blocks), or (rows, years, blocks)
+    with one set per management row. Returns block_years and busy_seconds.
+    """
+    started = time.perf_counter()
+    seed, replant_rate, antithetic = trajectory_key
+    num_blocks = estate["num_blocks"]
+    years = estate["simulation_years"]
+    block_area_ha = estate["block_area_ha"]
+
+    trajectory = simulate_trajectory(
+        num_blocks = num_blocks,
+        simulation_years = years,
+        initial_age_range = estate["initial_age_range"],
+        random_seed = seed,
+        replant_rate = replant_rate,
+        noise_mode = estate["noise_mode"],
+        antithetic = antithetic
+    )
+
+    climate_noise = trajectory["climate_noise"]
+    if climate_factors is not None:
+        climate_noise = np.asarray(climate_factors, dtype = float)
+
+    n_sets = len(management)
+    annual_summary = out["annual_summary"]
+    total_ffb = np.empty(n_sets)
+    chunk = max(1, CHUNK_CELLS // (years * num_blocks))
+    for start in range(0, n_sets, chunk):
+        rows = management[start:start + chunk]
+        columns = [rows[:, i].reshape(-1, 1, 1) for i in range(rows.shape[1])]
+        yield_t_ha = block_yields(
+            trajectory["ages"],
+            climate_noise[start:start + chunk] if climate_noise.ndim == 3 else climate_noise,
+            trajectory["block_variation"],
+            yield_adjustment = columns[0],
+            fertilizer = columns[1],
+            harvest_interval = columns[2],
+            climate_slider = columns[3],
+            pest_slider = columns[4] + extra_pest
+        )
+        block_ffb = np.round(yield_t_ha * block_area_ha, 2)
+        annual_summary[start:start + chunk] = block_ffb.sum(axis = 2)
+        total_ffb[start:start + chunk] = block_ffb.reshape(len(rows), -1).sum(axis = 1)
+
+    annual_area = num_blocks * block_area_ha
+    out["total_ffb"][:] = np.round(total_ffb, 1)
+    out["average_yield"][:] = np.round(total_ffb / (annual_area * years), 2)
+    out["old_blocks"][:] = int((trajectory["ages"][-1] > 25).sum())
+    out["annual_yield"][:] = annual_summary / annual_area
+
+    return {
+        # Measured in the worker, so utilisation also covers process pools
+        "block_years": n_sets * years * num_blocks,
+        "busy_seconds": time.perf_counter() - started
+    }
+
+# ------------------------
+# Shared-Memory Process Pools (19/10/2026)
+# On a process pool, group outputs are written straight into shared arrays
+# (one set per horizon length) and per-estate inputs (climate factors, spatial
+# pest losses) are placed once, not pickled into every task. A task only
+# carries its trajectory key, management rows and array descriptors.
+# ------------------------
+
+def run_groups_shared(tasks, workers):
+    """
+    run_groups on a new process pool with results exchanged through shared memory.
+    Returns the same outputs as [run_group(task) for task in tasks].
+    """
+    with SharedArrays() as shared:
+        rows_by_years = {}
+        placements = []
+        for estate, _, management in tasks:
+            years = estate["simulation_years"]
+            offset = rows_by_years.get(years, 0)
+            rows_by_years[years] = offset + len(management)
+            placements.append((years, offset))
+        for years, n_rows in rows_by_years.items():
+            for name, array in group_output_arrays(n_rows, years).items():
+                shared.create(f"{name}/{years}", array.shape, array.dtype)
+
+        items = []
+        for (estate, trajectory_key, management), (years, offset) in zip(tasks, placements):
+            inputs = {}
+            if estate["pest_model"] is not None:
+                inputs["pest"] = f"pest/{id(estate['pest_model'])}/{years}"
+                if inputs["pest"] not in shared:
+                    shared.put(inputs["pest"], 100 * estate["pest_model"].block_losses(years))
+            if estate["climate_factors"] is not None:
+                inputs["climate"] = f"climate/{id(estate['climate_factors'])}"
+                if inputs["climate"] not in shared:
+                    shared.put(inputs["climate"], np.asarray(estate["climate_factors"], dtype = float))
+
+            outputs = {name: f"{name}/{years}" for name in KPI_NAMES + SERIES_NAMES}
+            small_estate = {**estate, "pest_model": None, "climate_factors": None}
+            descriptors = shared.descriptors(*inputs.values(), *outputs.values())
+            items.append((descriptors, (small_estate, trajectory_key, management), inputs, outputs, offset))
+
+        with ProcessPoolExecutor(max_workers = workers) as process_pool:
+            stats = list(process_pool.map(_run_group_shared, items))
+
+        results = []
+        for (_, _, management), (years, offset), group_stats in zip(tasks, placements, stats):
+            rows = slice(offset, offset + len(management))
+            output = {name: shared[f"{name}/{years}"][rows].copy() for name in KPI_NAMES + SERIES_NAMES}
+            results.append({**output, **group_stats})
+        return results
+
+def _run_group_shared(item):
+    descriptors, (estate, trajectory_key, management), inputs, outputs, offset = item
+    with attach_arrays(descriptors) as arrays:
+        rows = slice(offset, offset + len(management))
+        out = {name: arrays[key][rows] for name, key in outputs.items()}
+        stats = evaluate_group(
+            estate, trajectory_key, management, out,
+            extra_pest = arrays[inputs["pest"]] if "pest" in inputs else 0.0,
+            climate_factors = arrays[inputs["climate"]] if "climate" in inputs else None
+        )
+        del out
+    return stats
+
+# ------------------------
+# Block-Level Parallel Runs (19/10/2026)
+# For callers that need every block-year (DataFrames), not just KPIs. The
+# parent simulates each trajectory once and places block ages, climate noise,
+# block variation and pest losses in shared memory; workers evaluate chunks of
+# management rows and write yields into a shared (sets, years, blocks) array.
+# ------------------------
+
+@instrumented("run_block_results")
+def run_block_results(param_sets, max_workers = None, pool = "block_results"):
+    """
+    Parallel equivalent of [run_simulation(**params) for params in param_sets]
+    for parameter sets with the same num_blocks and simulation_years.
+    max_workers: worker processes (None = one per CPU, 1 = run in-process).
+    Returns one run_simulation result dict per parameter set.
+    """
+    param_sets = [{**DEFAULT_PARAMS, **params} for params in param_sets]
+    if not param_sets:
+        return []
+    estates = {(params["num_blocks"], params["simulation_years"]) for params in param_sets}
+    if len(estates) > 1:
+        raise ValueError(f"All parameter sets need the same num_blocks and simulation_years, got {sorted(estates)}")
+    (num_blocks, years), = estates
+    grouped = group_parameter_sets(param_sets)
+
+    with SharedArrays() as shared:
+        n_groups = len(grouped)
+        ages = shared.create("ages", (n_groups, years, num_blocks), int)
+        climate_noise = shared.create("climate_noise", (n_groups, years, num_blocks))
+        block_variation = shared.create("block_variation", (n_groups, years, num_blocks))
+        has_pests = any(task[0]["pest_model"] is not None for _, task in grouped)
+        extra_pest = shared.create("extra_pest", (n_groups, years, num_blocks), fill = 0.0) if has_pests else None
+        shared.create("yield_t_ha", (len(param_sets), years, num_blocks))
+
+        trajectories = []
+        infestations = []
+        items = []
+        chunk = max(1, CHUNK_CELLS // (years * num_blocks))
+        for index, (positions, (estate, (seed, replant_rate, antithetic), management)) in enumerate(grouped):
+            trajectory = simulate_trajectory(
+                num_blocks = num_blocks,
+                simulation_years = years,
+                initial_age_range = estate["initial_age_range"],
+                random_seed = seed,
+                replant_rate = replant_rate,
+                noise_mode = estate["noise_mode"],
+                antithetic = antithetic
+            )
+            trajectories.append(trajectory)
+            ages[index] = trajectory["ages"]
+            climate_noise[index] = trajectory["climate_noise"]
+            if estate["climate_factors"] is not None:
+                climate_noise[index] = np.asarray(estate["climate_factors"], dtype = float)
+            block_variation[index] = trajectory["block_variation"]
+
+            pest_model = estate["pest_model"]
+            infestation = pest_infestation(pest_model, num_blocks, years)
+            infestations.append(infestation)
+            if infestation is not None:
+                extra_pest[index] = 100 * pest_model.max_loss * infestation # As in run_simulation
+
+            for start in range(0, len(positions), chunk):
+                items.append((
+                    shared.descriptors(),
+                    index,
+                    np.asarray(positions[start:start + chunk]),
+                    management[start:start + chunk]
+                ))
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        workers = min(max_workers, len(items))
+        WORKERS.labels(pool = pool).set(workers)
+        in_flight = WORKER_TASKS_IN_FLIGHT.labels(pool = pool)
+        in_flight.inc(len(items))
+        try:
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers = workers) as process_pool:
+                    busy_seconds = list(process_pool.map(_block_yields_shared, items))
+            else:
+                busy_seconds = [_block_yields_shared(item) for item in items]
+        finally:
+            in_flight.dec(len(items))
+        WORKER_BUSY_SECONDS.labels(pool = pool).inc(sum(busy_seconds))
+
+        yield_t_ha = shared["yield_t_ha"].copy()
+        del ages, climate_noise, block_variation, extra_pest # Release views before the segments close
+
+    results = [None] * len(param_sets)
+    for (positions, (estate, _, _)), trajectory, infestation in zip(grouped, trajectories, infestations):
+        for position in positions:
+            df = block_year_frame(trajectory, yield_t_ha[position], estate["block_area_ha"], 1, infestation)
+            results[position] = summarise_results(df, num_blocks, estate["block_area_ha"], years)
+
+    record_simulations("run_block_results", len(param_sets), len(param_sets) * years * num_blocks)
+    return results
+
+def _block_yields_shared(item):
+    started = time.perf_counter()
+    descriptors, index, positions, management = item
+    with attach_arrays(descriptors) as arrays:
+        columns = [management[:, i].reshape(-1, 1, 1) for i in range(management.shape[1])]
+        pest_slider = columns[4]
+        if "extra_pest" in arrays:
+            pest_slider = pest_slider + arrays["extra_pest"][index]
+        arrays["yield_t_ha"][positions] = block_yields(
+            arrays["ages"][index],
+            arrays["climate_noise"][index],
+            arrays["block_variation"][index],
+            yield_adjustment = columns[0],
+            fertilizer = columns[1],
+            harvest_interval = columns[2],
+            climate_slider = columns[3],
+            pest_slider = pest_slider
+        )
+    return time.perf_counter() - started
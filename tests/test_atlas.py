@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from palmopsim_atlas import ATLAS_AXES, KPIAtlas, build_atlas
+from palmopsim_model import SCENARIOS, register_scenario, run_simulation
+
+GRID = {"fertilizer": [-10, 0, 20], "harvest_interval": [6, 12], "climate_slider": [-20, 20], "pest_slider": [0, 20]}
+
+@pytest.fixture(scope = "module")
+def atlas(tmp_path_factory):
+    path = tmp_path_factory.mktemp("atlas") / "atlas.npz"
+    build_atlas(path, block_counts = [5], scenarios = ["Conservative", "Aggressive"], max_years = 8, grid = GRID, max_workers = 1)
+    return KPIAtlas.load(path)
+
+@pytest.mark.parametrize("scenario", ["Conservative", "Aggressive"])
+@pytest.mark.parametrize("years", [1, 8])
+def test_node_values_equal_run_simulation(atlas, scenario, years):
+    params = {
+        "scenario_name": scenario, "num_blocks": 5, "simulation_years": years,
+        "fertilizer": 20, "harvest_interval": 6, "climate_slider": -20, "pest_slider": 20
+    }
+    estimate = atlas.query(params)
+    actual = run_simulation(**params)
+    assert estimate["source"] == "atlas"
+    for kpi in ("total_ffb", "average_yield", "old_blocks"):
+        assert estimate[kpi] == actual[kpi]
+    np.testing.assert_allclose(estimate["annual_summary"], actual["annual_summary"], rtol = 1e-12)
+
+def test_save_load_round_trip(atlas, tmp_path):
+    atlas.save(tmp_path / "copy.npz")
+    loaded = KPIAtlas.load(tmp_path / "copy.npz")
+    assert loaded.metadata == atlas.metadata
+    for axis in ATLAS_AXES:
+        np.testing.assert_array_equal(loaded.grid[axis], atlas.grid[axis])
+    np.testing.assert_array_equal(loaded.annual_summary, atlas.annual_summary)
+    np.testing.assert_array_equal(loaded.old_blocks, atlas.old_blocks)
+
+@pytest.mark.parametrize("params", [
+    {"num_blocks": 6},
+    {"simulation_years": 9},
+    {"fertilizer": 25},
+    {"scenario_name": "Moderate"},
+    {"replant_rate": 0.2},
+    {"random_seed": 7}
+])
+def test_outside_coverage_falls_back_to_a_live_run(atlas, params):
+    params = {"scenario_name": "Conservative", "num_blocks": 5, "simulation_years": 8, **params}
+    assert not atlas.covers(params)
+    assert atlas.query(params, live_fallback = False) is None
+    live = atlas.query(params)
+    assert live["source"] == "live"
+    assert live["total_ffb"] == run_simulation(**params)["total_ffb"]
+
+def test_redefined_scenario_falls_back_to_a_live_run(atlas):
+    params = {"scenario_name": "Aggressive", "num_blocks": 5, "simulation_years": 8}
+    original = dict(SCENARIOS["Aggressive"])
+    assert atlas.covers(params)
+    register_scenario("Aggressive", 0.2, original["replant_rate"], original["description"])
+    try:
+        live = atlas.query(params)
+        assert live["source"] == "live"
+        assert live["total_ffb"] == run_simulation(**params)["total_ffb"]
+    finally:
+        SCENARIOS["Aggressive"] = original
+    assert atlas.covers(params)
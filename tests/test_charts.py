@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from palmopsim_charts import decimate_frame, min_max_decimate, min_max_indices
+
+@pytest.mark.parametrize("n", [10_000, 10_037]) # Last bin full / partial
+def test_every_bin_keeps_its_extremes(n):
+    y = np.random.default_rng(0).normal(size = n).cumsum()
+    max_points = 400
+    keep = min_max_indices(y, max_points)
+    assert len(keep) <= max_points
+    assert np.all(np.diff(keep) > 0)
+    assert keep[0] == 0 and keep[-1] == n - 1
+
+    bin_size = -(-n // (max_points // 4))
+    kept = set(keep.tolist())
+    for start in range(0, n, bin_size):
+        window = y[start:start + bin_size]
+        assert start + int(np.argmin(window)) in kept
+        assert start + int(np.argmax(window)) in kept
+
+def test_spikes_survive_decimation():
+    y = np.zeros(50_000)
+    y[12_345], y[40_001] = 9.0, -9.0
+    x, kept_y = min_max_decimate(np.arange(50_000), y, max_points = 200)
+    assert 12_345 in x and 40_001 in x
+    assert kept_y.max() == 9.0 and kept_y.min() == -9.0
+
+def test_short_series_is_kept_whole():
+    np.testing.assert_array_equal(min_max_indices([3.0, 1.0, 2.0], 10), [0, 1, 2])
+
+def test_decimate_frame_keeps_each_columns_extremes():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"Year": np.arange(20_000), "A": rng.normal(size = 20_000), "B": rng.normal(size = 20_000)})
+    reduced = decimate_frame(df, ["A", "B"], max_points = 400)
+    assert len(reduced) <= 400
+    assert reduced["Year"].is_monotonic_increasing
+    for column in ("A", "B"):
+        assert reduced[column].max() == df[column].max()
+        assert reduced[column].min() == df[column].min()
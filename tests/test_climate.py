@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from palmopsim_climate import ClimateInput, ClimateSeries, run_climate_ensemble
+from palmopsim_model import run_simulation
+from palmopsim_pests import SparseAdjacency, SpatialPestModel
+
+@pytest.fixture
+def climate_input():
+    series = ClimateSeries(np.random.default_rng(1).normal(1, 0.05, (40, 3)), ["N", "C", "S"], 1980)
+    return ClimateInput(series, ["N", "C", "S", "N", "S", "C"])
+
+def test_ensemble_paths_match_run_simulation_with_their_climate(climate_input):
+    pest_model = SpatialPestModel(SparseAdjacency.grid(2, 3), [0])
+    base_params = {"scenario_name": "Aggressive", "fertilizer": 10, "pest_model": pest_model}
+    paths = climate_input.resample(12, 5, block_length = 3, seed = 2)
+    ensemble = run_climate_ensemble(climate_input, paths, base_params)
+    for index, path in enumerate(paths):
+        expected = run_simulation(
+            **base_params, num_blocks = 6, simulation_years = 12, climate_factors = climate_input.block_factors(path)
+        )
+        assert ensemble["total_ffb"][index] == expected["total_ffb"]
+        assert ensemble["average_yield"][index] == expected["average_yield"]
+        np.testing.assert_allclose(ensemble["annual_summary"][index], expected["annual_summary"])
+
+@pytest.mark.parametrize("base_params", [
+    {"num_blocks": 50},
+    {"simulation_years": 30},
+    {"climate_factors": np.ones((12, 6))}
+])
+def test_conflicting_base_params_are_rejected(climate_input, base_params):
+    with pytest.raises(ValueError):
+        run_climate_ensemble(climate_input, climate_input.replay(12), base_params)
+
+def test_unknown_base_params_are_rejected(climate_input):
+    with pytest.raises(TypeError, match = "num_block"):
+        run_climate_ensemble(climate_input, climate_input.replay(12), {"num_block": 6})
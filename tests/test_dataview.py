@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+import palmopsim_dataview
+from palmopsim_dataview import DataView
+from palmopsim_model import run_scenarios
+
+@pytest.fixture(scope = "module")
+def combined_df():
+    results = run_scenarios(["Conservative", "Aggressive"], num_blocks = 7, simulation_years = 6)
+    return pd.concat(
+        [results[s]["dataframe"].assign(scenario = s) for s in results],
+        ignore_index = True
+    )
+
+def expected_rows(df, filters):
+    mask = pd.Series(True, index = df.index)
+    for column, allowed in filters.items():
+        mask &= df[column].isin(allowed if isinstance(allowed, list) else [allowed])
+    return df[mask]
+
+FILTERS = [
+    {},
+    {"scenario": ["Aggressive"]},
+    {"scenario": "Conservative", "Year": [2, 5]},
+    {"Block": ["B3", "B7"], "Year": [1, 6]},
+    {"scenario": ["Aggressive"], "Block": ["B99"]}, # Matches nothing
+    {"scenario": [], "Year": None} # Empty selections mean no filter
+]
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_positions_match_a_boolean_mask(combined_df, filters):
+    view = DataView(combined_df)
+    expected = expected_rows(combined_df, {k: v for k, v in filters.items() if v}).index.to_numpy()
+    positions = view.positions(filters)
+    if positions is None:
+        assert len(expected) == len(combined_df)
+    else:
+        assert positions.tolist() == expected.tolist()
+    assert view.count(filters) == len(expected)
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_pages_cover_the_filtered_rows_in_order(combined_df, filters):
+    view = DataView(combined_df)
+    expected = expected_rows(combined_df, {k: v for k, v in filters.items() if v})
+    page_size = 8
+    pages = [view.page(n, page_size, filters) for n in range(1, view.num_pages(page_size, filters) + 1)]
+    assert all(len(page) <= page_size for page in pages)
+    pd.testing.assert_frame_equal(pd.concat(pages), expected)
+    assert view.page(view.num_pages(page_size, filters) + 1, page_size, filters).empty
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_aggregate_matches_groupby(combined_df, filters):
+    view = DataView(combined_df)
+    expected = (
+        expected_rows(combined_df, {k: v for k, v in filters.items() if v})
+        .groupby(["scenario", "Year"], sort = False)[["FFB_t_ha", "Total_FFB_t"]].sum().reset_index()
+    )
+    pd.testing.assert_frame_equal(view.aggregate(["scenario", "Year"], filters = filters), expected)
+
+def test_cached_results_stay_per_filter(combined_df, monkeypatch):
+    monkeypatch.setattr(palmopsim_dataview, "CACHE_SIZE", 2)
+    view = DataView(combined_df)
+    first = view.positions({"scenario": ["Aggressive"]}).copy()
+    for year in range(1, 7): # Evicts the first entry
+        view.positions({"Year": [year]})
+    assert view.positions({"scenario": ["Aggressive"]}).tolist() == first.tolist()
+    assert view.aggregate("Year", filters = {"Year": 3}).equals(view.aggregate("Year", filters = {"Year": [3]}))
+    assert len(view._cache) <= 2
+
+def test_unindexed_filter_column_is_rejected(combined_df):
+    with pytest.raises(KeyError, match = "Age"):
+        DataView(combined_df).positions({"Age": [5]})
@@ -0,0 +1,83 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import palmopsim_distributed
+from palmopsim_distributed import AUTHKEY_ENV, DEFAULT_PORT, UnitFailed, run_distributed
+from palmopsim_model import SCENARIOS, register_scenario, run_simulation
+
+def test_registered_scenario_runs_on_workers_without_the_registry():
+    # Spawned workers import a fresh palmopsim_model without this registration
+    register_scenario("Test Intensive", 0.15, 0.06, "Registered in the coordinator only")
+    try:
+        param_sets = [{"scenario_name": "Test Intensive", "fertilizer": f} for f in (0, 10)]
+        seeds = [1, 2]
+        result = run_distributed(param_sets, seeds, local_workers = 1, unit_timeout = 120)
+    finally:
+        SCENARIOS.pop("Test Intensive")
+
+    expected = np.array([
+        [run_simulation(scenario_name = "Moderate", yield_adjustment = 0.15, replant_rate = 0.06,
+                        fertilizer = params["fertilizer"], random_seed = seed)["total_ffb"]
+         for seed in seeds]
+        for params in param_sets
+    ])
+    np.testing.assert_array_equal(result["total_ffb"], expected)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_remote_workers_use_the_authkey_from_the_environment(monkeypatch):
+    monkeypatch.setenv(AUTHKEY_ENV, "test-secret")
+    port = free_port()
+    results = []
+    run = threading.Thread(target = lambda: results.append(run_distributed(
+        [{"fertilizer": 10}], [3, 4], local_workers = 0, address = ("127.0.0.1", port), worker_timeout = 60
+    )))
+    run.start()
+    for _ in range(100): # Wait for the coordinator to listen before starting the worker
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    worker = subprocess.Popen(
+        [sys.executable, palmopsim_distributed.__file__, "worker", "--port", str(port)],
+        env = {**os.environ, AUTHKEY_ENV: "test-secret"}
+    )
+    try:
+        run.join(timeout = 120)
+        assert worker.wait(timeout = 30) == 0 # Told to exit when the run is done
+    finally:
+        worker.kill()
+    expected = [run_simulation(fertilizer = 10, random_seed = seed)["total_ffb"] for seed in (3, 4)]
+    np.testing.assert_array_equal(results[0]["total_ffb"], [expected])
+
+def test_remote_only_run_defaults_to_the_documented_port(monkeypatch):
+    monkeypatch.setenv(AUTHKEY_ENV, "test-secret")
+    addresses = []
+    coordinator = palmopsim_distributed.Coordinator
+
+    class RecordingCoordinator(coordinator):
+        def __init__(self, address, *args):
+            addresses.append(tuple(address))
+            super().__init__(address, *args)
+
+    monkeypatch.setattr(palmopsim_distributed, "Coordinator", RecordingCoordinator)
+    # Nobody connects: the run fails after worker_timeout instead of waiting forever
+    with pytest.raises(UnitFailed, match = "No worker connected"):
+        run_distributed([{}], [1], local_workers = 0, worker_timeout = 1)
+    assert addresses == [("0.0.0.0", DEFAULT_PORT)]
+
+def test_remote_only_run_needs_a_shared_authkey(monkeypatch):
+    monkeypatch.delenv(AUTHKEY_ENV, raising = False)
+    with pytest.raises(ValueError, match = AUTHKEY_ENV):
+        run_distributed([{}], [1], local_workers = 0)
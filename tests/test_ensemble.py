@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from palmopsim_ensemble import confidence_half_width, run_adaptive_ensemble
+from palmopsim_model import run_simulation
+
+BASE = {"num_blocks": 5, "simulation_years": 5}
+
+def test_stops_once_every_kpi_is_within_tolerance():
+    result = run_adaptive_ensemble(BASE, tolerance = 0.02, max_replicates = 500)
+    assert result["converged"]
+    assert 10 <= result["replicates"] < 500
+    assert all(precision <= 0.02 for precision in result["precision"].values())
+    summary = result["summary"]
+    assert summary.loc["total_ffb", "Half_Width"] / summary.loc["total_ffb", "Mean"] == pytest.approx(
+        result["precision"]["total_ffb"]
+    )
+
+def test_loose_tolerance_stops_at_min_replicates():
+    result = run_adaptive_ensemble(BASE, tolerance = 1.0, min_replicates = 12, batch_size = 5)
+    assert result["converged"]
+    assert result["replicates"] == 12
+
+def test_unreachable_tolerance_stops_at_max_replicates():
+    result = run_adaptive_ensemble(BASE, tolerance = 1e-6, batch_size = 7, max_replicates = 25)
+    assert not result["converged"]
+    assert result["replicates"] == 25
+    assert len(result["samples"]) == 25
+
+def test_samples_are_seed_replicates_of_run_simulation():
+    result = run_adaptive_ensemble(BASE, tolerance = 1.0, first_seed = 100)
+    samples = result["samples"]
+    np.testing.assert_array_equal(samples["random_seed"], np.arange(100, 110))
+    for row in samples.head(3).itertuples():
+        assert row.total_ffb == run_simulation(**BASE, random_seed = row.random_seed)["total_ffb"]
+
+def test_series_precision_is_the_widest_year():
+    result = run_adaptive_ensemble(BASE, kpis = ("annual_summary",), tolerance = 1.0, relative = False, max_replicates = 20)
+    annual = result["annual"]
+    assert result["precision"]["annual_summary"] == pytest.approx((annual["CI_High"] - annual["Mean"]).max())
+
+def test_unknown_kpi_is_rejected():
+    with pytest.raises(ValueError, match = "Unknown KPI"):
+        run_adaptive_ensemble(BASE, kpis = ("profit",))
+
+def test_half_width_needs_two_samples():
+    assert confidence_half_width(np.array([1.0])) == np.inf
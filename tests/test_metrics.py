@@ -0,0 +1,48 @@
+import pytest
+
+from palmopsim_metrics import MetricsRegistry
+
+def sample_lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_latency_seconds", "Latency.", ["endpoint"], buckets = (0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0, 5.0): # 0.1 sits on a bound: le is inclusive
+        latency.labels(endpoint = "/simulate").observe(value)
+
+    text = registry.render()
+    assert sample_lines(text, "test_latency_seconds_bucket") == [
+        'test_latency_seconds_bucket{endpoint="/simulate",le="0.1"} 2',
+        'test_latency_seconds_bucket{endpoint="/simulate",le="0.5"} 3',
+        'test_latency_seconds_bucket{endpoint="/simulate",le="1"} 4',
+        'test_latency_seconds_bucket{endpoint="/simulate",le="+Inf"} 6'
+    ]
+    assert sample_lines(text, "test_latency_seconds_count") == ['test_latency_seconds_count{endpoint="/simulate"} 6']
+    assert sample_lines(text, "test_latency_seconds_sum") == ['test_latency_seconds_sum{endpoint="/simulate"} 8.15']
+
+def test_label_values_and_help_text_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_requests_total", 'Requests by path\\scenario.\nSecond line.', ["path"])
+    counter.labels(path = 'C:\\runs\n"quoted"').inc(3)
+
+    text = registry.render()
+    assert "# HELP test_requests_total Requests by path\\\\scenario.\\nSecond line.\n" in text
+    assert sample_lines(text, "test_requests_total") == ['test_requests_total{path="C:\\\\runs\\n\\"quoted\\""} 3']
+
+def test_render_lists_every_metric_with_type():
+    registry = MetricsRegistry()
+    registry.counter("test_runs_total", "Runs.").inc()
+    registry.gauge("test_queue_depth", "Queue.").set(4)
+    text = registry.render()
+    assert text.endswith("\n")
+    assert "# TYPE test_runs_total counter\ntest_runs_total 1\n" in text
+    assert "# TYPE test_queue_depth gauge\ntest_queue_depth 4\n" in text
+
+def test_reregistering_with_other_labels_is_rejected():
+    registry = MetricsRegistry()
+    assert registry.counter("test_total", "Doc.", ["a"]) is registry.counter("test_total", "Doc.", ["a"])
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Doc.", ["a"])
+    with pytest.raises(ValueError):
+        registry.counter("test_total", "Doc.", ["b"])
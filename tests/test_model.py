@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from palmopsim_model import (
+    DERIVATIVE_PARAMS, block_yield_derivatives, block_yields, extend_simulation, run_scenarios,
+    run_simulation, run_simulation_derivatives, simulate_trajectory
+)
+from palmopsim_pests import SparseAdjacency, SpatialPestModel
+from palmopsim_sweep import run_sweep
+
+def test_crn_draws_do_not_depend_on_replant_rate():
+    slow, fast = (
+        simulate_trajectory(num_blocks = 10, simulation_years = 30, replant_rate = rate, noise_mode = "crn")
+        for rate in (0.03, 0.20)
+    )
+    assert not np.array_equal(slow["ages"], fast["ages"]) # Replanting did diverge
+    np.testing.assert_array_equal(slow["climate_noise"], fast["climate_noise"])
+    np.testing.assert_array_equal(slow["block_variation"], fast["block_variation"])
+
+def test_crn_scenario_run_matches_the_replant_strategy_sweep():
+    scenario = run_scenarios(["Moderate"], num_blocks = 10, simulation_years = 30, noise_mode = "crn")["Moderate"]
+    sweep = run_sweep(
+        {"scenario_name": ["Moderate"], "replant_rate": [0.05, 0.10]},
+        {"num_blocks": 10, "simulation_years": 30, "noise_mode": "crn"},
+        max_workers = 1
+    )
+    assert sweep.kpis["total_ffb"][0, 0] == scenario["total_ffb"]
+
+@pytest.mark.parametrize("noise_mode", ["legacy", "crn"])
+@pytest.mark.parametrize("with_pests", [False, True])
+def test_extension_matches_a_full_rerun(noise_mode, with_pests):
+    params = {"scenario_name": "Aggressive", "num_blocks": 30, "noise_mode": noise_mode}
+    if with_pests:
+        params["pest_model"] = SpatialPestModel(SparseAdjacency.grid(5, 6), [0, 17])
+    full = run_simulation(**params, simulation_years = 25, return_state = True)
+    extended = extend_simulation(
+        extend_simulation(run_simulation(**params, simulation_years = 8, return_state = True), 15),
+        25
+    )
+    for kpi in ("total_ffb", "average_yield", "old_blocks"):
+        assert extended[kpi] == full[kpi]
+    pd.testing.assert_frame_equal(extended["dataframe"], full["dataframe"])
+    pd.testing.assert_series_equal(extended["annual_yield"], full["annual_yield"])
+    np.testing.assert_array_equal(extended["state"]["ages"], full["state"]["ages"])
+
+def test_batched_scenario_checkpoints_extend_like_a_full_rerun():
+    short = run_scenarios(["Conservative", "Moderate"], simulation_years = 6, return_state = True)
+    for name, result in short.items():
+        full = run_simulation(scenario_name = name, simulation_years = 20)
+        pd.testing.assert_frame_equal(extend_simulation(result, 20)["dataframe"], full["dataframe"])
+
+@pytest.mark.filterwarnings("error")
+def test_extension_by_zero_years_returns_the_run():
+    previous = run_simulation(simulation_years = 5, return_state = True)
+    same = extend_simulation(previous, 5)
+    assert same["total_ffb"] == previous["total_ffb"]
+    assert same["average_yield"] == previous["average_yield"]
+    # A branch made at the checkpoint applies once the horizon grows
+    branched = extend_simulation(extend_simulation(previous, 5, fertilizer = 10), 8)
+    assert branched["total_ffb"] == extend_simulation(previous, 8, fertilizer = 10)["total_ffb"]
+
+def unrounded_total(**params):
+    return run_simulation_derivatives(**params)["dataframe"]["Total_FFB_t"].sum()
+
+@pytest.mark.parametrize("fertilizer", [-30, 25]) # 0 is the kink, see below
+@pytest.mark.parametrize("with_pests", [False, True])
+def test_derivatives_match_central_differences(fertilizer, with_pests):
+    params = {
+        "scenario_name": "Moderate", "num_blocks": 30, "simulation_years": 20, "fertilizer": fertilizer,
+        "climate_slider": -10, "pest_slider": 8, "harvest_interval": 9
+    }
+    if with_pests:
+        params["pest_model"] = SpatialPestModel(SparseAdjacency.grid(5, 6), [0, 17])
+    summary = run_simulation_derivatives(**params)["summary"]
+    step = 1e-4
+    for name in DERIVATIVE_PARAMS:
+        numeric = (
+            unrounded_total(**{**params, name: params[name] + step})
+            - unrounded_total(**{**params, name: params[name] - step})
+        ) / (2 * step)
+        assert summary.loc[name, "Derivative"] == pytest.approx(numeric, rel = 1e-7)
+
+def test_fertilizer_derivative_at_the_abs_kink():
+    # |f| has a kink at 0: f / (100 + |f|) has the same slope from both sides but its
+    # curvature changes sign, so check each one-sided difference separately
+    derivative = run_simulation_derivatives(fertilizer = 0)["summary"].loc["fertilizer", "Derivative"]
+    step = 1e-6
+    base = unrounded_total(fertilizer = 0)
+    assert (unrounded_total(fertilizer = step) - base) / step == pytest.approx(derivative, rel = 1e-5)
+    assert (base - unrounded_total(fertilizer = -step)) / step == pytest.approx(derivative, rel = 1e-5)
+
+def test_derivative_pass_yield_matches_block_yields():
+    trajectory = simulate_trajectory(num_blocks = 12, simulation_years = 15)
+    args = (trajectory["ages"], trajectory["climate_noise"], trajectory["block_variation"])
+    management = {"yield_adjustment": 0.1, "fertilizer": -15, "harvest_interval": 8, "climate_slider": 12, "pest_slider": 3}
+    yield_t_ha, _ = block_yield_derivatives(*args, **management)
+    np.testing.assert_array_equal(yield_t_ha, block_yields(*args, **management))
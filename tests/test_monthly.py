@@ -0,0 +1,17 @@
+import pytest
+
+from palmopsim_model import run_simulation
+from palmopsim_monthly import run_monthly_simulation
+
+def test_fractional_harvest_interval_is_rejected():
+    with pytest.raises(ValueError, match = "whole number"):
+        run_monthly_simulation(harvest_interval = 6.5)
+
+def test_whole_float_harvest_interval_is_accepted():
+    assert run_monthly_simulation(harvest_interval = 6.0)["total_ffb"] == run_monthly_simulation(harvest_interval = 6)["total_ffb"]
+
+def test_monthly_crop_is_conserved():
+    # With a 6-month interval there is no over-ripening loss, so ripened crop matches the annual engine
+    monthly = run_monthly_simulation(scenario_name = "Moderate", harvest_interval = 6)["monthly"]
+    annual = run_simulation(scenario_name = "Moderate", harvest_interval = 6)
+    assert monthly["Ripened_FFB_t"].sum() == pytest.approx(annual["dataframe"]["Total_FFB_t"].sum(), rel = 1e-4)
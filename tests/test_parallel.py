@@ -0,0 +1,73 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import palmopsim_parallel
+from palmopsim_model import run_simulation
+from palmopsim_pests import SparseAdjacency, SpatialPestModel
+from palmopsim_sweep import run_block_results, run_sweep
+
+ESTATE = {"num_blocks": 30, "simulation_years": 12}
+
+class RecordedSharedMemory(shared_memory.SharedMemory):
+    created = []
+
+    def __init__(self, name = None, create = False, size = 0):
+        super().__init__(name = name, create = create, size = size)
+        if create:
+            RecordedSharedMemory.created.append(self.name)
+
+@pytest.fixture
+def segments(monkeypatch):
+    """
+    Names of the segments created in this process; checks they are all unlinked afterwards.
+    """
+    RecordedSharedMemory.created = []
+    monkeypatch.setattr(palmopsim_parallel.shared_memory, "SharedMemory", RecordedSharedMemory)
+    yield RecordedSharedMemory.created
+    monkeypatch.undo()
+    for name in RecordedSharedMemory.created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name = name)
+
+def estate_inputs(with_inputs):
+    if not with_inputs:
+        return {}
+    return {
+        "pest_model": SpatialPestModel(SparseAdjacency.grid(5, 6), [0, 17]),
+        "climate_factors": np.random.default_rng(0).normal(1, 0.02, (ESTATE["simulation_years"], ESTATE["num_blocks"]))
+    }
+
+@pytest.mark.parametrize("with_inputs", [False, True])
+def test_sweep_on_a_process_pool_matches_in_process(segments, with_inputs):
+    axes = {"scenario": ["Conservative", "Aggressive"], "fertilizer": [0, 10], "seed": [1, 2, 3]}
+    base_params = {**ESTATE, **estate_inputs(with_inputs)}
+    in_process = run_sweep(axes, base_params, max_workers = 1)
+    pooled = run_sweep(axes, base_params, max_workers = 2)
+    assert segments
+    for name in in_process.kpis:
+        np.testing.assert_array_equal(pooled.kpis[name], in_process.kpis[name])
+    for name in in_process.series:
+        np.testing.assert_array_equal(pooled.series[name], in_process.series[name])
+
+@pytest.mark.parametrize("with_inputs", [False, True])
+def test_block_results_on_a_process_pool_match_run_simulation(segments, with_inputs):
+    param_sets = [
+        {**ESTATE, **estate_inputs(with_inputs), "scenario_name": scenario, "fertilizer": fertilizer, "random_seed": seed}
+        for scenario in ("Moderate", "Aggressive") for fertilizer in (0, 15) for seed in (4, 5)
+    ]
+    pooled = run_block_results(param_sets, max_workers = 2)
+    assert segments
+    for params, result, in_process in zip(param_sets, pooled, run_block_results(param_sets, max_workers = 1)):
+        expected = run_simulation(**params)
+        for kpi in ("total_ffb", "average_yield", "old_blocks"):
+            assert result[kpi] == expected[kpi] == in_process[kpi]
+        pd.testing.assert_frame_equal(result["dataframe"], expected["dataframe"])
+        pd.testing.assert_series_equal(result["annual_summary"], expected["annual_summary"])
+
+def test_segments_are_released_when_a_task_fails(segments):
+    with pytest.raises(ValueError):
+        run_block_results([{**ESTATE, "random_seed": seed, "climate_factors": np.ones((2, 2))} for seed in (1, 2)], max_workers = 2)
+    assert segments
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from palmopsim_pests import SparseAdjacency, SpatialPestModel
+
+@pytest.fixture
+def adjacency():
+    return SparseAdjacency.grid(1, 4)
+
+@pytest.mark.parametrize("initial", [[2], np.array([2]), {2: 1.0}])
+def test_initial_infestation_by_index(adjacency, initial):
+    model = SpatialPestModel(adjacency, initial)
+    np.testing.assert_array_equal(model.initial_infestation, [0.0, 0.0, 1.0, 0.0])
+
+def test_index_list_covering_every_block_infests_every_block():
+    model = SpatialPestModel(SparseAdjacency.grid(1, 3), [0, 1, 2])
+    np.testing.assert_array_equal(model.initial_infestation, [1.0, 1.0, 1.0])
+
+@pytest.mark.parametrize("pressure", [
+    [False, False, True, False],
+    np.array([False, False, True, False]),
+    [0, 0, 1, 0],
+    [0.0, 0.0, 1.0, 0.0]
+])
+def test_initial_pressure_per_block(adjacency, pressure):
+    model = SpatialPestModel(adjacency, initial_pressure = pressure)
+    np.testing.assert_array_equal(model.initial_infestation, [0.0, 0.0, 1.0, 0.0])
+
+@pytest.mark.parametrize("initial", [[7], [-1], {-1: 1.0}, {4: 0.5}, [0.5], [True, False]])
+def test_initial_infestation_rejects_bad_indices(adjacency, initial):
+    with pytest.raises(ValueError, match = "initial_infestation"):
+        SpatialPestModel(adjacency, initial)
+
+def test_initial_pressure_needs_one_value_per_block(adjacency):
+    with pytest.raises(ValueError, match = "one value per block"):
+        SpatialPestModel(adjacency, initial_pressure = [0.0, 1.0])
+
+@pytest.mark.parametrize("arguments", [{}, {"initial_infestation": [0], "initial_pressure": [1, 0, 0, 0]}])
+def test_exactly_one_initial_form(adjacency, arguments):
+    with pytest.raises(ValueError, match = "exactly one"):
+        SpatialPestModel(adjacency, **arguments)
+
+@pytest.mark.parametrize("max_loss", [-0.1, 1.5])
+def test_max_loss_must_be_a_fraction(adjacency, max_loss):
+    with pytest.raises(ValueError, match = "max_loss"):
+        SpatialPestModel(adjacency, [0], max_loss = max_loss)
@@ -0,0 +1,78 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+
+import pytest
+
+from palmopsim_model import run_simulation
+from palmopsim_service import create_server
+
+@pytest.fixture
+def server():
+    server = create_server(port = 0, max_workers = 1, use_threads = True)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def post(server, path, body):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}{path}",
+        data = json.dumps(body).encode("utf-8"),
+        headers = {"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout = 30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+@pytest.mark.parametrize("bad_body", [
+    {"scenario_name": "Nope"},
+    {"fertilizer": "abc"},
+    {"num_blocks": 2.5},
+    {"initial_age_range": [3]},
+    {"replant_rate": -5},
+    {"replant_rate": 1.5},
+    {"yield_adjustment": -1},
+    {"block_area_ha": 0},
+    {"harvest_interval": 1e308}
+])
+def test_bad_request_is_rejected_and_batcher_keeps_serving(server, bad_body):
+    status, payload = post(server, "/simulate", bad_body)
+    assert status == 400
+    assert "error" in payload
+
+    status, payload = post(server, "/simulate", {"scenario_name": "Moderate", "fertilizer": 5})
+    assert status == 200
+    assert payload["total_ffb"] == run_simulation(scenario_name = "Moderate", fertilizer = 5)["total_ffb"]
+
+def test_failing_batch_only_fails_its_own_requests(server):
+    # Bypass submit() validation to force an error inside the batcher thread
+    bad = Future()
+    server.service.batcher._queue.put(({"fertilizer": "abc"}, "bad-key", bad))
+    with pytest.raises(ValueError):
+        bad.result(timeout = 30)
+
+    status, _ = post(server, "/simulate", {"scenario_name": "Aggressive"})
+    assert status == 200
+
+def test_non_finite_numbers_are_rejected(server):
+    # Python's json writes these as the non-standard Infinity / NaN literals
+    for value in (float("inf"), float("nan")):
+        status, payload = post(server, "/simulate", {"fertilizer": value})
+        assert status == 400
+        assert "finite" in payload["error"]
+
+def test_overflowing_sweep_is_rejected(server):
+    status, payload = post(server, "/sweep", {"axes": {"harvest_interval": [12, 1e308]}})
+    assert status == 400
+    assert "not finite" in payload["error"]
+
+def test_sweep_axis_values_are_checked_like_params(server):
+    status, payload = post(server, "/sweep", {"axes": {"replant_rate": [0.05, -5]}})
+    assert status == 400
+    assert "replant_rate" in payload["error"]
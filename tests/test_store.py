@@ -0,0 +1,25 @@
+import numpy as np
+
+from palmopsim_model import run_simulation
+from palmopsim_store import RunStore, param_hash
+
+def test_array_params_hash_by_contents():
+    climate = np.ones((30, 50))
+    changed = climate.copy()
+    changed[15, 25] = 1.01 # Inside the part numpy elides when printing
+    assert str(climate) == str(changed)
+
+    assert param_hash({"climate_factors": climate}) != param_hash({"climate_factors": changed})
+    assert param_hash({"climate_factors": climate}) == param_hash({"climate_factors": climate.copy()})
+
+def test_latest_for_params_tells_climate_inputs_apart(tmp_path):
+    climate = np.ones((30, 50))
+    changed = climate.copy()
+    changed[15, 25] = 1.01
+    store = RunStore(str(tmp_path / "runs.db"))
+    run_ids = []
+    for factors in (climate, changed):
+        params = {"num_blocks": 50, "simulation_years": 30, "climate_factors": factors}
+        run_ids.append(store.save_run(params, run_simulation(**params)))
+
+    assert store.latest_for_params({"num_blocks": 50, "simulation_years": 30, "climate_factors": climate}) == run_ids[0]
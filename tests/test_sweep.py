@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from palmopsim_sweep import run_sweep
+
+@pytest.fixture(scope = "module")
+def heatmap_sweep():
+    return run_sweep({"fertilizer": [0, 10, 20], "pest_slider": [0, 5]}, max_workers = 1)
+
+def test_to_frame_defaults_columns_to_the_other_axis(heatmap_sweep):
+    frame = heatmap_sweep.to_frame(index = "pest_slider")
+    assert frame.index.name == "pest_slider"
+    assert frame.columns.name == "fertilizer"
+    np.testing.assert_array_equal(frame.to_numpy(), heatmap_sweep.kpis["total_ffb"].T)
+
+def test_to_frame_defaults_index_to_the_other_axis(heatmap_sweep):
+    frame = heatmap_sweep.to_frame(columns = "fertilizer")
+    assert frame.index.name == "pest_slider"
+    assert frame.equals(heatmap_sweep.to_frame(index = "pest_slider", columns = "fertilizer"))
+    assert frame.T.equals(heatmap_sweep.to_frame())
+
+def test_axis_and_alias_together_are_rejected():
+    with pytest.raises(ValueError, match = "scenario_name"):
+        run_sweep({"scenario": ["Moderate"], "scenario_name": ["Aggressive"]}, max_workers = 1)
+
+def test_base_params_accept_aliases():
+    aliased = run_sweep({"fertilizer": [0]}, {"seed": 7, "scenario": "Moderate"}, max_workers = 1)
+    named = run_sweep({"fertilizer": [0]}, {"random_seed": 7, "scenario_name": "Moderate"}, max_workers = 1)
+    assert aliased.kpis["total_ffb"][0] == named.kpis["total_ffb"][0]
+    assert aliased.kpis["total_ffb"][0] != run_sweep({"fertilizer": [0]}, max_workers = 1).kpis["total_ffb"][0]
+
+def test_unknown_base_params_are_rejected():
+    with pytest.raises(TypeError, match = "num_block"):
+        run_sweep({"fertilizer": [0]}, {"seed": 7, "num_block": 50}, max_workers = 1)
+    with pytest.raises(ValueError, match = "random_seed"):
+        run_sweep({"fertilizer": [0]}, {"seed": 7, "random_seed": 8}, max_workers = 1)